@@ -0,0 +1,561 @@
+import argparse
+import glob
+import json
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+import presidio_engine
+import scan_pipeline
+from dedup_index import DEFAULT_IMAGE_DISTANCE, DEFAULT_TEXT_SIMILARITY, DedupIndex, first_page_signature, text_signature
+from field_index import FieldIndex
+from ocr_page import DEFAULT_OCR_CONFIG, set_tesseract_cmd
+from ocr_cache import DEFAULT_MAX_BYTES as DEFAULT_OCR_CACHE_BYTES, OcrCache
+from page_source import DEFAULT_MAX_PAGE_BYTES, PageSource, limit_worker_memory
+from pdf_text_layer import PdfTextLayer
+from preprocess import DEFAULT_TARGET_TEXT_HEIGHT, Preprocessor
+from results_store import ResultsStore
+from render_overlay import DEFAULT_MAX_WIDTH, DEFAULT_QUALITY, render_overlay
+from template_library import DEFAULT_MIN_SCORE, load_template_library
+from regions import load_labelstudio_template, predefined_template
+
+# === Per-worker state (filled once by init_worker) ===
+_worker = {}
+
+
+def init_worker(options):
+    """Load every engine of this process once; `options` comes from worker_options()."""
+    limit_worker_memory(options["worker_memory_bytes"])
+    if options["tesseract_cmd"]:
+        set_tesseract_cmd(options["tesseract_cmd"])
+    _worker.update(
+        {name: options[name] for name in (
+            "template", "ocr_config", "dpi", "poppler_path", "max_page_bytes", "use_text_layer",
+            "nlp_batch_size", "nlp_processes", "region_ocr", "region_ocr_threads", "preprocessor",
+            "template_library", "text_signatures",
+        )},
+        source=None, text_layer=None, extractor=None,
+        ocr_cache=OcrCache(options["ocr_cache_dir"], max_bytes=options["ocr_cache_bytes"])
+        if options["ocr_cache_dir"] else None,
+    )
+    if options["layoutlm_model"]:
+        # Learned layout model replaces the fixed region template; loaded once per worker
+        from layoutlm_inference import load_extractor
+
+        _worker["extractor"] = load_extractor(options["layoutlm_model"], backend=options["layoutlm_backend"],
+                                              num_threads=1)
+    presidio_engine.set_profile(options["recognizer_profile"])
+    presidio_engine.warm_up()
+
+
+def _page_source(file_path):
+    # One PageSource per file, always handing the same grayscale buffer on
+    source = _worker["source"]
+    if source is None or source.file_path != file_path:
+        source = PageSource(
+            file_path, dpi=_worker["dpi"], poppler_path=_worker["poppler_path"],
+            max_page_bytes=_worker["max_page_bytes"], buffer=source.buffer if source else None,
+        )
+        _worker["source"] = source
+    return source
+
+
+def _text_layer(file_path):
+    text_layer = _worker["text_layer"]
+    if text_layer is None or text_layer.file_path != file_path:
+        if text_layer is not None:
+            text_layer.close()
+        text_layer = PdfTextLayer(file_path, dpi=_worker["dpi"])
+        _worker["text_layer"] = text_layer
+    return text_layer
+
+
+def _model_image(file_path, page_index, image=None):
+    if _worker["extractor"] is None:
+        return None
+
+    # Grouping runs after the whole chunk is extracted and the page buffer is
+    # reused, so keep the model's 224 x 224 input now rather than the page view
+    from PIL import Image
+
+    page_image = image if image is not None else _page_source(file_path).page(page_index)
+    return Image.fromarray(page_image).convert("RGB").resize((224, 224))
+
+
+def _model_groupers(extracted):
+    # One extract() call for the whole chunk, so layoutlm_inference can bucket
+    # the pages by length and fill its token budget; None per page without a model
+    if _worker["extractor"] is None or not extracted:
+        return [None] * len(extracted)
+    start = time.perf_counter()
+    grouped_pages = _worker["extractor"].extract([(item["model_image"], item["ocr_page"]) for item in extracted])
+    model_seconds = (time.perf_counter() - start) / len(extracted)
+    for item in extracted:
+        item["timings"]["layoutlm"] = model_seconds
+    return [lambda ocr_page, grouped=grouped: grouped for grouped in grouped_pages]
+
+
+def _match_template(image=None, ocr_page=None):
+    # Nearest template from the library; the fixed template when there is no
+    # library, no close match, or the learned model does the grouping
+    library = _worker["template_library"]
+    if library is None or _worker["extractor"] is not None:
+        return _worker["template"], None
+    template, name, _ = library.template_for(image=image, ocr_page=ocr_page, default=_worker["template"])
+    return template, name
+
+
+def _extract_page(file_path, page_index):
+    # Born-digital PDFs: use the embedded text layer and skip rasterizing + OCR
+    if _worker["use_text_layer"] and file_path.lower().endswith(".pdf"):
+        start = time.perf_counter()
+        ocr_page = _text_layer(file_path).page(page_index)
+        extract_seconds = time.perf_counter() - start
+        if ocr_page is not None:
+            start = time.perf_counter()
+            template, template_name = _match_template(ocr_page=ocr_page)
+            return dict(
+                ocr_page=ocr_page, model_image=_model_image(file_path, page_index), template=template,
+                template_name=template_name, source="text_layer",
+                timings={"extract": extract_seconds, "match": time.perf_counter() - start},
+            )
+
+    start = time.perf_counter()
+    image = _page_source(file_path).page(page_index)
+    load_seconds = time.perf_counter() - start
+
+    # Matched before OCR so region-scoped OCR crops the right regions
+    start = time.perf_counter()
+    template, template_name = _match_template(image=image)
+    match_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    ocr_page, source = scan_pipeline.ocr_image(
+        image, template, ocr_config=_worker["ocr_config"], ocr_cache=_worker["ocr_cache"],
+        region_ocr=_worker["region_ocr"] and _worker["extractor"] is None,
+        region_ocr_threads=_worker["region_ocr_threads"], preprocessor=_worker["preprocessor"],
+    )
+    ocr_seconds = time.perf_counter() - start
+    return dict(
+        ocr_page=ocr_page, model_image=_model_image(file_path, page_index, image), template=template,
+        template_name=template_name, source=source,
+        timings={"load": load_seconds, "match": match_seconds, "ocr": ocr_seconds},
+    )
+
+
+def scan_pages(jobs):
+    """Scan a chunk of (file_path, page_index) jobs in a worker set up by scan_pool.
+
+    Returns one (file_path, page_index, page, error) tuple per job: page is the
+    JSON-ready result (see scan_pipeline.page_result) and error is None, or
+    page is None and error says why the page failed.
+    """
+    # Extract every page of the chunk first, then run Presidio over all of them in one batch
+    extracted, outcomes = [], []
+    for file_path, page_index in jobs:
+        try:
+            extracted.append((file_path, page_index, _extract_page(file_path, page_index)))
+        except Exception as e:
+            outcomes.append((file_path, page_index, None, str(e)))
+
+    pages = scan_pipeline.analyze_pages(
+        [item["ocr_page"] for _, _, item in extracted], _worker["template"],
+        groupers=_model_groupers([item for _, _, item in extracted]),
+        templates=[item["template"] for _, _, item in extracted],
+        batch_size=_worker["nlp_batch_size"], n_process=_worker["nlp_processes"],
+    )
+    for (file_path, page_index, item), page in zip(extracted, pages):
+        page["page"] = page_index + 1
+        page["source"] = item["source"]
+        if item["template_name"] is not None:
+            page["template"] = item["template_name"]
+        page["timings"].update(item["timings"])
+        if _worker["text_signatures"] and page_index == 0:
+            # For the dedup index; popped by run_batch before the result is written
+            signature = text_signature(item["ocr_page"].words)
+            page["text_signature"] = signature.tolist() if signature is not None else None
+        outcomes.append((file_path, page_index, page, None))
+    return outcomes
+
+
+def render_page(file_path, page_index, page, fmt="webp", max_width=DEFAULT_MAX_WIDTH, quality=DEFAULT_QUALITY):
+    """Encoded overlay image (bytes) of one scanned page, rendered in a scan_pool worker.
+
+    The page is rasterized again from file_path, so overlays are only paid for
+    when someone asks for them.
+    """
+    image = _page_source(file_path).page(page_index)
+    return render_overlay(image, page, max_width=max_width, fmt=fmt, quality=quality)
+
+
+# === Input discovery: files, directories and glob patterns ===
+def collect_inputs(inputs):
+    file_paths = []
+    for pattern in inputs:
+        if os.path.isdir(pattern):
+            candidates = sorted(
+                os.path.join(pattern, name) for name in os.listdir(pattern)
+            )
+        else:
+            candidates = sorted(glob.glob(pattern, recursive=True))
+        for path in candidates:
+            if os.path.isfile(path) and path.lower().endswith(scan_pipeline.SUPPORTED_EXTENSIONS):
+                file_paths.append(path)
+    # Keep order stable but drop duplicates from overlapping patterns
+    return list(dict.fromkeys(file_paths))
+
+
+def write_result(output_dir, file_path, pages, error=None, duplicate_of=None):
+    """Write the JSON result of one file to output_dir and return its path.
+
+    Pages are sorted by page number; error and duplicate_of are added when set.
+    """
+    result = {
+        "file": file_path,
+        "pages": sorted(pages, key=lambda page: page["page"]),
+    }
+    if error:
+        result["error"] = error
+    if duplicate_of:
+        result["duplicate_of"] = duplicate_of
+    json_path = scan_pipeline.result_path(output_dir, file_path)
+    with open(json_path, "w", encoding="utf-8") as f:
+        json.dump(result, f, ensure_ascii=False)
+    return json_path
+
+
+def _reuse_result(output_dir, file_path, entry):
+    # Copy the earlier result of a near-duplicate; None when it is gone or failed
+    try:
+        with open(entry["result"], "r", encoding="utf-8") as f:
+            earlier = json.load(f)
+    except (KeyError, OSError, ValueError):
+        return None
+    if earlier.get("error"):
+        return None
+    return write_result(output_dir, file_path, earlier["pages"], duplicate_of=entry["file"])
+
+
+# === Near-duplicate pre-pass: first-page hashes, before anything is scanned ===
+# Duplicates of a resume in the index reuse its result (or are only flagged);
+# duplicates of another file in this batch wait for it and copy its result.
+# Returns (reused files, {duplicate: original in this batch}, {flagged: original},
+# {new file: signature}).
+def _dedup_prepass(file_paths, output_dir, dedup_index, dedup_action, poppler_path):
+    batch_index = DedupIndex(image_distance=dedup_index.image_distance)
+    reused, waiting, flagged, signatures = set(), {}, {}, {}
+    for file_path in file_paths:
+        try:
+            signature = first_page_signature(file_path, poppler_path=poppler_path)
+        except Exception as e:
+            print(f"⚠️ No dedup signature for {file_path}: {e}")
+            continue
+        entry, _ = dedup_index.find_image(signature)
+        if entry is not None and os.path.abspath(entry["file"]) == os.path.abspath(file_path):
+            entry = None  # same file scanned again: a deliberate re-run
+        in_batch = False
+        if entry is None:
+            entry, _ = batch_index.find_image(signature)
+            in_batch = entry is not None
+        if entry is None:
+            signatures[file_path] = signature
+            batch_index.add(signature, None, {"file": file_path})
+            continue
+
+        if dedup_action == "reuse" and in_batch:
+            waiting[file_path] = entry["file"]
+            print(f"♻️ {file_path}: duplicate of {entry['file']} (same batch), its result will be copied")
+        elif dedup_action == "reuse" and _reuse_result(output_dir, file_path, entry):
+            reused.add(file_path)
+            print(f"♻️ {file_path}: duplicate of {entry['file']}, result reused")
+        else:
+            flagged[file_path] = entry["file"]
+            print(f"⚠️ {file_path}: near-duplicate of {entry['file']}")
+    return reused, waiting, flagged, signatures
+
+
+# === init_worker options: every pipeline option by name, with its default ===
+# Keyword-only, so a misspelt or unknown option fails here instead of
+# misconfiguring the workers
+def worker_options(template, *, ocr_config=DEFAULT_OCR_CONFIG, dpi=300, poppler_path=None, tesseract_cmd=None,
+                   max_page_bytes=DEFAULT_MAX_PAGE_BYTES, worker_memory_bytes=None, use_text_layer=True,
+                   ocr_cache_dir=None, ocr_cache_bytes=DEFAULT_OCR_CACHE_BYTES, layoutlm_model=None,
+                   layoutlm_backend="pytorch", nlp_batch_size=32, nlp_processes=1, recognizer_profile="resume",
+                   region_ocr=False, region_ocr_threads=None, preprocessor=None, template_library=None,
+                   text_signatures=False):
+    return dict(
+        template=template, ocr_config=ocr_config, dpi=dpi, poppler_path=poppler_path, tesseract_cmd=tesseract_cmd,
+        max_page_bytes=max_page_bytes, worker_memory_bytes=worker_memory_bytes, use_text_layer=use_text_layer,
+        ocr_cache_dir=ocr_cache_dir, ocr_cache_bytes=ocr_cache_bytes, layoutlm_model=layoutlm_model,
+        layoutlm_backend=layoutlm_backend, nlp_batch_size=nlp_batch_size, nlp_processes=nlp_processes,
+        recognizer_profile=recognizer_profile, region_ocr=region_ocr, region_ocr_threads=region_ocr_threads,
+        preprocessor=preprocessor, template_library=template_library, text_signatures=text_signatures,
+    )
+
+
+# === Process pool whose workers load every engine once, at start-up ===
+def scan_pool(template, workers=None, **options):
+    return ProcessPoolExecutor(
+        max_workers=workers or os.cpu_count() or 1,
+        initializer=init_worker,
+        initargs=(worker_options(template, **options),),
+    )
+
+
+# === Fan pages out across a process pool with a bounded number in flight ===
+def run_batch(file_paths, output_dir, template, workers=None, max_pending=None,
+              ocr_config=DEFAULT_OCR_CONFIG, dpi=300, poppler_path=None, tesseract_cmd=None,
+              max_page_bytes=DEFAULT_MAX_PAGE_BYTES, worker_memory_bytes=None, use_text_layer=True,
+              ocr_cache_dir=None, ocr_cache_bytes=DEFAULT_OCR_CACHE_BYTES, layoutlm_model=None,
+              layoutlm_backend="pytorch", pages_per_task=8, nlp_batch_size=32, nlp_processes=1,
+              recognizer_profile="resume", region_ocr=False, region_ocr_threads=None, preprocessor=None,
+              template_library=None, dedup_index=None, dedup_action="reuse", field_index=None,
+              results_store=None):
+    os.makedirs(output_dir, exist_ok=True)
+    workers = workers or os.cpu_count() or 1
+    max_pending = max_pending or workers * 2
+
+    pending_pages = {}
+    results = {}
+    errors = {}
+    for file_path in file_paths:
+        try:
+            pending_pages[file_path] = len(PageSource(file_path, poppler_path=poppler_path))
+        except Exception as e:
+            print(f"❌ Could not open {file_path}: {e}")
+            write_result(output_dir, file_path, [], error=str(e))
+            continue
+        if pending_pages[file_path] == 0:
+            write_result(output_dir, file_path, [], error="no pages")
+            continue
+        results[file_path] = []
+
+    copies, flagged, image_signatures, text_signatures = {}, {}, {}, {}
+    if dedup_index is not None:
+        reused, waiting, flagged, image_signatures = _dedup_prepass(
+            list(results), output_dir, dedup_index, dedup_action, poppler_path,
+        )
+        for file_path in reused | set(waiting):
+            del results[file_path]
+        for duplicate, original in waiting.items():
+            copies.setdefault(original, []).append(duplicate)
+
+    pages = [(file_path, page_index)
+             for file_path in list(results)
+             for page_index in range(pending_pages[file_path])]
+    # Each task carries several pages so Presidio can batch their texts through spaCy
+    jobs = iter([pages[i:i + pages_per_task] for i in range(0, len(pages), pages_per_task)])
+
+    start = time.perf_counter()
+    pages_done = 0
+    with scan_pool(
+        template, workers=workers, ocr_config=ocr_config, dpi=dpi, poppler_path=poppler_path,
+        tesseract_cmd=tesseract_cmd, max_page_bytes=max_page_bytes, worker_memory_bytes=worker_memory_bytes,
+        use_text_layer=use_text_layer, ocr_cache_dir=ocr_cache_dir, ocr_cache_bytes=ocr_cache_bytes,
+        layoutlm_model=layoutlm_model, layoutlm_backend=layoutlm_backend, nlp_batch_size=nlp_batch_size,
+        nlp_processes=nlp_processes, recognizer_profile=recognizer_profile, region_ocr=region_ocr,
+        region_ocr_threads=region_ocr_threads, preprocessor=preprocessor, template_library=template_library,
+        text_signatures=dedup_index is not None,
+    ) as pool:
+        in_flight = {}
+        jobs_exhausted = False
+        while in_flight or not jobs_exhausted:
+            # Keep the queue topped up without ever submitting more than max_pending tasks
+            while not jobs_exhausted and len(in_flight) < max_pending:
+                job = next(jobs, None)
+                if job is None:
+                    jobs_exhausted = True
+                    break
+                in_flight[pool.submit(scan_pages, job)] = job
+
+            if not in_flight:
+                break
+            done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+            for future in done:
+                job = in_flight.pop(future)
+                try:
+                    outcomes = future.result()
+                except Exception as e:
+                    outcomes = [(file_path, page_index, None, str(e)) for file_path, page_index in job]
+                for file_path, page_index, page, error in outcomes:
+                    if error is None:
+                        if "text_signature" in page:
+                            # First page's OCR words: catches photos of a printout and small edits
+                            text_signatures[file_path] = page.pop("text_signature")
+                            entry, _ = dedup_index.find_text(text_signatures[file_path])
+                            if entry is not None and file_path not in flagged:
+                                flagged[file_path] = entry["file"]
+                                print(f"⚠️ {file_path}: near-duplicate (text) of {entry['file']}")
+                        results[file_path].append(page)
+                    else:
+                        print(f"❌ {file_path} page {page_index + 1} failed: {error}")
+                        errors.setdefault(file_path, []).append(f"page {page_index + 1}: {error}")
+                    pages_done += 1
+                    pending_pages[file_path] -= 1
+                    if pending_pages[file_path] == 0:
+                        file_error = "; ".join(errors.get(file_path, [])) or None
+                        file_pages = results.pop(file_path)
+                        json_path = write_result(output_dir, file_path, file_pages, error=file_error,
+                                                  duplicate_of=flagged.get(file_path))
+                        print(f"✅ {file_path} -> {json_path}")
+                        if results_store is not None:
+                            results_store.append_result(file_path, file_pages, error=file_error,
+                                                        duplicate_of=flagged.get(file_path))
+                        if field_index is not None and file_path not in flagged and not file_error:
+                            # Near-duplicates stay out so a search lists each resume once
+                            field_index.add(file_path, [page["grouped"] for page in file_pages])
+                            field_index.commit()
+                        if file_path in image_signatures and file_path not in flagged and not file_error:
+                            dedup_index.add(image_signatures[file_path], text_signatures.get(file_path),
+                                            {"file": file_path, "result": os.path.abspath(json_path)})
+                        entry = {"file": file_path, "result": json_path}
+                        for duplicate in copies.pop(file_path, []):
+                            if not _reuse_result(output_dir, duplicate, entry):
+                                write_result(output_dir, duplicate, [], duplicate_of=file_path,
+                                              error=f"not scanned: near-duplicate of {file_path}, which failed")
+
+    elapsed = time.perf_counter() - start
+    rate = pages_done / elapsed * 3600 if elapsed else 0.0
+    print(f"\n✅ Scanned {pages_done} page(s) from {len(file_paths)} file(s) in {elapsed:.1f}s ({rate:.0f} pages/hour)")
+
+
+# === Pipeline options shared by the batch CLI and scan_service ===
+def add_pipeline_arguments(parser):
+    parser.add_argument("--nlp-batch-size", type=int, default=32, help="spaCy batch size for Presidio analysis")
+    parser.add_argument("--nlp-processes", type=int, default=1, help="spaCy processes per worker (nlp.pipe n_process)")
+    parser.add_argument("--recognizers", choices=presidio_engine.PROFILES, default="resume",
+                        help="Presidio recognizer profile: full default registry, resume-only, or resume-only "
+                             "with pattern recognizers limited to the template's contact regions")
+    parser.add_argument("--labelstudio-json", default=None,
+                        help="Use regions from a Label Studio export instead of the predefined regions")
+    parser.add_argument("--template-index", type=int, default=0, help="Label Studio task to use as template")
+    parser.add_argument("--template-library", default=None,
+                        help="template_library.npz or a Label Studio export: pick the nearest template per page "
+                             "(falls back to the template above when nothing matches)")
+    parser.add_argument("--template-images", default=None,
+                        help="Task images when --template-library is a Label Studio export (default: next to it)")
+    parser.add_argument("--min-template-score", type=float, default=DEFAULT_MIN_SCORE,
+                        help="Minimum layout correlation for a library template to be used")
+    parser.add_argument("--layoutlm-model", default=None,
+                        help="Group fields with a fine-tuned LayoutLMv3 model directory instead of a template")
+    parser.add_argument("--layoutlm-backend", choices=("pytorch", "onnx", "onnx-int8"), default="pytorch",
+                        help="Runtime for --layoutlm-model (export ONNX first with layoutlm_onnx.py)")
+    parser.add_argument("--ocr-config", default=DEFAULT_OCR_CONFIG, help="Tesseract config string")
+    parser.add_argument("--dpi", type=int, default=300, help="PDF rasterization DPI")
+    parser.add_argument("--poppler-path", default=None, help="Poppler bin directory if not on PATH")
+    parser.add_argument("--tesseract-cmd", default=None, help="Tesseract executable if not on PATH")
+    parser.add_argument("--force-ocr", action="store_true",
+                        help="OCR every PDF page even when it has an embedded text layer")
+    parser.add_argument("--region-ocr", action="store_true",
+                        help="OCR only the template regions (per-region PSM, crops run concurrently); "
+                             "text outside the regions is not scanned. Ignored with --layoutlm-model")
+    parser.add_argument("--region-ocr-threads", type=int, default=None,
+                        help="Concurrent Tesseract crops per page with --region-ocr (default: CPU count)")
+    parser.add_argument("--preprocess", action="store_true",
+                        help="Downscale oversized text and crop empty margins before OCR")
+    parser.add_argument("--target-text-height", type=int, default=DEFAULT_TARGET_TEXT_HEIGHT,
+                        help="Median glyph height in pixels that --preprocess downscales towards")
+    parser.add_argument("--deskew", action="store_true", help="With --preprocess: straighten skewed scans")
+    parser.add_argument("--binarize", choices=("otsu", "adaptive"), default=None,
+                        help="With --preprocess: threshold the page before OCR")
+    parser.add_argument("--ocr-cache", default=None,
+                        help="Directory for the content-addressed OCR cache shared by all workers")
+    parser.add_argument("--ocr-cache-mb", type=int, default=512, help="OCR cache size limit (LRU eviction)")
+    parser.add_argument("--max-page-mb", type=int, default=DEFAULT_MAX_PAGE_BYTES // (1024 * 1024),
+                        help="Largest rendered page per worker; bigger pages are rendered at lower DPI")
+    parser.add_argument("--worker-memory-mb", type=int, default=None,
+                        help="Hard address-space limit per worker process (POSIX only)")
+
+
+def pipeline_options(args):
+    # Keyword arguments for scan_pool / run_batch, with the templates loaded
+    if args.labelstudio_json:
+        template = load_labelstudio_template(args.labelstudio_json, args.template_index)
+    else:
+        template = predefined_template()
+    template_library = None
+    if args.template_library:
+        template_library = load_template_library(
+            args.template_library, image_folder=args.template_images, min_score=args.min_template_score,
+        )
+        print(f"🗂️ {len(template_library)} template(s) in the library")
+
+    return dict(
+        template=template, ocr_config=args.ocr_config,
+        dpi=args.dpi, poppler_path=args.poppler_path, tesseract_cmd=args.tesseract_cmd,
+        max_page_bytes=args.max_page_mb * 1024 * 1024,
+        worker_memory_bytes=args.worker_memory_mb * 1024 * 1024 if args.worker_memory_mb else None,
+        use_text_layer=not args.force_ocr,
+        ocr_cache_dir=args.ocr_cache, ocr_cache_bytes=args.ocr_cache_mb * 1024 * 1024,
+        layoutlm_model=args.layoutlm_model, layoutlm_backend=args.layoutlm_backend,
+        nlp_batch_size=args.nlp_batch_size, nlp_processes=args.nlp_processes,
+        recognizer_profile=args.recognizers, region_ocr=args.region_ocr,
+        region_ocr_threads=args.region_ocr_threads,
+        preprocessor=Preprocessor(
+            target_text_height=args.target_text_height, deskew=args.deskew, binarize=args.binarize,
+        ) if args.preprocess else None,
+        template_library=template_library,
+    )
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Headless batch resume scanner (OCR + Presidio + region grouping).")
+    parser.add_argument("inputs", nargs="+", help="Resume files, directories or glob patterns")
+    parser.add_argument("-o", "--output-dir", required=True, help="Directory for per-file JSON results")
+    parser.add_argument("-w", "--workers", type=int, default=None, help="Worker processes (default: CPU count)")
+    parser.add_argument("--max-pending", type=int, default=None,
+                        help="Maximum tasks queued or in flight (default: 2 x workers)")
+    parser.add_argument("--pages-per-task", type=int, default=8,
+                        help="Pages handed to a worker at once; their texts share one Presidio NLP batch")
+    parser.add_argument("--dedup-index", default=None,
+                        help="Near-duplicate index (.npz, created when missing) checked before scanning "
+                             "and updated with every newly scanned file")
+    parser.add_argument("--dedup-action", choices=("reuse", "flag"), default="reuse",
+                        help="reuse: copy the earlier result instead of scanning; flag: scan anyway and "
+                             "mark the result with duplicate_of")
+    parser.add_argument("--dedup-max-distance", type=int, default=DEFAULT_IMAGE_DISTANCE,
+                        help="Largest first-page dHash distance (of 256 bits) that counts as a duplicate")
+    parser.add_argument("--dedup-min-similarity", type=float, default=DEFAULT_TEXT_SIMILARITY,
+                        help="Smallest first-page word-shingle similarity (MinHash Jaccard) that counts")
+    parser.add_argument("--field-index", default=None,
+                        help="Field search index (SQLite, created when missing) updated with every result; "
+                             "query it with field_index.py")
+    parser.add_argument("--results-store", default=None,
+                        help="Columnar results store (Arrow, created when missing) that every scanned page is "
+                             "appended to; see results_store.py")
+    add_pipeline_arguments(parser)
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    file_paths = collect_inputs(args.inputs)
+    if not file_paths:
+        print("❌ No supported files found.")
+        return 1
+
+    options = pipeline_options(args)
+    dedup_index = None
+    if args.dedup_index:
+        dedup_index = DedupIndex.load(args.dedup_index, image_distance=args.dedup_max_distance,
+                                      text_similarity=args.dedup_min_similarity)
+        print(f"🗂️ {len(dedup_index)} resume(s) in the dedup index")
+    field_index = FieldIndex(args.field_index) if args.field_index else None
+    results_store = ResultsStore(args.results_store, kind="pages") if args.results_store else None
+    print(f"📂 {len(file_paths)} file(s) queued, {args.workers or os.cpu_count()} worker(s)")
+    run_batch(
+        file_paths, args.output_dir, workers=args.workers, max_pending=args.max_pending,
+        pages_per_task=args.pages_per_task, dedup_index=dedup_index, dedup_action=args.dedup_action,
+        field_index=field_index, results_store=results_store, **options,
+    )
+    if dedup_index is not None:
+        dedup_index.save(args.dedup_index)
+    if field_index is not None:
+        field_index.close()
+    if results_store is not None:
+        results_store.close()
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
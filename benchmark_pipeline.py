@@ -0,0 +1,274 @@
+import argparse
+import glob
+import json
+import os
+import platform
+import shutil
+import subprocess
+import tempfile
+import time
+import tracemalloc
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+from PIL import Image
+
+import presidio_engine
+import scan_pipeline
+from ocr_page import DEFAULT_OCR_CONFIG, get_pytesseract, set_tesseract_cmd
+from page_source import PageSource
+from preprocess import Preprocessor
+from presidio_engine import PROFILES
+from region_assign import group_words
+from regions import load_labelstudio_template, predefined_template, scale_regions
+from render_overlay import render_overlay
+
+STAGES = ("rasterize", "ocr", "analyze", "anonymize", "group", "json_write", "render")
+# Outputs of earlier runs in the repo root, not resumes
+SKIP_PREFIXES = ("output_", "debug_")
+
+
+# === Inputs: the sample resumes in the repo plus synthetic multi-page PDFs ===
+def sample_images(folder):
+    paths = sorted(glob.glob(os.path.join(folder, "*.jpg")) + glob.glob(os.path.join(folder, "*.png")))
+    # resume_sample.jpg is an empty placeholder
+    return [path for path in paths
+            if not os.path.basename(path).startswith(SKIP_PREFIXES) and os.path.getsize(path) > 0]
+
+
+def make_pdfs(images, output_dir, count, pages_per_pdf, resolution=150):
+    # Image-only PDFs (no text layer), so every page goes through rasterize + OCR
+    pdfs = []
+    for n in range(count):
+        chosen = [images[(n * pages_per_pdf + i) % len(images)] for i in range(pages_per_pdf)]
+        pages = [Image.open(path).convert("RGB") for path in chosen]
+        pdf_path = os.path.join(output_dir, f"synthetic_{n + 1}_{pages_per_pdf}p.pdf")
+        pages[0].save(pdf_path, save_all=True, append_images=pages[1:], resolution=resolution)
+        for page in pages:
+            page.close()
+        pdfs.append(pdf_path)
+    return pdfs
+
+
+# === Wall time (and, when tracing, peak Python/NumPy memory) per stage ===
+# tracemalloc slows Python code down, so timed passes run without it and a
+# separate pass records memory. Tesseract and Poppler run as subprocesses and
+# their memory is not included; peak RSS of this process is reported apart.
+class StageRecorder:
+    def __init__(self, trace_memory=False):
+        self.trace_memory = trace_memory
+        self.seconds = {stage: 0.0 for stage in STAGES}
+        self.peak_bytes = {stage: 0 for stage in STAGES}
+
+    @contextmanager
+    def stage(self, name):
+        if self.trace_memory:
+            tracemalloc.reset_peak()
+            base = tracemalloc.get_traced_memory()[0]
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.seconds[name] += time.perf_counter() - start
+            if self.trace_memory:
+                self.peak_bytes[name] = max(self.peak_bytes[name], tracemalloc.get_traced_memory()[1] - base)
+
+
+def run_pipeline(file_paths, template, recorder, output_dir, dpi=300, ocr_config=DEFAULT_OCR_CONFIG,
+                 preprocessor=None, region_ocr=False, overlay_format="webp"):
+    # Same steps as batch_scan, one file at a time with its pages' NLP batched
+    pages_done = 0
+    for file_path in file_paths:
+        source = PageSource(file_path, dpi=dpi)
+        ocr_pages, images = [], []
+        for page_index in range(len(source)):
+            with recorder.stage("rasterize"):
+                # PageSource reuses its buffer; keep a copy for the render stage
+                image = source.page(page_index).copy()
+            with recorder.stage("ocr"):
+                ocr_page, _ = scan_pipeline.ocr_image(
+                    image, template, ocr_config=ocr_config, region_ocr=region_ocr, preprocessor=preprocessor,
+                )
+            ocr_pages.append(ocr_page)
+            images.append(image)
+
+        with recorder.stage("analyze"):
+            all_results = scan_pipeline.find_pii(ocr_pages, template)
+        with recorder.stage("anonymize"):
+            all_anonymized = presidio_engine.anonymize_batch([ocr_page.text for ocr_page in ocr_pages], all_results)
+        pages = []
+        with recorder.stage("group"):
+            for ocr_page, results, anonymized in zip(ocr_pages, all_results, all_anonymized):
+                regions = scale_regions(template, ocr_page.width, ocr_page.height)
+                grouped = group_words(ocr_page, regions)
+                pages.append(scan_pipeline.page_result(ocr_page, results, anonymized.text, regions, grouped, {}))
+        with recorder.stage("json_write"):
+            json_path = scan_pipeline.result_path(output_dir, file_path)
+            with open(json_path, "w", encoding="utf-8") as f:
+                json.dump({"file": file_path, "pages": pages}, f, ensure_ascii=False)
+        with recorder.stage("render"):
+            for image, page in zip(images, pages):
+                render_overlay(image, page, fmt=overlay_format)
+        pages_done += len(pages)
+    return pages_done
+
+
+def peak_rss_mb():
+    if os.name != "posix":
+        return None
+    import resource
+
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on Linux, bytes on macOS
+    return peak / (1024 * 1024) if platform.system() == "Darwin" else peak / 1024
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def benchmark(file_paths, template, output_dir, repeats=3, trace_memory=True, **pipeline_options):
+    start = time.perf_counter()
+    presidio_engine.warm_up()
+    engine_load_seconds = time.perf_counter() - start
+
+    # Timed passes; the fastest pass of each stage is reported
+    passes = []
+    for _ in range(max(1, repeats)):
+        recorder = StageRecorder()
+        page_count = run_pipeline(file_paths, template, recorder, output_dir, **pipeline_options)
+        passes.append(recorder.seconds)
+
+    peaks = None
+    if trace_memory:
+        recorder = StageRecorder(trace_memory=True)
+        tracemalloc.start()
+        try:
+            run_pipeline(file_paths, template, recorder, output_dir, **pipeline_options)
+        finally:
+            tracemalloc.stop()
+        peaks = recorder.peak_bytes
+
+    stages = {}
+    for stage in STAGES:
+        timings = sorted(seconds[stage] for seconds in passes)
+        stages[stage] = {
+            "ms_per_page": timings[0] / page_count * 1000,
+            "median_ms_per_page": timings[len(timings) // 2] / page_count * 1000,
+            "peak_mb": peaks[stage] / 1e6 if peaks else None,
+        }
+    return {
+        "meta": {
+            "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "commit": git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "tesseract": str(get_pytesseract().get_tesseract_version()),
+            "files": len(file_paths),
+            "pages": page_count,
+            "repeats": repeats,
+            "profile": presidio_engine.get_profile(),
+        },
+        "engine_load_seconds": engine_load_seconds,
+        "total_ms_per_page": sum(entry["ms_per_page"] for entry in stages.values()),
+        "peak_rss_mb": peak_rss_mb(),
+        "stages": stages,
+    }
+
+
+# === Regression check against a saved report ===
+def compare(report, baseline, tolerance):
+    regressions = []
+    for stage, entry in report["stages"].items():
+        before = baseline.get("stages", {}).get(stage, {}).get("ms_per_page")
+        if not before:
+            continue
+        change = entry["ms_per_page"] / before - 1
+        entry["change_vs_baseline"] = change
+        # Sub-millisecond stages are mostly noise
+        if change > tolerance and entry["ms_per_page"] - before > 1.0:
+            regressions.append(stage)
+    return regressions
+
+
+def print_report(report, regressions=()):
+    meta = report["meta"]
+    print(f"\n[⏱️ Pipeline on {meta['pages']} page(s) from {meta['files']} file(s), best of {meta['repeats']}]")
+    for stage, entry in report["stages"].items():
+        peak = f", peak {entry['peak_mb']:.1f} MB" if entry["peak_mb"] is not None else ""
+        change = f", {entry['change_vs_baseline']:+.0%} vs baseline" if "change_vs_baseline" in entry else ""
+        flag = " ⚠️" if stage in regressions else ""
+        print(f"{stage}: {entry['ms_per_page']:.1f} ms/page (median {entry['median_ms_per_page']:.1f}){peak}"
+              f"{change}{flag}")
+    print(f"total: {report['total_ms_per_page']:.0f} ms/page, engines loaded in {report['engine_load_seconds']:.1f}s")
+    if report["peak_rss_mb"] is not None:
+        print(f"peak RSS: {report['peak_rss_mb']:.0f} MB (this process, excluding Tesseract/Poppler)")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Per-stage timing and memory of the scan pipeline on the sample resumes.")
+    parser.add_argument("--samples", default=".", help="Folder with the sample *.jpg / *.png resumes")
+    parser.add_argument("--limit", type=int, default=None, help="Use only the first N sample images")
+    parser.add_argument("--pdfs", type=int, default=2, help="Synthetic image-only PDFs built from the samples")
+    parser.add_argument("--pdf-pages", type=int, default=3, help="Pages per synthetic PDF")
+    parser.add_argument("--repeats", type=int, default=3, help="Timed passes; the fastest is reported per stage")
+    parser.add_argument("--no-memory", action="store_true", help="Skip the tracemalloc pass")
+    parser.add_argument("--labelstudio-json", default=None, help="Region template (default: predefined_regions)")
+    parser.add_argument("--template-index", type=int, default=0)
+    parser.add_argument("--recognizers", choices=PROFILES, default="resume")
+    parser.add_argument("--dpi", type=int, default=300, help="PDF rasterization DPI")
+    parser.add_argument("--ocr-config", default=DEFAULT_OCR_CONFIG)
+    parser.add_argument("--preprocess", action="store_true", help="Use the default Preprocessor before OCR")
+    parser.add_argument("--region-ocr", action="store_true")
+    parser.add_argument("--overlay-format", choices=("webp", "jpeg"), default="webp")
+    parser.add_argument("--tesseract-cmd", default=None)
+    parser.add_argument("--json", default=None, help="Write the report to this file")
+    parser.add_argument("--baseline", default=None, help="Earlier --json report to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.15,
+                        help="Slowdown per stage vs --baseline that counts as a regression (0.15 = 15%%)")
+    args = parser.parse_args(argv)
+
+    if args.tesseract_cmd:
+        set_tesseract_cmd(args.tesseract_cmd)
+    images = sample_images(args.samples)[:args.limit]
+    if not images:
+        print("❌ No sample images found.")
+        return 1
+    if args.labelstudio_json:
+        template = load_labelstudio_template(args.labelstudio_json, args.template_index)
+    else:
+        template = predefined_template()
+    presidio_engine.set_profile(args.recognizers)
+
+    work_dir = tempfile.mkdtemp(prefix="benchmark_pipeline_")
+    try:
+        file_paths = images + make_pdfs(images, work_dir, args.pdfs, args.pdf_pages)
+        report = benchmark(
+            file_paths, template, work_dir, repeats=args.repeats, trace_memory=not args.no_memory,
+            dpi=args.dpi, ocr_config=args.ocr_config, preprocessor=Preprocessor() if args.preprocess else None,
+            region_ocr=args.region_ocr, overlay_format=args.overlay_format,
+        )
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    regressions = []
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            regressions = compare(report, json.load(f), args.tolerance)
+    print_report(report, regressions)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=4)
+    if regressions:
+        print(f"❌ Slower than baseline: {', '.join(regressions)}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
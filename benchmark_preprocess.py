@@ -0,0 +1,116 @@
+import argparse
+import json
+import os
+import time
+from collections import Counter
+
+import cv2
+
+from ocr_page import DEFAULT_OCR_CONFIG, run_ocr, set_tesseract_cmd
+from preprocess import Preprocessor
+
+# === Settings compared: the old color input first, then each step switched on ===
+SETTINGS = {
+    "color (no preprocessing)": None,
+    "grayscale": dict(normalize=False, crop=False),
+    "grayscale + crop": dict(normalize=False),
+    "grayscale + normalize + crop": dict(),
+    "+ deskew": dict(deskew=True),
+    "+ otsu": dict(binarize="otsu"),
+    "+ adaptive": dict(binarize="adaptive"),
+}
+
+
+# === Sample resumes in the repo, with their labeled words as reference ===
+def load_samples(dataset_path, image_folder, limit=None):
+    with open(dataset_path, "r", encoding="utf-8") as f:
+        samples = json.load(f)
+    pages = []
+    for sample in samples[:limit]:
+        image_path = os.path.join(image_folder, sample["image_file"])
+        image = cv2.imread(image_path)
+        if image is None:
+            print(f"⚠️ Missing image skipped: {image_path}")
+            continue
+        pages.append((sample["image_file"], image, Counter(word.lower() for word in sample["tokens"])))
+    return pages
+
+
+def word_accuracy(ocr_page, reference):
+    # Share of reference words (with multiplicity) that OCR read back exactly
+    found = Counter(word.lower() for word in ocr_page.words)
+    total = sum(reference.values())
+    return sum((found & reference).values()) / total if total else 0.0
+
+
+def benchmark(pages, settings=SETTINGS, config=DEFAULT_OCR_CONFIG, upscale=1.0):
+    report = {}
+    for name, options in settings.items():
+        preprocessor = Preprocessor(**options) if options is not None else None
+        preprocess_seconds = ocr_seconds = 0.0
+        image_bytes = 0
+        accuracies = []
+        for _, image, reference in pages:
+            if upscale != 1.0:
+                image = cv2.resize(image, None, fx=upscale, fy=upscale, interpolation=cv2.INTER_CUBIC)
+
+            start = time.perf_counter()
+            processed, transform = preprocessor(image) if preprocessor is not None else (image, None)
+            preprocess_seconds += time.perf_counter() - start
+            image_bytes += processed.nbytes
+
+            start = time.perf_counter()
+            ocr_page = run_ocr(processed, config=config)
+            ocr_seconds += time.perf_counter() - start
+            if transform is not None:
+                ocr_page = transform.restore(ocr_page)
+            accuracies.append(word_accuracy(ocr_page, reference))
+
+        report[name] = {
+            "preprocess_ms_per_page": preprocess_seconds / len(pages) * 1000,
+            "ocr_ms_per_page": ocr_seconds / len(pages) * 1000,
+            "megabytes_per_page": image_bytes / len(pages) / 1e6,
+            "word_accuracy": sum(accuracies) / len(accuracies),
+        }
+    return report
+
+
+def print_report(report, page_count):
+    print(f"\n[⏱️ OCR preprocessing on {page_count} page(s)]")
+    for name, entry in report.items():
+        print(
+            f"{name}: {entry['ocr_ms_per_page']:.0f} ms OCR + {entry['preprocess_ms_per_page']:.0f} ms prep/page, "
+            f"{entry['megabytes_per_page']:.2f} MB to Tesseract, word accuracy {entry['word_accuracy']:.1%}"
+        )
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="OCR time vs word accuracy for each preprocessing setting.")
+    parser.add_argument("--dataset", default="layoutlmv3_dataset.json",
+                        help="Labeled samples; their tokens are the reference words")
+    parser.add_argument("--image-folder", default=".")
+    parser.add_argument("--limit", type=int, default=None)
+    parser.add_argument("--upscale", type=float, default=1.0,
+                        help="Resize samples first, e.g. 2.0 to mimic 300 DPI renders of the 150 DPI samples")
+    parser.add_argument("--ocr-config", default=DEFAULT_OCR_CONFIG)
+    parser.add_argument("--tesseract-cmd", default=None)
+    parser.add_argument("--json", default=None, help="Also write the report to this file")
+    args = parser.parse_args(argv)
+
+    if args.tesseract_cmd:
+        set_tesseract_cmd(args.tesseract_cmd)
+    pages = load_samples(args.dataset, args.image_folder, args.limit)
+    if not pages:
+        print("❌ No sample images found.")
+        return 1
+
+    report = benchmark(pages, config=args.ocr_config, upscale=args.upscale)
+    print_report(report, len(pages))
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=4)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
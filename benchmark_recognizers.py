@@ -0,0 +1,147 @@
+import argparse
+import json
+import os
+import time
+
+import numpy as np
+from PIL import Image
+
+import layoutlm_labels
+import presidio_engine
+import scan_pipeline
+from ocr_page import OcrPage
+from presidio_engine import PROFILES
+from regions import load_labelstudio_template, predefined_template
+
+# Words under these labels are real PII: a detection touching one is a true positive
+PII_LABELS = set(layoutlm_labels.PII_LABELS)
+# Recall is measured on the candidate's own contact fields
+CONTACT_LABELS = {"B-NAME", "B-PHONE_NUMBER", "B-EMAIL1", "B-EMAIL2"}
+
+
+# === Labeled pages from layoutlmv3_dataset.json, rebuilt as OcrPages ===
+def dataset_pages(dataset_path, image_folder):
+    with open(dataset_path, "r", encoding="utf-8") as f:
+        if dataset_path.endswith(".jsonl"):
+            samples = [json.loads(line) for line in f if line.strip()]
+        else:
+            samples = json.load(f)
+
+    pages, gold = [], []
+    for sample in samples:
+        if not sample["tokens"]:
+            continue
+        bboxes = np.asarray(sample["bboxes"], dtype=np.int64).reshape(-1, 4)
+        image_path = os.path.join(image_folder, sample["image_file"])
+        if os.path.exists(image_path):
+            with Image.open(image_path) as image:
+                width, height = image.size
+        else:
+            width, height = int(bboxes[:, 2].max()) + 1, int(bboxes[:, 3].max()) + 1
+
+        # Tokens are in OCR reading order; a jump back to the left starts a new line
+        line_ids = np.cumsum(np.r_[0, np.diff(bboxes[:, 0]) < 0]) + 1
+        count = len(sample["tokens"])
+        pages.append(OcrPage(
+            sample["tokens"], np.c_[bboxes[:, :2], bboxes[:, 2:] - bboxes[:, :2]], [100.0] * count,
+            [1] * count, [1] * count, line_ids, width, height,
+        ))
+        gold.append(sample["labels"])
+    return pages, gold
+
+
+def score(pages, gold, all_results):
+    detections = true_positives = 0
+    false_positives = {}
+    contact_words = covered_contact_words = 0
+    for ocr_page, labels, results in zip(pages, gold, all_results):
+        covered = set()
+        for entity in results:
+            word_ids = ocr_page.word_indices_for_span(entity.start, entity.end).tolist()
+            covered.update(word_ids)
+            detections += 1
+            if any(labels[i] in PII_LABELS for i in word_ids):
+                true_positives += 1
+            else:
+                false_positives[entity.entity_type] = false_positives.get(entity.entity_type, 0) + 1
+        contact = [i for i, label in enumerate(labels) if label in CONTACT_LABELS]
+        contact_words += len(contact)
+        covered_contact_words += sum(1 for i in contact if i in covered)
+    return {
+        "detections": detections,
+        "precision": true_positives / detections if detections else 0.0,
+        "contact_recall": covered_contact_words / contact_words if contact_words else 0.0,
+        "false_positives": dict(sorted(false_positives.items(), key=lambda item: -item[1])),
+    }
+
+
+# === Latency and precision of each recognizer profile on the same pages ===
+def benchmark(pages, gold, template, profiles=PROFILES, repeats=3, batch_size=32):
+    report = {}
+    for profile in profiles:
+        presidio_engine.set_profile(profile)
+        start = time.perf_counter()
+        presidio_engine.warm_up()
+        load_seconds = time.perf_counter() - start
+
+        timings = []
+        for _ in range(repeats):
+            start = time.perf_counter()
+            all_results = scan_pipeline.find_pii(pages, template, batch_size=batch_size)
+            timings.append(time.perf_counter() - start)
+
+        entry = score(pages, gold, all_results)
+        entry["load_seconds"] = load_seconds
+        entry["ms_per_page"] = min(timings) / len(pages) * 1000
+        entry["recognizers"] = len(presidio_engine.get_analyzer().registry.recognizers)
+        report[profile] = entry
+    return report
+
+
+def print_report(report, page_count):
+    print(f"\n[⏱️ Recognizer profiles on {page_count} page(s)]")
+    baseline = report.get("default", {}).get("ms_per_page")
+    for profile, entry in report.items():
+        speedup = f", {baseline / entry['ms_per_page']:.1f}x vs default" if baseline and profile != "default" else ""
+        print(
+            f"{profile}: {entry['ms_per_page']:.1f} ms/page{speedup}, "
+            f"{entry['recognizers']} recognizers (load {entry['load_seconds']:.1f}s), "
+            f"precision {entry['precision']:.1%} on {entry['detections']} detections, "
+            f"contact recall {entry['contact_recall']:.1%}"
+        )
+        if entry["false_positives"]:
+            top = ", ".join(f"{entity} x{count}" for entity, count in list(entry["false_positives"].items())[:5])
+            print(f"    false positives: {top}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compare Presidio recognizer profiles on the labeled resumes.")
+    parser.add_argument("--dataset", default="layoutlmv3_dataset.json")
+    parser.add_argument("--image-folder", default=".", help="Only used to read page sizes")
+    parser.add_argument("--labelstudio-json", default=None,
+                        help="Region template for resume-scoped (default: predefined_regions)")
+    parser.add_argument("--template-index", type=int, default=0)
+    parser.add_argument("--profiles", nargs="+", choices=PROFILES, default=list(PROFILES))
+    parser.add_argument("--repeats", type=int, default=3, help="Timed passes per profile; the fastest is reported")
+    parser.add_argument("--json", default=None, help="Also write the report to this file")
+    args = parser.parse_args(argv)
+
+    pages, gold = dataset_pages(args.dataset, args.image_folder)
+    if not pages:
+        print("❌ No labeled pages found.")
+        return 1
+    if args.labelstudio_json:
+        template = load_labelstudio_template(args.labelstudio_json, args.template_index)
+    else:
+        template = predefined_template()
+
+    report = benchmark(pages, gold, template, profiles=args.profiles, repeats=args.repeats)
+    print_report(report, len(pages))
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=4)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,147 @@
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+# Entry points, in the order an intake hook would reach for them
+TARGETS = ("scan_worker", "batch_scan", "scan_service", "field_index", "scan_pipeline", "presidio_engine")
+# Packages that should only load when their stage runs
+HEAVY = ("pandas", "tkinter", "cv2", "pdfplumber", "pdf2image", "pytesseract", "presidio_analyzer",
+         "presidio_anonymizer", "spacy", "torch", "transformers", "onnxruntime", "pyarrow")
+
+
+# === Import cost of one module in a fresh interpreter (python -X importtime) ===
+# Lines look like "import time:   self [us] | cumulative | <indent>package";
+# self times are summed per top-level package to show where start-up goes.
+def import_profile(module, python=sys.executable):
+    # Failed optional imports (pytesseract trying pandas) are listed too, so
+    # what actually loaded is read from sys.modules
+    code = f"import sys, {module}; print(' '.join(name for name in {HEAVY!r} if name in sys.modules))"
+    proc = subprocess.run([python, "-X", "importtime", "-c", code], capture_output=True, text=True, cwd=HERE)
+    total_us, packages = 0, {}
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "[us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        package = name.strip().split(".")[0]
+        packages[package] = packages.get(package, 0) + int(self_us)
+        if name.strip() == module:
+            total_us = int(cumulative_us)
+    profile = {
+        "import_ms": total_us / 1000,
+        "top_packages": [
+            {"package": package, "ms": us / 1000}
+            for package, us in sorted(packages.items(), key=lambda item: -item[1])[:8]
+        ],
+        "heavy_loaded": proc.stdout.split(),
+    }
+    if proc.returncode != 0:
+        errors = [line for line in proc.stderr.splitlines() if not line.startswith("import time:")]
+        profile["error"] = errors[-1] if errors else f"exit code {proc.returncode}"
+    return profile
+
+
+def wall_ms(argv, repeats=5):
+    # Fastest of `repeats` runs: start-up noise only ever adds time
+    best = None
+    for _ in range(repeats):
+        start = time.perf_counter()
+        subprocess.run(argv, capture_output=True, cwd=HERE)
+        elapsed = (time.perf_counter() - start) * 1000
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def engine_load_seconds(python=sys.executable, profile="resume"):
+    # Presidio + spaCy start-up: what a long-lived worker pays once instead of per file.
+    # Returns the error message when the engines cannot load.
+    code = ("import time, presidio_engine; presidio_engine.set_profile(%r); s = time.perf_counter(); "
+            "presidio_engine.warm_up(); print(time.perf_counter() - s)" % profile)
+    proc = subprocess.run([python, "-c", code], capture_output=True, text=True, cwd=HERE)
+    if proc.returncode != 0:
+        return proc.stderr.strip().splitlines()[-1]
+    return float(proc.stdout.strip().splitlines()[-1])
+
+
+def per_resume_ms(resume, port, repeats=3):
+    # One resume end to end: a fresh batch_scan process vs. a running scan_worker
+    output_dir = tempfile.mkdtemp(prefix="benchmark_startup_")
+    cold = wall_ms([sys.executable, "batch_scan.py", resume, "-o", output_dir, "-w", "1"], repeats=repeats)
+    warm = None
+    if port:
+        warm = wall_ms([sys.executable, "scan_worker.py", "send", resume, "--port", str(port),
+                        "-o", output_dir], repeats=repeats)
+    return {"one_shot_ms": cold, "worker_ms": warm}
+
+
+def benchmark(targets, repeats=5, engines=False, resume=None, port=None):
+    baseline = wall_ms([sys.executable, "-c", "pass"], repeats=repeats)
+    modules = {}
+    for module in targets:
+        profile = import_profile(module)
+        profile["wall_ms"] = wall_ms([sys.executable, "-c", f"import {module}"], repeats=repeats) - baseline
+        modules[module] = profile
+    return {
+        "meta": {
+            "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "repeats": repeats,
+        },
+        "interpreter_ms": baseline,
+        "modules": modules,
+        "engine_load_seconds": engine_load_seconds() if engines else None,
+        "per_resume": per_resume_ms(resume, port) if resume else None,
+    }
+
+
+def print_report(report):
+    print(f"\n[⏱️ Start-up, Python {report['meta']['python']}, bare interpreter {report['interpreter_ms']:.0f} ms]")
+    for module, profile in report["modules"].items():
+        if "error" in profile:
+            print(f"{module}: ❌ {profile['error']}")
+            continue
+        heavy = ", ".join(profile["heavy_loaded"]) or "none"
+        top = ", ".join(f"{entry['package']} {entry['ms']:.0f}" for entry in profile["top_packages"][:4])
+        print(f"{module}: {profile['wall_ms']:.0f} ms wall, {profile['import_ms']:.0f} ms importtime "
+              f"(heavy: {heavy}; top: {top})")
+    engines = report["engine_load_seconds"]
+    if isinstance(engines, str):
+        print(f"Presidio engines: ❌ {engines}")
+    elif engines is not None:
+        print(f"Presidio engines: {engines:.1f}s to load (once per worker process)")
+    if report["per_resume"]:
+        per_resume = report["per_resume"]
+        line = f"One resume: {per_resume['one_shot_ms'] / 1000:.1f}s as a fresh batch_scan run"
+        if per_resume["worker_ms"] is not None:
+            line += f", {per_resume['worker_ms'] / 1000:.1f}s through a running scan_worker"
+        print(line)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Import and start-up time of the scanner entry points.")
+    parser.add_argument("modules", nargs="*", default=list(TARGETS), help="Modules to import (default: entry points)")
+    parser.add_argument("--repeats", type=int, default=5, help="Runs per measurement; the fastest is reported")
+    parser.add_argument("--engines", action="store_true", help="Also time loading the Presidio engines")
+    parser.add_argument("--resume", default=None, help="Also time scanning this file end to end")
+    parser.add_argument("--port", type=int, default=None,
+                        help="With --resume: port of a running `scan_worker.py serve` to compare against")
+    parser.add_argument("--json", default=None, help="Write the report to this file")
+    args = parser.parse_args(argv)
+
+    report = benchmark(args.modules, repeats=args.repeats, engines=args.engines, resume=args.resume, port=args.port)
+    print_report(report)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=4)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
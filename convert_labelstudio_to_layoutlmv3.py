@@ -1,99 +1,261 @@
+import hashlib
 import json
-import pytesseract
 import cv2
 import os
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from tqdm import tqdm
+from ocr_cache import OcrCache
+from ocr_page import run_ocr, set_tesseract_cmd
+from region_assign import first_region
+from results_store import ResultsStore
 
-# === Set up Tesseract path ===
-pytesseract.pytesseract.tesseract_cmd = r"C:\Program Files\Tesseract-OCR\tesseract.exe"
+# === Set up Tesseract path (applied in the OCR workers) ===
+TESSERACT_CMD = r"C:\Program Files\Tesseract-OCR\tesseract.exe"
 
 # === Customize paths ===
 labelstudio_json_path = r"C:\Users\User\Downloads\PresidioResumeScanner\project-10-at-2025-08-22-11-57-ff7c134a.json"
 image_folder = r"C:\Users\User\Downloads\PresidioResumeScanner\PresidioResumeScanner\resume_images"
-output_path = "layoutlmv3_dataset.json"
+output_jsonl_path = "layoutlmv3_dataset.jsonl"  # One sample per line, written as tasks finish (also the checkpoint)
+output_path = "layoutlmv3_dataset.json"  # Legacy single-file export, rebuilt from the JSONL at the end
+output_store_dir = "layoutlmv3_store"  # Columnar (Arrow) copy read by the training loaders; None disables it
+ocr_cache_dir = ".ocr_cache"  # Shared with the scanners; re-runs skip Tesseract for unchanged images
+num_workers = os.cpu_count() or 1
+write_legacy_json = True
 
 # === Label Studio to LayoutLMv3 label mapping ===
 def convert_label(label):
     return f"B-{label.upper().replace(' ', '_')}"
 
-# === Load exported Label Studio JSON ===
-if not os.path.exists(labelstudio_json_path):
-    raise FileNotFoundError(f"❌ Cannot find label file at: {labelstudio_json_path}")
 
-with open(labelstudio_json_path, "r", encoding="utf-8") as f:
-    data = json.load(f)
+# === A task is redone only when its image bytes or its annotations change ===
+def task_fingerprint(task, image_path):
+    digest = hashlib.sha256()
+    digest.update(json.dumps(task.get("label", []), sort_keys=True).encode("utf-8"))
+    with open(image_path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
 
-samples = []
 
-for task in tqdm(data, desc="🔄 Processing labeled resumes"):
-    # Resolve full image path
-    image_name = os.path.basename(task["image"])
-    image_path = os.path.join(image_folder, image_name)
+# === Worker process state ===
+_worker = {}
 
-    if not os.path.exists(image_path):
-        print(f"⚠️ Image not found: {image_path} — skipping.")
-        continue
 
+def _init_worker(tesseract_cmd, cache_dir):
+    set_tesseract_cmd(tesseract_cmd)
+    _worker["ocr_cache"] = OcrCache(cache_dir) if cache_dir else None
+
+
+def convert_task(task, image_path, fingerprint):
+    image_name = os.path.basename(image_path)
     image = cv2.imread(image_path)
     if image is None:
-        print(f"❌ OpenCV could not read image: {image_path} — skipping.")
-        continue
+        raise ValueError(f"OpenCV could not read image: {image_path}")
 
     # === Run OCR with Tesseract ===
-    try:
-        ocr_data = pytesseract.image_to_data(image, output_type=pytesseract.Output.DICT)
-    except Exception as e:
-        print(f"❌ OCR failed on image: {image_path} — {str(e)}")
-        continue
-
-    tokens, bboxes, labels = [], [], []
+    ocr_page = run_ocr(image, config="", cache=_worker.get("ocr_cache"))
     img_h, img_w = image.shape[:2]
 
-    for i in range(len(ocr_data["text"])):
-        word = ocr_data["text"][i].strip()
-        if not word or int(ocr_data["conf"][i]) < 60:
+    # Keep words with confidence >= 60 (Tesseract reports it as an integer-ish string)
+    keep = np.flatnonzero(np.trunc(ocr_page.confs) >= 60)
+    word_boxes = ocr_page.boxes[keep].astype(np.float64)
+    box_centers = word_boxes[:, :2] + word_boxes[:, 2:] / 2
+
+    # === Region rectangles for this task, computed once ===
+    region_labels, region_boxes = [], []
+    for region in task.get("label", []):
+        # Convert percentage → absolute pixel coords
+        x1 = int(region["x"] / 100 * region["original_width"])
+        y1 = int(region["y"] / 100 * region["original_height"])
+        x2 = int((region["x"] + region["width"]) / 100 * region["original_width"])
+        y2 = int((region["y"] + region["height"]) / 100 * region["original_height"])
+
+        # Scale to actual OpenCV image size
+        scale_x = img_w / region["original_width"]
+        scale_y = img_h / region["original_height"]
+        region_labels.append(convert_label(region["rectanglelabels"][0]))
+        region_boxes.append((int(x1 * scale_x), int(y1 * scale_y), int(x2 * scale_x), int(y2 * scale_y)))
+
+    # === Assign every word to its first containing region in one batched pass ===
+    region_ids = first_region(box_centers, np.asarray(region_boxes).reshape(-1, 4))
+
+    return {
+        "tokens": [ocr_page.words[i] for i in keep],
+        "bboxes": [[x, y, x + w, y + h] for x, y, w, h in ocr_page.boxes[keep].tolist()],
+        "labels": [region_labels[r] if r >= 0 else "O" for r in region_ids.tolist()],
+        "image_file": image_name,
+        "fingerprint": fingerprint,
+    }
+
+
+# === Tombstones: tasks that failed OCR or gave no tokens ===
+# Written to the checkpoint like a sample, so the task is not retried until
+# its image or annotations change, and it supersedes the task's previous
+# sample. compact_jsonl() moves them to a side file next to the dataset.
+def tombstone(image_name, fingerprint, error):
+    return {"image_file": image_name, "fingerprint": fingerprint, "error": error}
+
+
+def is_tombstone(record):
+    return "error" in record
+
+
+def skipped_path(jsonl_path):
+    return os.path.splitext(jsonl_path)[0] + ".skipped.jsonl"
+
+
+def _read_records(jsonl_path):
+    if not os.path.exists(jsonl_path):
+        return
+    with open(jsonl_path, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            yield record, line if line.endswith("\n") else line + "\n"
+
+
+def _latest_records(jsonl_path):
+    # Side file first: anything the dataset JSONL holds for a task is newer
+    latest = {}
+    for path in (skipped_path(jsonl_path), jsonl_path):
+        for record, line in _read_records(path):
+            latest[record["image_file"]] = (record, line)
+    return latest
+
+
+# === Checkpoint: samples and tombstones already written, keyed by image file ===
+def load_done(jsonl_path):
+    if not os.path.exists(jsonl_path):
+        return {record["image_file"]: record.get("fingerprint")
+                for record, _ in _read_records(skipped_path(jsonl_path))}
+
+    # A run killed mid-write can leave a torn last line; cut it off before appending again
+    with open(jsonl_path, "rb+") as f:
+        content = f.read()
+        if content and not content.endswith(b"\n"):
+            f.truncate(content.rfind(b"\n") + 1)
+
+    return {image_name: record.get("fingerprint") for image_name, (record, _) in _latest_records(jsonl_path).items()}
+
+
+# === Keep only the latest sample per current task, in task order ===
+# Tasks whose latest record is a tombstone leave the dataset and are kept in
+# the side file instead
+def compact_jsonl(jsonl_path, task_order):
+    latest = _latest_records(jsonl_path)
+    count = 0
+    tmp_path = jsonl_path + ".tmp"
+    tmp_skipped_path = skipped_path(jsonl_path) + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f, open(tmp_skipped_path, "w", encoding="utf-8") as skipped:
+        for image_name in task_order:
+            if image_name not in latest:
+                continue
+            record, line = latest[image_name]
+            if is_tombstone(record):
+                skipped.write(line)
+            else:
+                f.write(line)
+                count += 1
+    os.replace(tmp_path, jsonl_path)
+    os.replace(tmp_skipped_path, skipped_path(jsonl_path))
+    return count
+
+
+def dataset_samples(jsonl_path):
+    # Samples of the dataset JSONL, never its tombstones
+    for record, _ in _read_records(jsonl_path):
+        if not is_tombstone(record):
+            yield record
+
+
+def export_legacy_json(jsonl_path, json_path):
+    # Streams samples one by one so the whole dataset is never held in memory
+    with open(json_path, "w", encoding="utf-8") as dst:
+        dst.write("[")
+        for i, sample in enumerate(dataset_samples(jsonl_path)):
+            sample.pop("fingerprint", None)
+            dst.write(("," if i else "") + "\n" + json.dumps(sample, ensure_ascii=False))
+        dst.write("\n]\n")
+
+
+# === Columnar copy of the dataset: only new or changed samples are appended ===
+def sync_store(jsonl_path, store_dir):
+    store = ResultsStore(store_dir, kind="samples")
+    stored = store.read(columns=["image_file", "fingerprint"]).to_pylist()
+    fingerprints = {row["image_file"]: row["fingerprint"] for row in stored}
+    task_order = []
+    for sample in dataset_samples(jsonl_path):
+        task_order.append(sample["image_file"])
+        if fingerprints.get(sample["image_file"]) != sample.get("fingerprint"):
+            store.append_sample(sample)
+    # One part, in task order, without removed or tombstoned tasks
+    store.compact(keep=task_order)
+    return len(store)
+
+
+def main():
+    # === Load exported Label Studio JSON ===
+    if not os.path.exists(labelstudio_json_path):
+        raise FileNotFoundError(f"❌ Cannot find label file at: {labelstudio_json_path}")
+
+    with open(labelstudio_json_path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+
+    # === Work out which tasks are new or changed ===
+    done = load_done(output_jsonl_path)
+    jobs, task_order = [], []
+    for task in data:
+        # Resolve full image path
+        image_name = os.path.basename(task["image"])
+        image_path = os.path.join(image_folder, image_name)
+
+        if not os.path.exists(image_path):
+            print(f"⚠️ Image not found: {image_path} — skipping.")
             continue
 
-        x, y, w, h = ocr_data["left"][i], ocr_data["top"][i], ocr_data["width"][i], ocr_data["height"][i]
-        box_center = (x + w / 2, y + h / 2)
-
-        assigned_label = "O"  # Default label
-
-        for region in task.get("label", []):
-            label = region["rectanglelabels"][0]
-
-            # Convert percentage → absolute pixel coords
-            x1 = int(region["x"] / 100 * region["original_width"])
-            y1 = int(region["y"] / 100 * region["original_height"])
-            x2 = int((region["x"] + region["width"]) / 100 * region["original_width"])
-            y2 = int((region["y"] + region["height"]) / 100 * region["original_height"])
-
-            # Scale to actual OpenCV image size
-            scale_x = img_w / region["original_width"]
-            scale_y = img_h / region["original_height"]
-            x1, x2 = int(x1 * scale_x), int(x2 * scale_x)
-            y1, y2 = int(y1 * scale_y), int(y2 * scale_y)
-
-            if x1 <= box_center[0] <= x2 and y1 <= box_center[1] <= y2:
-                assigned_label = convert_label(label)
-                break
-
-        tokens.append(word)
-        bboxes.append([x, y, x + w, y + h])
-        labels.append(assigned_label)
-
-    if tokens:
-        samples.append({
-            "tokens": tokens,
-            "bboxes": bboxes,
-            "labels": labels,
-            "image_file": image_name
-        })
-    else:
-        print(f"⚠️ No valid tokens extracted for: {image_path}")
-
-# === Save as LayoutLMv3 training JSON ===
-with open(output_path, "w", encoding="utf-8") as f:
-    json.dump(samples, f, indent=4, ensure_ascii=False)
-
-print(f"\n✅ Dataset saved to: {output_path} ({len(samples)} samples)")
+        task_order.append(image_name)
+        fingerprint = task_fingerprint(task, image_path)
+        if done.get(image_name) != fingerprint:
+            jobs.append((task, image_path, fingerprint))
+
+    print(f"🔄 {len(jobs)} task(s) to convert, {len(task_order) - len(jobs)} unchanged")
+
+    # === OCR in parallel and stream finished samples to the JSONL ===
+    if jobs:
+        with ProcessPoolExecutor(
+            max_workers=num_workers, initializer=_init_worker, initargs=(TESSERACT_CMD, ocr_cache_dir),
+        ) as pool, open(output_jsonl_path, "a", encoding="utf-8") as out:
+            futures = {pool.submit(convert_task, *job): job for job in jobs}
+            for future in tqdm(as_completed(futures), total=len(futures), desc="🔄 Processing labeled resumes"):
+                _, image_path, fingerprint = futures[future]
+                try:
+                    sample = future.result()
+                except Exception as e:
+                    print(f"❌ OCR failed on image: {image_path} — {str(e)}")
+                    sample = tombstone(os.path.basename(image_path), fingerprint, str(e))
+                else:
+                    if not sample["tokens"]:
+                        print(f"⚠️ No valid tokens extracted for: {image_path}")
+                        sample = tombstone(sample["image_file"], fingerprint, "no tokens")
+                out.write(json.dumps(sample, ensure_ascii=False) + "\n")
+                out.flush()
+
+    # === Drop superseded/removed samples and refresh the legacy JSON export ===
+    if not os.path.exists(output_jsonl_path):
+        print("⚠️ No samples converted.")
+        return
+    count = compact_jsonl(output_jsonl_path, task_order)
+    print(f"\n✅ Dataset saved to: {output_jsonl_path} ({count} samples)")
+    if write_legacy_json:
+        export_legacy_json(output_jsonl_path, output_path)
+        print(f"✅ Legacy JSON written to: {output_path}")
+    if output_store_dir:
+        count = sync_store(output_jsonl_path, output_store_dir)
+        print(f"✅ Columnar dataset saved to: {output_store_dir} ({count} samples)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,283 @@
+import argparse
+import hashlib
+import json
+import os
+import re
+import time
+
+import cv2
+import numpy as np
+
+from page_source import PageSource
+
+# 16 x 16 difference hash of the first page = 256 bits, split into 16 LSH bands
+# of 16 bits: any page within 15 bits shares at least one band with its match.
+# On the sample resumes re-encodes/rescales stay within 14 bits while distinct
+# resumes (even on one template) are 22+ apart; an 8 x 8 hash cannot tell
+# two resumes on the same template apart.
+IMAGE_HASH_SIZE = 16
+IMAGE_BANDS = 16
+DEFAULT_IMAGE_DISTANCE = 14
+# MinHash of word 2-shingles: 64 values in 16 bands of 4. A pair with Jaccard
+# 0.7 becomes a candidate with probability ~0.98, one with 0.1 with ~0.002.
+MINHASH_PERMUTATIONS = 64
+MINHASH_BANDS = 16
+DEFAULT_TEXT_SIMILARITY = 0.7
+# Thumbnail ceiling for the first-page hash; JPEGs decode at reduced size
+THUMBNAIL_BYTES = 512 * 1024
+
+_MERSENNE_PRIME = (1 << 61) - 1
+# Fixed seed: signatures must stay comparable across runs and saved indexes
+_rng = np.random.default_rng(0x5CA9)
+_PERM_A = _rng.integers(1, 1 << 29, MINHASH_PERMUTATIONS, dtype=np.uint64)
+_PERM_B = _rng.integers(0, 1 << 29, MINHASH_PERMUTATIONS, dtype=np.uint64)
+_TOKEN = re.compile(r"\w{2,}")
+# XOR-ed into each band's keys so all bands can share one sorted array
+_BAND_SALT = _rng.integers(0, 2 ** 63, max(IMAGE_BANDS, MINHASH_BANDS), dtype=np.uint64) << np.uint64(1)
+
+
+# === Signatures ===
+def image_signature(image):
+    # dHash: sign of the horizontal gradient on a 17 x 16 thumbnail, packed into 4 uint64.
+    # Area averaging, not strided sampling: thin text lines alias badly otherwise
+    if image.ndim == 3:
+        image = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+    thumb = cv2.resize(image, (IMAGE_HASH_SIZE + 1, IMAGE_HASH_SIZE), interpolation=cv2.INTER_AREA)
+    bits = thumb[:, 1:] > thumb[:, :-1]
+    return np.packbits(bits.ravel()).view(np.uint64).copy()
+
+
+def text_signature(words):
+    # MinHash over lowercased word 2-shingles; None when there is no text
+    tokens = [token for word in words for token in _TOKEN.findall(word.lower())]
+    if not tokens:
+        return None
+    shingles = {" ".join(tokens[i:i + 2]) for i in range(max(1, len(tokens) - 1))}
+    hashes = np.fromiter(
+        (int.from_bytes(hashlib.blake2b(s.encode("utf-8"), digest_size=4).digest(), "little") for s in shingles),
+        dtype=np.uint64, count=len(shingles),
+    )
+    # (a * x + b) mod p for every permutation at once; a, b < 2^29 and x < 2^32 keep it in uint64
+    permuted = (hashes[:, None] * _PERM_A + _PERM_B) % np.uint64(_MERSENNE_PRIME)
+    return (permuted.min(axis=0) & np.uint64(0xFFFFFFFF)).astype(np.uint32)
+
+
+def first_page_signature(file_path, poppler_path=None):
+    # Only a small render of page 1 is needed: PDFs at 36 DPI, images decoded small
+    source = PageSource(file_path, dpi=36, poppler_path=poppler_path, max_page_bytes=THUMBNAIL_BYTES)
+    return image_signature(source.page(0))
+
+
+def _image_band_keys(signatures):
+    return signatures.reshape(len(signatures), -1).view(np.uint16).astype(np.uint64)
+
+
+def _text_band_keys(signatures):
+    rows = signatures.reshape(len(signatures), MINHASH_BANDS, -1).astype(np.uint64)
+    # Fold the 4 values of a band into one 64-bit key
+    keys = rows[:, :, 0]
+    for i in range(1, rows.shape[2]):
+        keys = keys * np.uint64(0x9E3779B97F4A7C15) ^ rows[:, :, i]
+    return keys
+
+
+def _popcount(words):
+    return np.unpackbits(words.view(np.uint8), axis=-1).sum(axis=-1)
+
+
+# === Banded LSH table over a growing set of rows ===
+# The (salted) keys of all bands live in one sorted array with their row
+# numbers, so a lookup is two vectorised searchsorted calls. Rows added since
+# the last merge sit in a short unsorted tail that is compared directly; the
+# tail is sorted and merged in once it grows past 1/64 of the table, which
+# keeps inserts amortised cheap and lookups well under a millisecond.
+class _BandTable:
+    def __init__(self, bands):
+        self.bands = bands
+        self.keys = np.zeros((0, bands), dtype=np.uint64)
+        self.count = 0
+        self._sorted_keys = np.zeros(0, dtype=np.uint64)
+        self._rows = np.zeros(0, dtype=np.int64)
+        self._indexed = 0
+
+    def salted(self, keys):
+        return keys ^ _BAND_SALT[:self.bands]
+
+    def add(self, keys):
+        if self.count == len(self.keys):
+            grown = np.zeros((max(1024, len(self.keys) * 2), self.bands), dtype=np.uint64)
+            grown[:self.count] = self.keys[:self.count]
+            self.keys = grown
+        self.keys[self.count] = self.salted(keys)
+        self.count += 1
+        if self.count - self._indexed > max(1024, self._indexed // 64):
+            self.reindex()
+
+    def reindex(self):
+        # Merge the tail into the sorted array: a small sort plus one O(n) insert
+        tail = self.keys[self._indexed:self.count].ravel()
+        order = np.argsort(tail)
+        positions = np.searchsorted(self._sorted_keys, tail[order])
+        self._sorted_keys = np.insert(self._sorted_keys, positions, tail[order])
+        self._rows = np.insert(self._rows, positions, self._indexed + order // self.bands)
+        self._indexed = self.count
+
+    def candidates(self, keys):
+        keys = self.salted(keys)
+        starts = np.searchsorted(self._sorted_keys, keys, side="left")
+        stops = np.searchsorted(self._sorted_keys, keys, side="right")
+        found = [self._rows[start:stop] for start, stop in zip(starts.tolist(), stops.tolist()) if stop > start]
+        tail = self.keys[self._indexed:self.count]
+        if len(tail):
+            found.append(self._indexed + np.flatnonzero((tail == keys).any(axis=1)))
+        return np.unique(np.concatenate(found)) if found else np.zeros(0, dtype=np.int64)
+
+
+# === Near-duplicate index of scanned resumes ===
+# Two signatures per resume: the first page's dHash (cheap, before any OCR;
+# catches re-exports and re-compressions of the same file) and a MinHash of
+# its OCR words (after OCR; catches phone photos of a printout and small
+# edits). Each entry keeps what the scanner wrote for it, so a duplicate can
+# reuse that result. Saved as one .npz; band tables are rebuilt on load.
+class DedupIndex:
+    def __init__(self, image_distance=DEFAULT_IMAGE_DISTANCE, text_similarity=DEFAULT_TEXT_SIMILARITY):
+        self.image_distance = image_distance
+        self.text_similarity = text_similarity
+        self.entries = []
+        self.image_signatures = np.zeros((0, IMAGE_HASH_SIZE * IMAGE_HASH_SIZE // 64), dtype=np.uint64)
+        self.text_signatures = np.zeros((0, MINHASH_PERMUTATIONS), dtype=np.uint32)
+        self.has_text = np.zeros(0, dtype=bool)
+        self._image_table = _BandTable(IMAGE_BANDS)
+        self._text_table = _BandTable(MINHASH_BANDS)
+
+    def __len__(self):
+        return len(self.entries)
+
+    @staticmethod
+    def _grow(array):
+        # Amortised growth; only the first len(entries) rows are valid
+        return np.concatenate([array, np.zeros((max(1024, len(array)), *array.shape[1:]), dtype=array.dtype)])
+
+    def add(self, image_sig, text_sig, entry):
+        index = len(self.entries)
+        if index == len(self.image_signatures):
+            self.image_signatures = self._grow(self.image_signatures)
+            self.text_signatures = self._grow(self.text_signatures)
+            self.has_text = self._grow(self.has_text)
+        image_sig = np.asarray(image_sig, dtype=np.uint64)
+        text_sig = np.asarray(text_sig, dtype=np.uint32) if text_sig is not None else None
+        self.image_signatures[index] = image_sig
+        self._image_table.add(_image_band_keys(image_sig[None])[0])
+        self.has_text[index] = text_sig is not None
+        if text_sig is not None:
+            self.text_signatures[index] = text_sig
+            self._text_table.add(_text_band_keys(text_sig[None])[0])
+        else:
+            # Keep row numbers aligned with entries; this key matches no real band
+            self._text_table.add(np.full(MINHASH_BANDS, np.iinfo(np.uint64).max, dtype=np.uint64))
+        self.entries.append(entry)
+        return index
+
+    def find_image(self, image_sig):
+        # (entry, Hamming distance) of the closest first page within image_distance, else (None, None)
+        candidates = self._image_table.candidates(_image_band_keys(image_sig[None])[0])
+        if not len(candidates):
+            return None, None
+        distances = _popcount(self.image_signatures[candidates] ^ image_sig)
+        best = int(np.argmin(distances))
+        if distances[best] > self.image_distance:
+            return None, None
+        return self.entries[candidates[best]], int(distances[best])
+
+    def find_text(self, text_sig):
+        # (entry, estimated Jaccard similarity) of the closest text above text_similarity, else (None, None)
+        if text_sig is None:
+            return None, None
+        text_sig = np.asarray(text_sig, dtype=np.uint32)
+        candidates = self._text_table.candidates(_text_band_keys(text_sig[None])[0])
+        candidates = candidates[self.has_text[candidates]]
+        if not len(candidates):
+            return None, None
+        similarity = (self.text_signatures[candidates] == text_sig).mean(axis=1)
+        best = int(np.argmax(similarity))
+        if similarity[best] < self.text_similarity:
+            return None, None
+        return self.entries[candidates[best]], float(similarity[best])
+
+    def save(self, path):
+        # Written next to the target and swapped in, so a crash never leaves half an index
+        # The sorted band arrays are saved too, so loading never re-sorts
+        count = len(self.entries)
+        self._image_table.reindex()
+        self._text_table.reindex()
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "wb") as f:
+            np.savez(
+                f, image_signatures=self.image_signatures[:count], text_signatures=self.text_signatures[:count],
+                has_text=self.has_text[:count], entries=np.array(json.dumps(self.entries)),
+                image_sorted_keys=self._image_table._sorted_keys, image_rows=self._image_table._rows,
+                text_sorted_keys=self._text_table._sorted_keys, text_rows=self._text_table._rows,
+            )
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path, image_distance=DEFAULT_IMAGE_DISTANCE, text_similarity=DEFAULT_TEXT_SIMILARITY):
+        # Missing file -> empty index, so the first run creates it
+        index = cls(image_distance=image_distance, text_similarity=text_similarity)
+        if not os.path.exists(path):
+            return index
+        with np.load(path) as data:
+            index.image_signatures = data["image_signatures"].copy()
+            index.text_signatures = data["text_signatures"].copy()
+            index.has_text = data["has_text"].copy()
+            index.entries = json.loads(str(data["entries"]))
+            sorted_bands = {name: data[name] for name in ("image_sorted_keys", "image_rows",
+                                                          "text_sorted_keys", "text_rows")}
+
+        count = len(index.entries)
+        text_keys = _text_band_keys(index.text_signatures)
+        text_keys[~index.has_text] = np.iinfo(np.uint64).max
+        for prefix, table, keys in (("image", index._image_table, _image_band_keys(index.image_signatures)),
+                                    ("text", index._text_table, text_keys)):
+            table.keys, table.count = table.salted(keys), count
+            table._sorted_keys = sorted_bands[f"{prefix}_sorted_keys"]
+            table._rows = sorted_bands[f"{prefix}_rows"]
+            table._indexed = count
+        return index
+
+
+# === CLI: check files against an index, or add them ===
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Near-duplicate resume index (first-page dHash + OCR-word MinHash).")
+    parser.add_argument("index", help="dedup_index.npz (created when missing)")
+    parser.add_argument("files", nargs="*", help="Resumes to check by their first page")
+    parser.add_argument("--add", action="store_true", help="Add files that are not duplicates to the index")
+    parser.add_argument("--max-distance", type=int, default=DEFAULT_IMAGE_DISTANCE,
+                        help="Largest first-page dHash distance (of 256 bits) that counts as a duplicate")
+    parser.add_argument("--poppler-path", default=None)
+    args = parser.parse_args(argv)
+
+    index = DedupIndex.load(args.index, image_distance=args.max_distance)
+    print(f"🗂️ {len(index)} resume(s) indexed")
+    for file_path in args.files:
+        try:
+            signature = first_page_signature(file_path, poppler_path=args.poppler_path)
+        except Exception as e:
+            print(f"❌ {file_path}: {e}")
+            continue
+        start = time.perf_counter()
+        entry, distance = index.find_image(signature)
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        if entry is not None:
+            print(f"♻️ {file_path}: duplicate of {entry['file']} (distance {distance}, {elapsed_ms:.2f} ms)")
+        else:
+            print(f"🆕 {file_path}: no duplicate ({elapsed_ms:.2f} ms)")
+            if args.add:
+                index.add(signature, None, {"file": file_path})
+    if args.add:
+        index.save(args.index)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
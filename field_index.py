@@ -0,0 +1,411 @@
+import argparse
+import json
+import math
+import os
+import re
+import sqlite3
+import time
+
+import numpy as np
+
+# Personal-detail fields of both label sets (Label Studio regions, LayoutLM): never indexed, never returned
+from layoutlm_labels import PII_FIELDS
+
+STOPWORDS = frozenset(("a", "am", "an", "and", "as", "at", "by", "for", "i", "in", "is", "my", "of", "on",
+                       "the", "to", "with"))
+DEFAULT_LIMIT = 20
+# BM25 parameters
+K1 = 1.2
+B = 0.75
+# New postings of a term are appended to its blob once this many rows (and
+# at least 1/64 of the term's postings) sit outside it
+PACK_MIN_ROWS = 256
+POSTING_DTYPE = np.dtype([("doc", "<u4"), ("tf", "<u2"), ("length", "<u2")])
+
+_EMAIL_OR_URL = re.compile(r"\S+@\S+|https?://\S+|www\.\S+", re.IGNORECASE)
+# Keeps c++, c#, node.js and .net together; hyphens and slashes split
+_TOKEN = re.compile(r"\.?[a-z0-9][a-z0-9+#]*(?:\.[a-z0-9+#]+)*")
+_CLAUSE = re.compile(r"^\s*(.+?)\s+contains\s+(.+?)\s*$", re.IGNORECASE)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS fields (
+    id INTEGER PRIMARY KEY, name TEXT NOT NULL UNIQUE COLLATE NOCASE,
+    docs INTEGER NOT NULL DEFAULT 0, total_length INTEGER NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS docs (id INTEGER PRIMARY KEY AUTOINCREMENT, file TEXT NOT NULL UNIQUE, pages INTEGER);
+CREATE TABLE IF NOT EXISTS lengths (
+    doc_id INTEGER NOT NULL, field_id INTEGER NOT NULL, length INTEGER NOT NULL,
+    PRIMARY KEY (doc_id, field_id)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS terms (
+    id INTEGER PRIMARY KEY, field_id INTEGER NOT NULL, term TEXT NOT NULL, df INTEGER NOT NULL DEFAULT 0,
+    packed BLOB, packed_upto INTEGER NOT NULL DEFAULT 0, unpacked INTEGER NOT NULL DEFAULT 0,
+    UNIQUE (field_id, term)
+);
+CREATE TABLE IF NOT EXISTS postings (
+    term_id INTEGER NOT NULL, doc_id INTEGER NOT NULL, tf INTEGER NOT NULL, length INTEGER NOT NULL,
+    PRIMARY KEY (term_id, doc_id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS postings_doc ON postings (doc_id);
+CREATE TABLE IF NOT EXISTS dead (doc_id INTEGER PRIMARY KEY);
+"""
+
+
+# === Tokens of one field: lowercase words, no e-mails, URLs or bare numbers ===
+def tokenize(text):
+    tokens = _TOKEN.findall(_EMAIL_OR_URL.sub(" ", (text or "").lower()))
+    return [token for token in tokens if token not in STOPWORDS and any(c.isalpha() for c in token)]
+
+
+def merge_pages(grouped_pages):
+    # One resume = the text of every page, per field
+    fields = {}
+    for grouped in grouped_pages:
+        for label, text in (grouped or {}).items():
+            if text:
+                fields.setdefault(label, []).append(text)
+    return {label: " ".join(texts) for label, texts in fields.items()}
+
+
+def parse_query(query):
+    # "Skills contains Python AND Languages contains Malay" -> [("Skills", ["python"]), ("Languages", ["malay"])]
+    # Several words in one clause must all be in that field.
+    clauses = []
+    for part in re.split(r"\s+AND\s+", query.strip(), flags=re.IGNORECASE):
+        match = _CLAUSE.match(part)
+        if not match:
+            raise ValueError(f"Expected '<field> contains <words>', got: {part!r}")
+        field, words = match.group(1).strip("\"' "), tokenize(match.group(2).strip("\"'"))
+        if not words:
+            raise ValueError(f"Nothing searchable in: {part!r}")
+        clauses.append((field, words))
+    return clauses
+
+
+# === Inverted index over grouped region text, one document per resume file ===
+# Every (field, term) has its postings as rows, so adding or replacing a
+# resume touches a few hundred rows. Terms shared by many resumes also keep
+# a sorted numpy blob (doc id, tf, field length) that new rows are appended to
+# whenever enough pile up; a query reads each term's blob plus the few rows
+# added since, and intersects and scores whole arrays at once. Replaced
+# resumes are masked out of the blobs until optimize().
+class FieldIndex:
+    def __init__(self, path, pack_min_rows=PACK_MIN_ROWS):
+        self.path = path
+        self.pack_min_rows = pack_min_rows
+        self.db = sqlite3.connect(path)
+        # WAL lets scan_service or the CLI query while a scanner is writing
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=NORMAL")
+        self.db.execute("PRAGMA cache_size=-65536")
+        self.db.executescript(SCHEMA)
+        self._touched = set()
+
+    def __len__(self):
+        return self.db.execute("SELECT COUNT(*) FROM docs").fetchone()[0]
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        self.commit()
+        self.db.close()
+
+    def _field_id(self, name):
+        row = self.db.execute("SELECT id FROM fields WHERE name = ?", (name,)).fetchone()
+        if row:
+            return row[0]
+        return self.db.execute("INSERT INTO fields (name) VALUES (?)", (name,)).lastrowid
+
+    def remove(self, file_path):
+        row = self.db.execute("SELECT id FROM docs WHERE file = ?", (file_path,)).fetchone()
+        if row is None:
+            return False
+        doc_id = row[0]
+        self.db.execute(
+            "UPDATE terms SET df = df - 1, unpacked = unpacked - (packed_upto < ?) "
+            "WHERE id IN (SELECT term_id FROM postings WHERE doc_id = ?)", (doc_id, doc_id),
+        )
+        self.db.execute(
+            "UPDATE fields SET docs = docs - 1, total_length = total_length - "
+            "(SELECT length FROM lengths WHERE doc_id = ? AND field_id = fields.id) "
+            "WHERE id IN (SELECT field_id FROM lengths WHERE doc_id = ?)", (doc_id, doc_id),
+        )
+        packed = self.db.execute(
+            "SELECT 1 FROM postings JOIN terms ON terms.id = postings.term_id "
+            "WHERE postings.doc_id = ? AND terms.packed_upto >= ? LIMIT 1", (doc_id, doc_id),
+        ).fetchone()
+        if packed:
+            self.db.execute("INSERT OR IGNORE INTO dead (doc_id) VALUES (?)", (doc_id,))
+        self.db.execute("DELETE FROM postings WHERE doc_id = ?", (doc_id,))
+        self.db.execute("DELETE FROM lengths WHERE doc_id = ?", (doc_id,))
+        self.db.execute("DELETE FROM docs WHERE id = ?", (doc_id,))
+        return True
+
+    def add(self, file_path, grouped_pages):
+        # Replaces an earlier entry for the same file (a re-scan)
+        self.remove(file_path)
+        fields = merge_pages(grouped_pages)
+        pii_tokens = {token for label in PII_FIELDS for token in tokenize(fields.get(label))}
+        doc_id = self.db.execute("INSERT INTO docs (file, pages) VALUES (?, ?)",
+                                 (file_path, len(grouped_pages))).lastrowid
+
+        for label, text in fields.items():
+            if label in PII_FIELDS:
+                continue
+            # Names or places that leak into other regions stay out as well
+            tokens = [token for token in tokenize(text) if token not in pii_tokens]
+            if not tokens:
+                continue
+            field_id = self._field_id(label)
+            length = min(len(tokens), 0xFFFF)
+            self.db.execute("INSERT INTO lengths (doc_id, field_id, length) VALUES (?, ?, ?)",
+                            (doc_id, field_id, length))
+            self.db.execute("UPDATE fields SET docs = docs + 1, total_length = total_length + ? WHERE id = ?",
+                            (length, field_id))
+            counts = {}
+            for token in tokens:
+                counts[token] = counts.get(token, 0) + 1
+            self.db.executemany(
+                "INSERT INTO terms (field_id, term, df, unpacked) VALUES (?, ?, 1, 1) "
+                "ON CONFLICT (field_id, term) DO UPDATE SET df = df + 1, unpacked = unpacked + 1",
+                [(field_id, term) for term in counts],
+            )
+            term_ids = dict(self.db.execute(
+                f"SELECT term, id FROM terms WHERE field_id = ? AND term IN ({','.join('?' * len(counts))})",
+                (field_id, *counts),
+            ))
+            self.db.executemany(
+                "INSERT INTO postings (term_id, doc_id, tf, length) VALUES (?, ?, ?, ?)",
+                [(term_ids[term], doc_id, min(tf, 0xFFFF), length) for term, tf in counts.items()],
+            )
+            self._touched.update(term_ids.values())
+        return doc_id
+
+    def commit(self):
+        # Append the new rows of terms that gathered enough of them to their blob, then commit
+        if self._touched:
+            dead = self._dead()
+            ids = list(self._touched)
+            for i in range(0, len(ids), 500):
+                chunk = ids[i:i + 500]
+                rows = self.db.execute(
+                    f"SELECT id, packed, packed_upto FROM terms WHERE id IN ({','.join('?' * len(chunk))}) "
+                    f"AND unpacked >= MAX(?, df / 64)", (*chunk, self.pack_min_rows),
+                ).fetchall()
+                for term_id, packed, packed_upto in rows:
+                    self._pack(term_id, self._postings(term_id, packed, packed_upto, dead))
+            self._touched.clear()
+        self.db.commit()
+
+    def _pack(self, term_id, postings):
+        upto = int(postings["doc"][-1]) if len(postings) else 0
+        self.db.execute("UPDATE terms SET packed = ?, packed_upto = ?, unpacked = 0 WHERE id = ?",
+                        (postings.tobytes(), upto, term_id))
+
+    def optimize(self):
+        # Pack every term and drop replaced resumes from the blobs; run after big imports
+        dead = self._dead()
+        for term_id, packed, packed_upto in self.db.execute(
+            "SELECT id, packed, packed_upto FROM terms WHERE df > 0 AND (unpacked > 0 OR ?)", (len(dead),),
+        ).fetchall():
+            self._pack(term_id, self._postings(term_id, packed, packed_upto, dead))
+        self.db.execute("DELETE FROM terms WHERE df <= 0")
+        self.db.execute("DELETE FROM dead")
+        self._touched.clear()
+        self.db.commit()
+        self.db.execute("VACUUM")
+
+    def _dead(self):
+        return np.array([doc_id for (doc_id,) in self.db.execute("SELECT doc_id FROM dead")], dtype=np.uint32)
+
+    def _postings(self, term_id, packed, packed_upto, dead):
+        # Sorted by doc id: the blob, then rows of resumes added after it was packed
+        parts = []
+        if packed:
+            parts.append(np.frombuffer(packed, dtype=POSTING_DTYPE))
+            if len(dead):
+                parts[0] = parts[0][~np.isin(parts[0]["doc"], dead)]
+        recent = self.db.execute(
+            "SELECT doc_id, tf, length FROM postings WHERE term_id = ? AND doc_id > ? ORDER BY doc_id",
+            (term_id, packed_upto),
+        ).fetchall()
+        if recent:
+            parts.append(np.array(recent, dtype=[("doc", "<i8"), ("tf", "<i8"), ("length", "<i8")])
+                         .astype(POSTING_DTYPE))
+        if not parts:
+            return np.empty(0, dtype=POSTING_DTYPE)
+        return np.concatenate(parts) if len(parts) > 1 else parts[0]
+
+    def search(self, query, limit=DEFAULT_LIMIT):
+        # Ranked [{"file", "score"}]; no field text is ever returned
+        clauses = parse_query(query) if isinstance(query, str) else query
+        total_docs = len(self)
+        dead = self._dead()
+
+        terms = []
+        for field, words in clauses:
+            if field.lower() in (label.lower() for label in PII_FIELDS):
+                raise ValueError(f"{field} holds personal details and is not indexed")
+            row = self.db.execute("SELECT id, docs, total_length, name FROM fields WHERE name = ?",
+                                  (field,)).fetchone()
+            if row is None or not row[1]:
+                return []
+            field_id, field_docs, total_length, name = row
+            for word in dict.fromkeys(words):
+                term = self.db.execute(
+                    "SELECT id, df, packed, packed_upto FROM terms WHERE field_id = ? AND term = ?",
+                    (field_id, word),
+                ).fetchone()
+                if term is None or term[1] <= 0:
+                    return []
+                terms.append((term, name, word, total_length / field_docs))
+
+        # Rarest term first keeps every intersection small; only the survivors are scored
+        terms.sort(key=lambda entry: entry[0][1])
+        postings = [self._postings(term_id, packed, packed_upto, dead)
+                    for (term_id, _, packed, packed_upto), _, _, _ in terms]
+        docs = np.ascontiguousarray(postings[0]["doc"])
+        rows = [np.arange(len(docs))]
+        for other in postings[1:]:
+            other_docs = np.ascontiguousarray(other["doc"])
+            if not len(docs) or not len(other_docs):
+                return []
+            if len(docs) * 16 < len(other_docs):
+                # Few candidates: binary search in the (sorted) longer list
+                positions = np.searchsorted(other_docs, docs).clip(max=len(other_docs) - 1)
+                found = other_docs[positions] == docs
+            else:
+                # Two long lists: a doc id -> position table beats searching
+                lookup = np.full(max(int(docs[-1]), int(other_docs[-1])) + 1, -1, dtype=np.int32)
+                lookup[other_docs] = np.arange(len(other_docs), dtype=np.int32)
+                positions = lookup[docs]
+                found = positions >= 0
+            docs = docs[found]
+            rows = [r[found] for r in rows] + [positions[found]]
+        if not len(docs):
+            return []
+
+        scores = np.zeros(len(docs), dtype=np.float32)
+        for ((_, df, _, _), _, _, avg_length), term_postings, term_rows in zip(terms, postings, rows):
+            matched = term_postings[term_rows]
+            idf = math.log(1 + (total_docs - df + 0.5) / (df + 0.5))
+            tf = matched["tf"].astype(np.float32)
+            norm = K1 * (1 - B + B * matched["length"].astype(np.float32) / avg_length)
+            scores += idf * tf * (K1 + 1) / (tf + norm)
+
+        top = np.argpartition(-scores, limit)[:limit] if len(docs) > limit else np.arange(len(docs))
+        top = top[np.argsort(-scores[top], kind="stable")]
+        doc_ids = docs[top].tolist()
+        files = dict(self.db.execute(
+            f"SELECT id, file FROM docs WHERE id IN ({','.join('?' * len(doc_ids))})", doc_ids,
+        ))
+        return [{"file": files[doc_id], "score": round(float(scores[i]), 4)}
+                for doc_id, i in zip(doc_ids, top.tolist())]
+
+    def fields(self):
+        return [name for (name,) in self.db.execute("SELECT name FROM fields WHERE docs > 0 ORDER BY name")]
+
+
+# === Grouped outputs already on disk: batch results or the scanners' per-page files ===
+def grouped_from_result(result_json):
+    # Returns (resume file, [grouped per page]) or None for failed/duplicate results
+    with open(result_json, "r", encoding="utf-8") as f:
+        result = json.load(f)
+    if isinstance(result, dict) and "pages" in result:
+        if result.get("error") or not result["pages"]:
+            return None
+        return result["file"], [page.get("grouped", {}) for page in result["pages"]]
+    # grouped_output_<name>_pageN.json from the interactive scanners: one page per file
+    match = re.match(r"grouped_output_(.+)_page(\d+)\.json$", os.path.basename(result_json))
+    if match is None:
+        return None
+    return match.group(1), [result]
+
+
+def grouped_from_store(store_dir):
+    # {resume file: [grouped per page]} from a results_store directory, failed/duplicate results left out
+    from results_store import ResultsStore
+
+    rows = ResultsStore(store_dir, kind="pages").read(
+        columns=["file", "page", "grouped", "error", "duplicate_of"]).to_pylist()
+    documents = {}
+    for row in sorted((row for row in rows if row["page"] is not None), key=lambda row: row["page"]):
+        documents.setdefault(row["file"], []).append(row)
+    return {file_path: [dict(row["grouped"] or []) for row in pages] for file_path, pages in documents.items()
+            if not any(row["error"] or row["duplicate_of"] for row in pages)}
+
+
+def index_results(index, result_jsons):
+    # Pages of one resume spread over several grouped_output files are merged
+    documents = {}
+    for result_json in result_jsons:
+        if os.path.isdir(result_json):
+            documents.update(grouped_from_store(result_json))
+            continue
+        try:
+            entry = grouped_from_result(result_json)
+        except (OSError, ValueError) as e:
+            print(f"⚠️ Skipped {result_json}: {e}")
+            continue
+        if entry is not None:
+            documents.setdefault(entry[0], []).extend(entry[1])
+    for file_path, grouped_pages in documents.items():
+        index.add(file_path, grouped_pages)
+    index.commit()
+    return len(documents)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Search grouped resume fields, e.g. "
+                                                 "\"Skills contains Python AND Languages contains Malay\".")
+    parser.add_argument("--index", default="field_index.sqlite", help="Index database (created when missing)")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    add_parser = subparsers.add_parser("add", help="Index batch_scan results, grouped_output_*.json files or "
+                                                   "a results_store directory")
+    add_parser.add_argument("results", nargs="+")
+    add_parser.add_argument("--optimize", action="store_true", help="Repack all postings afterwards")
+
+    query_parser = subparsers.add_parser("query", help="Ranked resumes matching every clause")
+    query_parser.add_argument("query")
+    query_parser.add_argument("-n", "--limit", type=int, default=DEFAULT_LIMIT)
+    query_parser.add_argument("--json", action="store_true", help="Print the results as JSON")
+
+    subparsers.add_parser("fields", help="List the searchable fields")
+
+    args = parser.parse_args(argv)
+    with FieldIndex(args.index) as index:
+        if args.command == "add":
+            start = time.perf_counter()
+            count = index_results(index, args.results)
+            if args.optimize:
+                index.optimize()
+            print(f"✅ Indexed {count} resume(s) in {time.perf_counter() - start:.1f}s, {len(index)} in total")
+            return 0
+
+        if args.command == "fields":
+            print("\n".join(index.fields()))
+            return 0
+
+        start = time.perf_counter()
+        try:
+            results = index.search(args.query, limit=args.limit)
+        except ValueError as e:
+            print(f"❌ {e}")
+            return 1
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        if args.json:
+            print(json.dumps(results, indent=4, ensure_ascii=False))
+        else:
+            print(f"[🔍 {len(results)} result(s) in {elapsed_ms:.1f} ms]")
+            for rank, result in enumerate(results, 1):
+                print(f"{rank}. {result['file']} (score {result['score']:.2f})")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
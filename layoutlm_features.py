@@ -0,0 +1,166 @@
+import hashlib
+import json
+import os
+from multiprocessing import Pool
+
+import numpy as np
+import torch
+from PIL import Image
+
+from layoutlm_labels import label_id, normalize_box
+
+FEATURE_STORE_VERSION = 1
+DEFAULT_PROCESSOR = "microsoft/layoutlmv3-base"
+MAX_SEQ_LENGTH = 512
+IMAGE_SIZE = 224
+IGNORE_LABEL = -100
+
+
+# === Dataset samples from layoutlmv3_dataset.json, the converter's .jsonl or its results store ===
+def load_samples(dataset_path):
+    if os.path.isdir(dataset_path):
+        # Columnar store: only the training columns are read, straight from the mapped files
+        from results_store import SAMPLE_FIELDS, ResultsStore
+
+        return ResultsStore(dataset_path, kind="samples").read(columns=list(SAMPLE_FIELDS)).to_pylist()
+    with open(dataset_path, "r", encoding="utf-8") as f:
+        if dataset_path.endswith(".jsonl"):
+            return [json.loads(line) for line in f if line.strip()]
+        return json.load(f)
+
+
+# === Fingerprint: dataset contents + images + processor + encoding settings ===
+def feature_fingerprint(samples, image_folder, processor_name=DEFAULT_PROCESSOR, max_length=MAX_SEQ_LENGTH):
+    digest = hashlib.sha256()
+    digest.update(f"v{FEATURE_STORE_VERSION}|{processor_name}|{max_length}".encode("utf-8"))
+    digest.update(json.dumps(samples, sort_keys=True, ensure_ascii=False).encode("utf-8"))
+    for sample in samples:
+        stat = os.stat(os.path.join(image_folder, sample["image_file"]))
+        digest.update(f"{sample['image_file']}|{stat.st_size}|{stat.st_mtime_ns}".encode("utf-8"))
+    return digest.hexdigest()[:16]
+
+
+# === Multiprocess encoding straight into the memory-mapped arrays ===
+_encoder = {}
+
+
+def _init_encoder(processor_name, store_dir, image_folder, max_length):
+    from transformers import LayoutLMv3Processor
+
+    _encoder["processor"] = LayoutLMv3Processor.from_pretrained(processor_name, apply_ocr=False)
+    _encoder["image_folder"] = image_folder
+    _encoder["max_length"] = max_length
+    _encoder["arrays"] = {
+        name: np.load(os.path.join(store_dir, f"{name}.npy"), mmap_mode="r+")
+        for name in ("input_ids", "bbox", "labels", "lengths", "pixel_values")
+    }
+
+
+def _encode_into_store(job):
+    row, sample = job
+    processor = _encoder["processor"]
+    arrays = _encoder["arrays"]
+    image = Image.open(os.path.join(_encoder["image_folder"], sample["image_file"])).convert("RGB")
+    boxes = [normalize_box(box, image.width, image.height) for box in sample["bboxes"]]
+
+    # word_labels aligns word labels to subwords: first subword keeps the label, the rest are ignored
+    encoding = processor(
+        images=image,
+        text=sample["tokens"],
+        boxes=boxes,
+        word_labels=[label_id(label) for label in sample["labels"]],
+        truncation=True,
+        max_length=_encoder["max_length"],
+        return_tensors="np",
+    )
+    length = encoding["input_ids"].shape[1]
+    arrays["input_ids"][row, :length] = encoding["input_ids"][0]
+    arrays["bbox"][row, :length] = encoding["bbox"][0]
+    arrays["labels"][row, :length] = encoding["labels"][0]
+    arrays["lengths"][row] = length
+    arrays["pixel_values"][row] = encoding["pixel_values"][0].astype(np.float16)
+    return row
+
+
+def build_feature_store(samples, image_folder, store_root, processor_name=DEFAULT_PROCESSOR,
+                        max_length=MAX_SEQ_LENGTH, num_workers=None, pad_token_id=1):
+    fingerprint = feature_fingerprint(samples, image_folder, processor_name, max_length)
+    store_dir = os.path.join(store_root, fingerprint)
+    if os.path.exists(os.path.join(store_dir, "meta.json")):
+        print(f"♻️ Reusing encoded features: {store_dir}")
+        return store_dir
+
+    tmp_dir = store_dir + ".partial"
+    os.makedirs(tmp_dir, exist_ok=True)
+    count = len(samples)
+    shapes = {
+        "input_ids": ((count, max_length), np.int32, pad_token_id),
+        "bbox": ((count, max_length, 4), np.int16, 0),
+        "labels": ((count, max_length), np.int16, IGNORE_LABEL),
+        "lengths": ((count,), np.int32, 0),
+        "pixel_values": ((count, 3, IMAGE_SIZE, IMAGE_SIZE), np.float16, 0),
+    }
+    for name, (shape, dtype, fill) in shapes.items():
+        array = np.lib.format.open_memmap(os.path.join(tmp_dir, f"{name}.npy"), mode="w+", dtype=dtype, shape=shape)
+        array[...] = fill
+        array.flush()
+        del array
+
+    num_workers = num_workers or os.cpu_count() or 1
+    with Pool(num_workers, initializer=_init_encoder,
+              initargs=(processor_name, tmp_dir, image_folder, max_length)) as pool:
+        for done, _ in enumerate(pool.imap_unordered(_encode_into_store, enumerate(samples), chunksize=4), 1):
+            if done % 50 == 0 or done == count:
+                print(f"🔄 Encoded {done}/{count}")
+
+    with open(os.path.join(tmp_dir, "meta.json"), "w", encoding="utf-8") as f:
+        json.dump({
+            "fingerprint": fingerprint, "count": count, "max_length": max_length,
+            "processor": processor_name, "image_files": [sample["image_file"] for sample in samples],
+        }, f)
+    os.replace(tmp_dir, store_dir)
+    print(f"✅ Encoded features saved to: {store_dir}")
+    return store_dir
+
+
+# === Training dataset reading straight from the memory-mapped store ===
+class FeatureStoreDataset(torch.utils.data.Dataset):
+    def __init__(self, store_dir):
+        self.store_dir = store_dir
+        with open(os.path.join(store_dir, "meta.json"), "r", encoding="utf-8") as f:
+            self.meta = json.load(f)
+        self._arrays = None
+
+    def _open(self):
+        # Opened lazily so each DataLoader worker maps the files itself
+        if self._arrays is None:
+            self._arrays = {
+                name: np.load(os.path.join(self.store_dir, f"{name}.npy"), mmap_mode="r")
+                for name in ("input_ids", "bbox", "labels", "lengths", "pixel_values")
+            }
+        return self._arrays
+
+    def __getstate__(self):
+        # Never pickle the memmaps into DataLoader workers; they re-open the files
+        state = dict(self.__dict__)
+        state["_arrays"] = None
+        return state
+
+    def __len__(self):
+        return self.meta["count"]
+
+    @property
+    def lengths(self):
+        # True (unpadded) sequence lengths, used by the length-grouped sampler
+        return self._open()["lengths"]
+
+    def __getitem__(self, index):
+        # Rows are returned unpadded; DynamicPaddingCollator pads each batch
+        arrays = self._open()
+        length = int(arrays["lengths"][index])
+        return {
+            "input_ids": torch.as_tensor(arrays["input_ids"][index, :length], dtype=torch.long),
+            "bbox": torch.as_tensor(arrays["bbox"][index, :length], dtype=torch.long),
+            "labels": torch.as_tensor(arrays["labels"][index, :length], dtype=torch.long),
+            "pixel_values": torch.as_tensor(arrays["pixel_values"][index], dtype=torch.float32),
+        }
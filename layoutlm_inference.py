@@ -0,0 +1,204 @@
+import argparse
+import json
+import os
+import time
+
+import numpy as np
+import torch
+from PIL import Image
+from transformers import LayoutLMv3ForTokenClassification, LayoutLMv3Processor
+
+from layoutlm_labels import label_to_field, normalize_box
+
+DEFAULT_MODEL_DIR = "./layoutlmv3-resume-model"
+MAX_SEQ_LENGTH = 512
+MODEL_INPUTS = ("input_ids", "bbox", "attention_mask", "pixel_values")
+
+
+def _to_pil(image):
+    if isinstance(image, Image.Image):
+        return image.convert("RGB")
+    array = np.asarray(image)
+    if array.ndim == 2:
+        return Image.fromarray(array).convert("RGB")
+    # OpenCV pages are BGR
+    return Image.fromarray(array[:, :, ::-1]).convert("RGB")
+
+
+# === Batched CPU inference for the fine-tuned LayoutLMv3 token classifier ===
+# The model and processor are loaded once. Pages from any number of resumes
+# are tokenized up front, sorted by sequence length and packed into batches
+# under a token budget, so each padded batch wastes as little compute as
+# possible. Subword predictions are mapped back to OCR words (first subword
+# wins) and grouped into the same field -> text layout as grouped_output_*.json.
+#
+# Throughput / latency knob: max_batch_tokens (and max_batch_size) bound how
+# much work goes into one forward pass. Large budgets maximise pages/second on
+# big batch jobs; a budget of one sequence gives the lowest per-page latency.
+class LayoutLMv3Extractor:
+    def __init__(self, model_dir=DEFAULT_MODEL_DIR, max_batch_tokens=8 * MAX_SEQ_LENGTH,
+                 max_batch_size=16, num_threads=None):
+        if num_threads:
+            torch.set_num_threads(num_threads)
+        self.processor = LayoutLMv3Processor.from_pretrained(model_dir, apply_ocr=False)
+        self.id2label = self._load_model(model_dir)
+        self.max_batch_tokens = max_batch_tokens
+        self.max_batch_size = max_batch_size
+
+    def _load_model(self, model_dir):
+        self.model = LayoutLMv3ForTokenClassification.from_pretrained(model_dir)
+        self.model.eval()
+        return {int(i): label for i, label in self.model.config.id2label.items()}
+
+    # === Tokenize one page (no padding) so its true length is known ===
+    def _encode(self, ocr_page):
+        boxes = [
+            normalize_box((x, y, x + w, y + h), ocr_page.width, ocr_page.height)
+            for x, y, w, h in ocr_page.boxes.tolist()
+        ]
+        encoding = self.processor.tokenizer(
+            ocr_page.words, boxes=boxes, truncation=True, max_length=MAX_SEQ_LENGTH,
+        )
+        return encoding
+
+    def _batches(self, lengths):
+        # Length bucketing: sort by length, then cut batches under the token budget
+        order = np.argsort(lengths, kind="stable")
+        batch = []
+        for index in order:
+            longest = max(lengths[index], max((lengths[i] for i in batch), default=0))
+            if batch and (longest * (len(batch) + 1) > self.max_batch_tokens or len(batch) >= self.max_batch_size):
+                yield batch
+                batch = []
+            batch.append(index)
+        if batch:
+            yield batch
+
+    def _forward(self, batch_inputs):
+        # Returns the predicted label id per token, shape (batch, seq_len)
+        with torch.inference_mode():
+            outputs = self.model(**batch_inputs)
+        return outputs.logits.argmax(-1).numpy()
+
+    def predict(self, pages):
+        # pages: list of (image, OcrPage). Returns one list of labels per page, one per word.
+        predictions = [[] for _ in pages]
+        active = [i for i, (_, ocr_page) in enumerate(pages) if len(ocr_page)]
+        encodings = {i: self._encode(pages[i][1]) for i in active}
+        lengths = [len(encodings[i]["input_ids"]) for i in active]
+
+        for positions in self._batches(lengths):
+            batch = [active[p] for p in positions]
+            padded = self.processor.tokenizer.pad(
+                [{key: encodings[i][key] for key in MODEL_INPUTS if key != "pixel_values"} for i in batch],
+                padding="longest", return_tensors="pt",
+            )
+            pixel_values = self.processor.image_processor(
+                [_to_pil(pages[i][0]) for i in batch], return_tensors="pt",
+            )["pixel_values"]
+            token_labels = self._forward({**padded, "pixel_values": pixel_values})
+
+            for row, page_index in enumerate(batch):
+                word_count = len(pages[page_index][1])
+                labels = ["O"] * word_count
+                seen = set()
+                for token_index, word_id in enumerate(encodings[page_index].word_ids()):
+                    if word_id is None or word_id in seen:
+                        continue
+                    seen.add(word_id)
+                    labels[word_id] = self.id2label[int(token_labels[row, token_index])]
+                predictions[page_index] = labels
+        return predictions
+
+    def extract(self, pages):
+        # Same shape as grouped_output_*.json: {"Name": "...", "Skills": "...", ...}
+        grouped_pages = []
+        for (_, ocr_page), labels in zip(pages, self.predict(pages)):
+            grouped = {}
+            for word, label in zip(ocr_page.words, labels):
+                if label == "O":
+                    continue
+                grouped.setdefault(label_to_field(label), []).append(word)
+            grouped_pages.append({field: ' '.join(words).strip() for field, words in grouped.items()})
+        return grouped_pages
+
+
+BACKENDS = ("pytorch", "onnx", "onnx-int8")
+
+
+# === Pick a backend; ONNX variants come from `python layoutlm_onnx.py export` ===
+def load_extractor(model_dir=DEFAULT_MODEL_DIR, backend="pytorch", **kwargs):
+    if backend == "pytorch":
+        return LayoutLMv3Extractor(model_dir, **kwargs)
+    if backend in ("onnx", "onnx-int8"):
+        from layoutlm_onnx import OnnxLayoutLMv3Extractor
+
+        return OnnxLayoutLMv3Extractor(model_dir, quantized=backend == "onnx-int8", **kwargs)
+    raise ValueError(f"Unknown LayoutLMv3 backend: {backend}")
+
+
+# === CLI: OCR a set of resumes and run batched extraction over all their pages ===
+def main(argv=None):
+    from batch_scan import collect_inputs
+    from ocr_cache import OcrCache
+    from ocr_page import DEFAULT_OCR_CONFIG, run_ocr
+    from page_source import PageSource
+
+    parser = argparse.ArgumentParser(description="Group resume fields with the fine-tuned LayoutLMv3 model.")
+    parser.add_argument("inputs", nargs="+", help="Resume files, directories or glob patterns")
+    parser.add_argument("-o", "--output-dir", default=".", help="Where grouped_output_*.json files are written")
+    parser.add_argument("--model-dir", default=DEFAULT_MODEL_DIR)
+    parser.add_argument("--backend", choices=BACKENDS, default="pytorch")
+    parser.add_argument("--max-batch-tokens", type=int, default=8 * MAX_SEQ_LENGTH,
+                        help="Token budget per forward pass (higher = throughput, lower = latency)")
+    parser.add_argument("--max-batch-size", type=int, default=16)
+    parser.add_argument("--threads", type=int, default=None, help="torch intra-op threads")
+    parser.add_argument("--ocr-cache", default=".ocr_cache")
+    parser.add_argument("--poppler-path", default=None)
+    parser.add_argument("--chunk-pages", type=int, default=64,
+                        help="Pages held in memory and handed to the batcher at once")
+    args = parser.parse_args(argv)
+
+    extractor = load_extractor(
+        args.model_dir, backend=args.backend, max_batch_tokens=args.max_batch_tokens,
+        max_batch_size=args.max_batch_size, num_threads=args.threads,
+    )
+    ocr_cache = OcrCache(args.ocr_cache) if args.ocr_cache else None
+    os.makedirs(args.output_dir, exist_ok=True)
+
+    total_pages = 0
+    model_seconds = 0.0
+    pages, names = [], []
+
+    def flush():
+        nonlocal total_pages, model_seconds
+        start = time.perf_counter()
+        grouped_pages = extractor.extract(pages)
+        model_seconds += time.perf_counter() - start
+        for name, grouped in zip(names, grouped_pages):
+            with open(os.path.join(args.output_dir, name), "w", encoding="utf-8") as f:
+                json.dump(grouped, f, indent=4, ensure_ascii=False)
+        total_pages += len(pages)
+        pages.clear()
+        names.clear()
+
+    for file_path in collect_inputs(args.inputs):
+        base_filename = os.path.splitext(os.path.basename(file_path))[0]
+        for page_index, gray in PageSource(file_path, poppler_path=args.poppler_path):
+            ocr_page = run_ocr(gray, config=DEFAULT_OCR_CONFIG, cache=ocr_cache)
+            # The model only sees a 224 x 224 image, so keep a small copy instead of the full page
+            pages.append((Image.fromarray(gray).convert("RGB").resize((224, 224)), ocr_page))
+            names.append(f"grouped_output_{base_filename}_page{page_index + 1}.json")
+            if len(pages) >= args.chunk_pages:
+                flush()
+    if pages:
+        flush()
+
+    if total_pages:
+        print(f"✅ {total_pages} page(s), model time {model_seconds:.2f}s "
+              f"({model_seconds / total_pages * 1000:.0f} ms/page)")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,55 @@
+# === Define LABELS ===
+LABELS = [
+    'O', 'B-NAME', 'B-COURSE', 'B-PHONE_NUMBER',
+    'B-EMAIL1', 'B-LOCATION', 'B-EMAIL2',
+    'B-SKILLS', 'B-LANGUAGE', 'B-REFERENCE',
+    'B-PROFILE', 'B-WORK_EXPERIENCE', 'B-EDUCATION',
+    'B-PAST_PROJECT', 'B-LINKEDIN', 'B-AWARD',
+    'B-NATIONALITY'
+]
+label2id = {label: i for i, label in enumerate(LABELS)}
+id2label = {i: label for label, i in label2id.items()}
+
+# convert_labelstudio_to_layoutlmv3.py derives labels from region names, so
+# the "Languages" region comes out as B-LANGUAGES
+LABEL_ALIASES = {
+    'B-LANGUAGES': 'B-LANGUAGE',
+}
+
+
+def label_id(label):
+    return label2id[LABEL_ALIASES.get(label, label)]
+
+# === Map model labels back to the field names used in grouped_output_*.json ===
+_FIELD_OVERRIDES = {
+    'B-LANGUAGE': "Languages",
+    'B-LINKEDIN': "LinkedIn",
+}
+
+
+def label_to_field(label):
+    if label in _FIELD_OVERRIDES:
+        return _FIELD_OVERRIDES[label]
+    return label[2:].replace('_', ' ').title()
+
+
+FIELDS = [label_to_field(label) for label in LABELS if label != 'O']
+
+# Labels holding personal details; the Label Studio regions use the same names.
+# field_index never indexes these fields.
+PII_LABELS = [
+    'B-NAME', 'B-PHONE_NUMBER', 'B-EMAIL1', 'B-EMAIL2', 'B-LOCATION',
+    'B-REFERENCE', 'B-LINKEDIN', 'B-NATIONALITY',
+]
+PII_FIELDS = tuple(label_to_field(label) for label in PII_LABELS)
+
+
+# === LayoutLMv3 expects boxes normalised to a 0-1000 grid ===
+def normalize_box(box, width, height):
+    x1, y1, x2, y2 = box
+    return [
+        min(1000, max(0, int(1000 * x1 / width))),
+        min(1000, max(0, int(1000 * y1 / height))),
+        min(1000, max(0, int(1000 * x2 / width))),
+        min(1000, max(0, int(1000 * y2 / height))),
+    ]
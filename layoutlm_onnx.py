@@ -0,0 +1,191 @@
+import argparse
+import json
+import os
+import time
+
+import numpy as np
+import torch
+from PIL import Image
+from transformers import LayoutLMv3Config, LayoutLMv3ForTokenClassification
+
+from layoutlm_inference import DEFAULT_MODEL_DIR, MODEL_INPUTS, LayoutLMv3Extractor
+from layoutlm_labels import LABEL_ALIASES
+from ocr_page import OcrPage
+
+ONNX_SUBDIR = "onnx"
+ONNX_FILENAME = "model.onnx"
+ONNX_INT8_FILENAME = "model.int8.onnx"
+
+
+def onnx_paths(model_dir):
+    onnx_dir = os.path.join(model_dir, ONNX_SUBDIR)
+    return os.path.join(onnx_dir, ONNX_FILENAME), os.path.join(onnx_dir, ONNX_INT8_FILENAME)
+
+
+# === Export: PyTorch checkpoint -> ONNX graph -> dynamic int8 ONNX graph ===
+class _LogitsOnly(torch.nn.Module):
+    # ONNX export needs plain positional tensors in and one tensor out
+    def __init__(self, model):
+        super().__init__()
+        self.model = model
+
+    def forward(self, input_ids, bbox, attention_mask, pixel_values):
+        return self.model(
+            input_ids=input_ids, bbox=bbox, attention_mask=attention_mask, pixel_values=pixel_values,
+        ).logits
+
+
+def export_onnx(model_dir=DEFAULT_MODEL_DIR, opset=14, quantize=True):
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+
+    onnx_path, int8_path = onnx_paths(model_dir)
+    os.makedirs(os.path.dirname(onnx_path), exist_ok=True)
+
+    model = LayoutLMv3ForTokenClassification.from_pretrained(model_dir)
+    model.eval()
+    image_size = model.config.input_size
+    dummy = (
+        torch.ones(1, 16, dtype=torch.long),
+        torch.zeros(1, 16, 4, dtype=torch.long),
+        torch.ones(1, 16, dtype=torch.long),
+        torch.zeros(1, 3, image_size, image_size, dtype=torch.float32),
+    )
+    sequence_axes = {0: "batch", 1: "sequence"}
+    torch.onnx.export(
+        _LogitsOnly(model), dummy, onnx_path,
+        input_names=list(MODEL_INPUTS), output_names=["logits"],
+        dynamic_axes={
+            "input_ids": sequence_axes, "bbox": sequence_axes, "attention_mask": sequence_axes,
+            "pixel_values": {0: "batch"}, "logits": sequence_axes,
+        },
+        opset_version=opset,
+    )
+    print(f"✅ ONNX model saved to: {onnx_path}")
+
+    if quantize:
+        # Dynamic quantization: int8 weights, activations quantized on the fly. No calibration data needed.
+        quantize_dynamic(onnx_path, int8_path, weight_type=QuantType.QInt8)
+        print(f"✅ Quantized model saved to: {int8_path}")
+    return onnx_path, int8_path
+
+
+# === ONNX Runtime backend behind the same predict()/extract() API ===
+class OnnxLayoutLMv3Extractor(LayoutLMv3Extractor):
+    def __init__(self, model_dir=DEFAULT_MODEL_DIR, quantized=True, **kwargs):
+        self.quantized = quantized
+        super().__init__(model_dir, **kwargs)
+
+    def _load_model(self, model_dir):
+        import onnxruntime as ort
+
+        onnx_path, int8_path = onnx_paths(model_dir)
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        threads = torch.get_num_threads()
+        options.intra_op_num_threads = threads
+        self.session = ort.InferenceSession(
+            int8_path if self.quantized else onnx_path, sess_options=options,
+            providers=["CPUExecutionProvider"],
+        )
+        config = LayoutLMv3Config.from_pretrained(model_dir)
+        return {int(i): label for i, label in config.id2label.items()}
+
+    def _forward(self, batch_inputs):
+        feed = {name: batch_inputs[name].numpy() for name in MODEL_INPUTS}
+        logits = self.session.run(["logits"], feed)[0]
+        return logits.argmax(-1)
+
+
+# === Accuracy parity: PyTorch vs ONNX (fp32/int8) on layoutlmv3_dataset.json ===
+def _dataset_pages(dataset_json_path, image_folder, limit=None):
+    with open(dataset_json_path, "r", encoding="utf-8") as f:
+        samples = json.load(f)
+    pages, gold = [], []
+    for sample in samples[:limit]:
+        image_path = os.path.join(image_folder, sample["image_file"])
+        if not os.path.exists(image_path):
+            print(f"⚠️ Missing image skipped: {image_path}")
+            continue
+        image = Image.open(image_path).convert("RGB")
+        boxes = [(x1, y1, x2 - x1, y2 - y1) for x1, y1, x2, y2 in sample["bboxes"]]
+        count = len(sample["tokens"])
+        ocr_page = OcrPage(
+            sample["tokens"], boxes, [100.0] * count, [1] * count, [1] * count, list(range(count)),
+            image.width, image.height,
+        )
+        pages.append((image, ocr_page))
+        # Dataset spellings the model predicts under another name (B-LANGUAGES -> B-LANGUAGE)
+        gold.append([LABEL_ALIASES.get(label, label) for label in sample["labels"]])
+    return pages, gold
+
+
+def parity_check(model_dir, dataset_json_path, image_folder, limit=None):
+    pages, gold = _dataset_pages(dataset_json_path, image_folder, limit)
+    if not pages:
+        raise ValueError("❌ No dataset pages with matching images found.")
+
+    backends = {
+        "pytorch": lambda: LayoutLMv3Extractor(model_dir),
+        "onnx": lambda: OnnxLayoutLMv3Extractor(model_dir, quantized=False),
+        "onnx-int8": lambda: OnnxLayoutLMv3Extractor(model_dir, quantized=True),
+    }
+    report = {}
+    reference = None
+    for name, build in backends.items():
+        extractor = build()
+        start = time.perf_counter()
+        predictions = extractor.predict(pages)
+        elapsed = time.perf_counter() - start
+
+        flat = np.array([label for labels in predictions for label in labels])
+        flat_gold = np.array([label for labels in gold for label in labels])
+        entry = {
+            "ms_per_page": elapsed / len(pages) * 1000,
+            "word_accuracy": float((flat == flat_gold).mean()),
+        }
+        if reference is None:
+            reference = flat
+        else:
+            entry["agreement_with_pytorch"] = float((flat == reference).mean())
+        report[name] = entry
+        del extractor
+
+    print(f"\n[⚖️ Parity on {len(pages)} page(s)]")
+    for name, entry in report.items():
+        agreement = entry.get("agreement_with_pytorch")
+        agreement_text = f", agreement {agreement:.2%}" if agreement is not None else ""
+        print(f"{name}: {entry['ms_per_page']:.0f} ms/page, accuracy {entry['word_accuracy']:.2%}{agreement_text}")
+    return report
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Export, quantize and validate the LayoutLMv3 resume model.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    export_parser = subparsers.add_parser("export", help="Export ONNX and int8 ONNX graphs")
+    export_parser.add_argument("--model-dir", default=DEFAULT_MODEL_DIR)
+    export_parser.add_argument("--opset", type=int, default=14)
+    export_parser.add_argument("--no-quantize", action="store_true")
+
+    parity_parser = subparsers.add_parser("parity", help="Compare PyTorch and ONNX predictions")
+    parity_parser.add_argument("--model-dir", default=DEFAULT_MODEL_DIR)
+    parity_parser.add_argument("--dataset", default="layoutlmv3_dataset.json")
+    parity_parser.add_argument("--image-folder", default=".")
+    parity_parser.add_argument("--limit", type=int, default=None)
+    parity_parser.add_argument("--min-agreement", type=float, default=0.99,
+                               help="Fail if the int8 model agrees with PyTorch on fewer words than this")
+
+    args = parser.parse_args(argv)
+    if args.command == "export":
+        export_onnx(args.model_dir, opset=args.opset, quantize=not args.no_quantize)
+        return 0
+
+    report = parity_check(args.model_dir, args.dataset, args.image_folder, args.limit)
+    if report["onnx-int8"]["agreement_with_pytorch"] < args.min_agreement:
+        print(f"❌ int8 agreement below {args.min_agreement:.2%}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,102 @@
+import time
+
+import torch
+from transformers import Trainer, TrainerCallback
+from transformers.trainer_pt_utils import LengthGroupedSampler
+
+from layoutlm_features import IGNORE_LABEL
+
+
+# === Collator: pad each batch only to its own longest sequence ===
+class DynamicPaddingCollator:
+    def __init__(self, pad_token_id=1, pad_to_multiple_of=8):
+        self.pad_token_id = pad_token_id
+        self.pad_to_multiple_of = pad_to_multiple_of
+
+    def __call__(self, features):
+        longest = max(len(feature["input_ids"]) for feature in features)
+        if self.pad_to_multiple_of:
+            multiple = self.pad_to_multiple_of
+            longest = -(-longest // multiple) * multiple
+
+        batch_size = len(features)
+        input_ids = torch.full((batch_size, longest), self.pad_token_id, dtype=torch.long)
+        attention_mask = torch.zeros((batch_size, longest), dtype=torch.long)
+        bbox = torch.zeros((batch_size, longest, 4), dtype=torch.long)
+        labels = torch.full((batch_size, longest), IGNORE_LABEL, dtype=torch.long)
+        for row, feature in enumerate(features):
+            length = len(feature["input_ids"])
+            input_ids[row, :length] = feature["input_ids"]
+            attention_mask[row, :length] = 1
+            bbox[row, :length] = feature["bbox"]
+            labels[row, :length] = feature["labels"]
+
+        return {
+            "input_ids": input_ids,
+            "attention_mask": attention_mask,
+            "bbox": bbox,
+            "labels": labels,
+            "pixel_values": torch.stack([feature["pixel_values"] for feature in features]),
+        }
+
+
+# === Per-epoch throughput and padding report ===
+class _ThroughputCallback(TrainerCallback):
+    def __init__(self, trainer):
+        self.trainer = trainer
+
+    def on_epoch_begin(self, args, state, control, **kwargs):
+        self.trainer.reset_token_counters()
+
+    def on_epoch_end(self, args, state, control, **kwargs):
+        stats = self.trainer.token_stats()
+        print(
+            f"\n[⏱️ Epoch {state.epoch:.0f}] {stats['tokens_per_second']:.0f} tokens/s, "
+            f"padding ratio {stats['padding_ratio']:.1%} "
+            f"({stats['real_tokens']} real / {stats['padded_tokens']} padded tokens)"
+        )
+        self.trainer.log({
+            "tokens_per_second": stats["tokens_per_second"],
+            "padding_ratio": stats["padding_ratio"],
+        })
+
+
+# === Trainer with a length-grouped sampler and token counters ===
+# Lengths come straight from the feature store, so the sampler never has to
+# load every example to find out how long it is. Examples of similar length
+# land in the same batch, which keeps dynamic padding small.
+class LengthGroupedTrainer(Trainer):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.add_callback(_ThroughputCallback(self))
+        self.reset_token_counters()
+
+    def _get_train_sampler(self, *args, **kwargs):
+        lengths = getattr(self.train_dataset, "lengths", None)
+        if lengths is None:
+            return super()._get_train_sampler(*args, **kwargs)
+        return LengthGroupedSampler(
+            self.args.train_batch_size * self.args.gradient_accumulation_steps,
+            lengths=[int(length) for length in lengths],
+        )
+
+    def reset_token_counters(self):
+        self._real_tokens = 0
+        self._padded_tokens = 0
+        self._epoch_start = time.perf_counter()
+
+    def token_stats(self):
+        elapsed = time.perf_counter() - self._epoch_start
+        padded = max(self._padded_tokens, 1)
+        return {
+            "real_tokens": self._real_tokens,
+            "padded_tokens": self._padded_tokens,
+            "tokens_per_second": self._real_tokens / elapsed if elapsed else 0.0,
+            "padding_ratio": 1 - self._real_tokens / padded,
+        }
+
+    def training_step(self, model, inputs, *args, **kwargs):
+        attention_mask = inputs["attention_mask"]
+        self._real_tokens += int(attention_mask.sum())
+        self._padded_tokens += attention_mask.numel()
+        return super().training_step(model, inputs, *args, **kwargs)
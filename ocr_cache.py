@@ -0,0 +1,115 @@
+import hashlib
+import os
+import tempfile
+
+import numpy as np
+
+from ocr_page import OcrPage, get_pytesseract
+
+DEFAULT_CACHE_DIR = ".ocr_cache"
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024
+
+_tesseract_version = None
+
+
+def tesseract_version():
+    global _tesseract_version
+    if _tesseract_version is None:
+        _tesseract_version = str(get_pytesseract().get_tesseract_version())
+    return _tesseract_version
+
+
+# === Cache key: page pixels + OCR config + Tesseract version ===
+def page_key(image, config):
+    pixels = np.ascontiguousarray(image)
+    digest = hashlib.sha256()
+    digest.update(f"{pixels.shape}|{pixels.dtype}|{config}|{tesseract_version()}".encode("utf-8"))
+    digest.update(memoryview(pixels).cast("B"))
+    return digest.hexdigest()
+
+
+# === Content-addressed, size-bounded on-disk OCR cache ===
+# Each entry is a compressed .npz of the OcrPage arrays (words, boxes,
+# confidences, block/paragraph/line ids). Reads bump the file mtime, and
+# writes evict the least recently used entries once the directory grows past
+# max_bytes. Safe to share between processes: entries are written to a temp
+# file and renamed into place, and a lost eviction race is simply ignored.
+# max_bytes=None leaves the cache unbounded.
+class OcrCache:
+    def __init__(self, cache_dir=DEFAULT_CACHE_DIR, max_bytes=DEFAULT_MAX_BYTES):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        os.makedirs(cache_dir, exist_ok=True)
+        self._total_bytes = None
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, key[:2], f"{key}.npz")
+
+    def get(self, key):
+        path = self._path(key)
+        try:
+            with np.load(path) as data:
+                words = bytes(data["words"]).decode("utf-8").split("\n") if data["words"].size else []
+                page = OcrPage(
+                    words, data["boxes"], data["confs"], data["block_ids"], data["par_ids"],
+                    data["line_ids"], int(data["size"][0]), int(data["size"][1]),
+                )
+            os.utime(path)
+        except (FileNotFoundError, OSError, ValueError, KeyError):
+            self.misses += 1
+            return None
+        self.hits += 1
+        return page
+
+    def put(self, key, page):
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        with os.fdopen(fd, "wb") as f:
+            np.savez_compressed(
+                f,
+                words=np.frombuffer("\n".join(page.words).encode("utf-8"), dtype=np.uint8),
+                boxes=page.boxes.astype(np.int32),
+                confs=page.confs.astype(np.float32),
+                block_ids=page.block_ids.astype(np.int16),
+                par_ids=page.par_ids.astype(np.int16),
+                line_ids=page.line_ids.astype(np.int16),
+                size=np.array([page.width, page.height], dtype=np.int32),
+            )
+        os.replace(tmp_path, path)
+
+        if self._total_bytes is None:
+            self._total_bytes = sum(size for _, size, _ in self._entries())
+        else:
+            self._total_bytes += os.path.getsize(path)
+        if self.max_bytes is not None and self._total_bytes > self.max_bytes:
+            self.evict()
+
+    def _entries(self):
+        for root, _, files in os.walk(self.cache_dir):
+            for name in files:
+                if not name.endswith(".npz"):
+                    continue
+                path = os.path.join(root, name)
+                try:
+                    stat = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                yield path, stat.st_size, stat.st_mtime
+
+    def evict(self):
+        # Drop least recently used entries until the cache is back to 90% of its budget
+        entries = sorted(self._entries(), key=lambda entry: entry[2])
+        total = sum(size for _, size, _ in entries)
+        target = self.max_bytes * 0.9
+        for path, size, _ in entries:
+            if total <= target:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+        self._total_bytes = total
@@ -0,0 +1,172 @@
+import sys
+
+import numpy as np
+
+# === Default Tesseract config shared by the scanners ===
+DEFAULT_OCR_CONFIG = r'--oem 3 --psm 4 -c preserve_interword_spaces=1'
+
+_pytesseract = None
+_tesseract_cmd = None
+
+
+# === pytesseract, imported on first OCR ===
+# pytesseract imports pandas whenever it is installed, only to offer
+# Output.DATAFRAME, which nothing here uses; that alone is 0.3-0.5 s of start-up.
+# pandas is hidden from that one import (and stays importable afterwards).
+def get_pytesseract():
+    global _pytesseract
+    if _pytesseract is None:
+        hide_pandas = "pandas" not in sys.modules
+        if hide_pandas:
+            sys.modules["pandas"] = None
+        try:
+            import pytesseract
+        finally:
+            if hide_pandas:
+                del sys.modules["pandas"]
+        if _tesseract_cmd:
+            pytesseract.pytesseract.tesseract_cmd = _tesseract_cmd
+        _pytesseract = pytesseract
+    return _pytesseract
+
+
+def set_tesseract_cmd(tesseract_cmd):
+    # Tesseract executable when it is not on PATH; applied whenever pytesseract loads
+    global _tesseract_cmd
+    _tesseract_cmd = tesseract_cmd
+    if _pytesseract is not None:
+        _pytesseract.pytesseract.tesseract_cmd = tesseract_cmd
+
+
+# === Structured result of a single Tesseract pass ===
+# Holds every recognised word with its box (left, top, width, height),
+# confidence and block/paragraph/line ids. The Presidio text is rebuilt from
+# the words, and a char-offset -> word index lets any text span (e.g. a PII
+# entity) be mapped straight back to pixel boxes.
+class OcrPage:
+    def __init__(self, words, boxes, confs, block_ids, par_ids, line_ids, width, height):
+        self.words = list(words)
+        self.boxes = np.asarray(boxes, dtype=np.int32).reshape(-1, 4)
+        self.confs = np.asarray(confs, dtype=np.float32)
+        self.block_ids = np.asarray(block_ids, dtype=np.int32)
+        self.par_ids = np.asarray(par_ids, dtype=np.int32)
+        self.line_ids = np.asarray(line_ids, dtype=np.int32)
+        self.width = width
+        self.height = height
+        self._text = None
+        self._word_starts = None
+        self._char_to_word = None
+
+    def __len__(self):
+        return len(self.words)
+
+    @classmethod
+    def from_tesseract_data(cls, data, width, height):
+        words, boxes, confs, blocks, pars, lines = [], [], [], [], [], []
+        for i, raw in enumerate(data["text"]):
+            word = raw.strip() if isinstance(raw, str) else ""
+            conf = float(data["conf"][i])
+            if not word or conf < 0:
+                continue
+            words.append(word)
+            boxes.append((data["left"][i], data["top"][i], data["width"][i], data["height"][i]))
+            confs.append(conf)
+            blocks.append(data["block_num"][i])
+            pars.append(data["par_num"][i])
+            lines.append(data["line_num"][i])
+        return cls(words, boxes, confs, blocks, pars, lines, width, height)
+
+    # === Text rebuilt from words: spaces within a line, newlines between lines ===
+    def _build_text(self):
+        parts = []
+        starts = np.empty(len(self.words), dtype=np.int64)
+        offset = 0
+        prev = None
+        for i, word in enumerate(self.words):
+            key = (self.block_ids[i], self.par_ids[i], self.line_ids[i])
+            if prev is not None:
+                if key[:2] != prev[:2]:
+                    sep = "\n\n"
+                elif key != prev:
+                    sep = "\n"
+                else:
+                    sep = " "
+                parts.append(sep)
+                offset += len(sep)
+            starts[i] = offset
+            parts.append(word)
+            offset += len(word)
+            prev = key
+        if parts:
+            parts.append("\n")
+        self._text = "".join(parts)
+        self._word_starts = starts
+
+        char_to_word = np.full(len(self._text), -1, dtype=np.int32)
+        for i, word in enumerate(self.words):
+            char_to_word[starts[i]:starts[i] + len(word)] = i
+        self._char_to_word = char_to_word
+
+    @property
+    def text(self):
+        if self._text is None:
+            self._build_text()
+        return self._text
+
+    @property
+    def char_to_word(self):
+        if self._char_to_word is None:
+            self._build_text()
+        return self._char_to_word
+
+    @property
+    def word_starts(self):
+        if self._word_starts is None:
+            self._build_text()
+        return self._word_starts
+
+    def word_indices_for_span(self, start, end):
+        span = self.char_to_word[start:end]
+        return np.unique(span[span >= 0])
+
+    def boxes_for_span(self, start, end):
+        # Returns (x1, y1, x2, y2) pixel boxes of every word touched by the span
+        return [
+            (int(x), int(y), int(x + w), int(y + h))
+            for x, y, w, h in self.boxes[self.word_indices_for_span(start, end)]
+        ]
+
+    def confident(self, min_conf):
+        keep = np.flatnonzero(self.confs > min_conf)
+        return OcrPage(
+            [self.words[i] for i in keep], self.boxes[keep], self.confs[keep],
+            self.block_ids[keep], self.par_ids[keep], self.line_ids[keep],
+            self.width, self.height,
+        )
+
+
+# === Single OCR pass: word boxes and full text from one image_to_data call ===
+# Pass an ocr_cache.OcrCache to reuse results for pages that were already OCR'd
+# with the same config and Tesseract version. With a preprocess.Preprocessor,
+# Tesseract reads the preprocessed image and boxes are mapped back to `image`.
+def run_ocr(image, config=DEFAULT_OCR_CONFIG, cache=None, preprocessor=None):
+    transform = None
+    if preprocessor is not None:
+        image, transform = preprocessor(image)
+
+    key = None
+    if cache is not None:
+        from ocr_cache import page_key
+
+        key = page_key(image, config)
+        page = cache.get(key)
+        if page is not None:
+            return transform.restore(page) if transform is not None else page
+
+    img_h, img_w = image.shape[:2]
+    pytesseract = get_pytesseract()
+    data = pytesseract.image_to_data(image, config=config, output_type=pytesseract.Output.DICT)
+    page = OcrPage.from_tesseract_data(data, img_w, img_h)
+    if cache is not None:
+        cache.put(key, page)
+    return transform.restore(page) if transform is not None else page
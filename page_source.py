@@ -0,0 +1,106 @@
+import os
+
+import numpy as np
+from pdf2image import convert_from_path, pdfinfo_from_path
+from PIL import Image
+
+# === Default per-worker memory ceiling for one rendered page (grayscale bytes) ===
+# A 300 DPI A4 page is ~2480 x 3508 = 8.7 MB in 8-bit grayscale; RGB plus the
+# extra NumPy/OpenCV copies the old code made was several times that per page.
+DEFAULT_MAX_PAGE_BYTES = 64 * 1024 * 1024
+PDF_POINTS_PER_INCH = 72
+
+
+# === Streaming page source ===
+# Yields one grayscale page at a time instead of rendering the whole PDF up
+# front. Pages are rendered straight to 8-bit grayscale by Poppler and copied
+# into a single reusable buffer, so peak memory is one page no matter how long
+# the document is. The yielded array is a view of that buffer and is only valid
+# until the next page is requested; copy it if it must outlive the iteration.
+class PageSource:
+    def __init__(self, file_path, dpi=300, poppler_path=None, max_page_bytes=DEFAULT_MAX_PAGE_BYTES, buffer=None):
+        self.file_path = file_path
+        self.dpi = dpi
+        self.poppler_path = poppler_path
+        self.max_page_bytes = max_page_bytes
+        self.is_pdf = file_path.lower().endswith(".pdf")
+        # Pass the buffer of a previous PageSource to keep reusing one allocation
+        self._buffer = buffer if buffer is not None else np.empty(0, dtype=np.uint8)
+        self._info = None
+
+    def _pdfinfo(self):
+        if self._info is None:
+            self._info = pdfinfo_from_path(self.file_path, poppler_path=self.poppler_path)
+        return self._info
+
+    def __len__(self):
+        if self.is_pdf:
+            return int(self._pdfinfo()["Pages"])
+        return 1
+
+    def dpi_for_page(self):
+        # Lower the DPI for oversized pages so one render never exceeds the ceiling
+        if not self.is_pdf:
+            return self.dpi
+        size = self._pdfinfo().get("Page size", "")
+        parts = size.split()
+        try:
+            width_pt, height_pt = float(parts[0]), float(parts[2])
+        except (IndexError, ValueError):
+            return self.dpi
+        pixels = (width_pt * self.dpi / PDF_POINTS_PER_INCH) * (height_pt * self.dpi / PDF_POINTS_PER_INCH)
+        if pixels <= self.max_page_bytes:
+            return self.dpi
+        return max(72, int(self.dpi * (self.max_page_bytes / pixels) ** 0.5))
+
+    def _render(self, page_index):
+        if self.is_pdf:
+            return convert_from_path(
+                self.file_path, dpi=self.dpi_for_page(), poppler_path=self.poppler_path,
+                first_page=page_index + 1, last_page=page_index + 1, grayscale=True,
+            )[0]
+
+        pil_image = Image.open(self.file_path)
+        # Decode JPEGs at reduced size when the full image would blow the ceiling
+        if pil_image.width * pil_image.height > self.max_page_bytes:
+            scale = (self.max_page_bytes / (pil_image.width * pil_image.height)) ** 0.5
+            pil_image.draft("L", (int(pil_image.width * scale), int(pil_image.height * scale)))
+        pil_image = pil_image.convert("L")
+        if pil_image.width * pil_image.height > self.max_page_bytes:
+            scale = (self.max_page_bytes / (pil_image.width * pil_image.height)) ** 0.5
+            pil_image = pil_image.resize((int(pil_image.width * scale), int(pil_image.height * scale)))
+        return pil_image
+
+    def page(self, page_index):
+        pil_image = self._render(page_index)
+        width, height = pil_image.size
+        if self._buffer.size < width * height:
+            self._buffer = np.empty(width * height, dtype=np.uint8)
+        gray = self._buffer[:width * height].reshape(height, width)
+        np.copyto(gray, np.asarray(pil_image))
+        pil_image.close()
+        return gray
+
+    @property
+    def buffer(self):
+        return self._buffer
+
+    def __iter__(self):
+        for page_index in range(len(self)):
+            yield page_index, self.page(page_index)
+
+
+def iter_pages(file_path, dpi=300, poppler_path=None, max_page_bytes=DEFAULT_MAX_PAGE_BYTES):
+    return iter(PageSource(file_path, dpi=dpi, poppler_path=poppler_path, max_page_bytes=max_page_bytes))
+
+
+# === Optional hard cap on a worker's address space (POSIX only) ===
+def limit_worker_memory(max_bytes):
+    if not max_bytes or os.name != "posix":
+        return
+    import resource
+
+    soft, hard = resource.getrlimit(resource.RLIMIT_AS)
+    if hard != resource.RLIM_INFINITY:
+        max_bytes = min(max_bytes, hard)
+    resource.setrlimit(resource.RLIMIT_AS, (max_bytes, hard))
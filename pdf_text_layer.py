@@ -0,0 +1,88 @@
+from ocr_page import OcrPage
+
+PDF_POINTS_PER_INCH = 72
+
+# A page needs at least this many extracted characters to count as born-digital;
+# scanned PDFs often carry a handful of stray glyphs (page numbers, watermarks).
+MIN_TEXT_CHARS = 20
+
+# Words already come out of pdfplumber with perfect "confidence"
+TEXT_LAYER_CONF = 100.0
+
+
+# === Build an OcrPage from a pdfplumber page's embedded text layer ===
+# Word boxes are scaled from PDF points to the pixel size the page would have
+# when rasterized at `dpi`, so the same region templates apply unchanged.
+# Returns None when the page has no usable text layer (scanned page).
+def text_layer_page(pdf_page, dpi=300, min_chars=MIN_TEXT_CHARS, line_tolerance=3):
+    if len(pdf_page.chars) < min_chars:
+        return None
+
+    words = pdf_page.extract_words(x_tolerance=1, y_tolerance=line_tolerance, keep_blank_chars=False)
+    if not words:
+        return None
+
+    scale = dpi / PDF_POINTS_PER_INCH
+    x_offset, y_offset = pdf_page.bbox[0], pdf_page.bbox[1]
+    width = int(round(pdf_page.width * scale))
+    height = int(round(pdf_page.height * scale))
+
+    texts, boxes, blocks, lines = [], [], [], []
+    block_id, line_id = 1, 0
+    line_top = line_bottom = None
+    for word in words:
+        top, bottom = word["top"], word["bottom"]
+        if line_top is None or abs(top - line_top) > line_tolerance:
+            # New line; a vertical gap larger than one line height starts a new block
+            if line_bottom is not None and top - line_bottom > (bottom - top):
+                block_id += 1
+                line_id = 0
+            line_id += 1
+            line_top = top
+        line_bottom = bottom if line_bottom is None else max(line_bottom, bottom)
+
+        x1 = int((word["x0"] - x_offset) * scale)
+        y1 = int((top - y_offset) * scale)
+        x2 = int((word["x1"] - x_offset) * scale)
+        y2 = int((bottom - y_offset) * scale)
+        texts.append(word["text"])
+        boxes.append((x1, y1, max(1, x2 - x1), max(1, y2 - y1)))
+        blocks.append(block_id)
+        lines.append(line_id)
+
+    return OcrPage(
+        texts, boxes, [TEXT_LAYER_CONF] * len(texts), blocks, blocks, lines, width, height,
+    )
+
+
+# === Per-document reader that keeps the PDF open across pages ===
+# pdfplumber (and pdfminer under it) is imported with the first PDF, so runs
+# over images only never load it.
+class PdfTextLayer:
+    def __init__(self, file_path, dpi=300, min_chars=MIN_TEXT_CHARS):
+        import pdfplumber
+
+        self.file_path = file_path
+        self.dpi = dpi
+        self.min_chars = min_chars
+        self._pdf = pdfplumber.open(file_path)
+
+    def __len__(self):
+        return len(self._pdf.pages)
+
+    def page(self, page_index):
+        pdf_page = self._pdf.pages[page_index]
+        try:
+            return text_layer_page(pdf_page, dpi=self.dpi, min_chars=self.min_chars)
+        finally:
+            # Drop pdfplumber's per-page object caches so memory stays flat
+            pdf_page.close()
+
+    def close(self):
+        self._pdf.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
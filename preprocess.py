@@ -0,0 +1,204 @@
+import threading
+
+import cv2
+import numpy as np
+
+from ocr_page import OcrPage
+
+# Median connected-component height (mostly lowercase glyphs) that Tesseract
+# still reads reliably. Pages with larger text are downscaled towards it.
+DEFAULT_TARGET_TEXT_HEIGHT = 20
+
+
+# === Mapping from the original page to the preprocessed image ===
+# `matrix` is the 2 x 3 affine transform original -> processed. OCR boxes are
+# mapped back through its inverse, so everything downstream (regions, PII
+# boxes, drawing) keeps working in original page pixels.
+class PageTransform:
+    def __init__(self, matrix, width, height):
+        self.matrix = np.asarray(matrix, dtype=np.float64)
+        self.width = width
+        self.height = height
+
+    @property
+    def is_identity(self):
+        return np.allclose(self.matrix, [[1, 0, 0], [0, 1, 0]])
+
+    def _map_boxes(self, matrix, boxes):
+        # boxes: (x1, y1, x2, y2) rows; returns the axis-aligned box around the mapped corners
+        boxes = np.asarray(boxes, dtype=np.float64).reshape(-1, 4)
+        corners = boxes[:, [0, 1, 2, 1, 2, 3, 0, 3]].reshape(-1, 4, 2)
+        mapped = corners @ matrix[:, :2].T + matrix[:, 2]
+        return np.concatenate([mapped.min(axis=1), mapped.max(axis=1)], axis=1)
+
+    def forward_boxes(self, boxes):
+        return np.rint(self._map_boxes(self.matrix, boxes)).astype(np.int64)
+
+    def restore(self, ocr_page):
+        if self.is_identity:
+            return ocr_page
+        inverse = cv2.invertAffineTransform(self.matrix)
+        x, y, w, h = ocr_page.boxes.T.astype(np.float64)
+        mapped = self._map_boxes(inverse, np.stack([x, y, x + w, y + h], axis=1))
+        x1 = np.clip(np.floor(mapped[:, 0]), 0, self.width - 1)
+        y1 = np.clip(np.floor(mapped[:, 1]), 0, self.height - 1)
+        x2 = np.clip(np.ceil(mapped[:, 2]), x1, self.width)
+        y2 = np.clip(np.ceil(mapped[:, 3]), y1, self.height)
+        return OcrPage(
+            ocr_page.words, np.stack([x1, y1, x2 - x1, y2 - y1], axis=1), ocr_page.confs,
+            ocr_page.block_ids, ocr_page.par_ids, ocr_page.line_ids, self.width, self.height,
+        )
+
+
+# === Page preprocessing before Tesseract ===
+# Every step is optional:
+#   grayscale   BGR -> 8-bit gray (PageSource pages already are)
+#   normalize   downscale so the median text height is ~target_text_height;
+#               Tesseract time grows with pixel count
+#   deskew      rotate small scan skews (up to max_skew degrees) back to level
+#   crop        drop empty margins around the text
+#   binarize    Otsu ("otsu") or local mean ("adaptive") thresholding
+# Measurements run on a half-size mask; scale, deskew and crop are folded
+# into one resampling pass. Output arrays live in per-thread buffers that are
+# reused page after page, so a returned image is only valid until the same
+# thread preprocesses the next one.
+class Preprocessor:
+    def __init__(self, grayscale=True, normalize=True, target_text_height=DEFAULT_TARGET_TEXT_HEIGHT,
+                 min_scale=0.4, deskew=False, max_skew=10.0, crop=True, crop_padding=16, binarize=None):
+        if binarize not in (None, "otsu", "adaptive"):
+            raise ValueError(f"Unknown binarize mode: {binarize}")
+        self.grayscale = grayscale
+        self.normalize = normalize
+        self.target_text_height = target_text_height
+        self.min_scale = min_scale
+        self.deskew = deskew
+        self.max_skew = max_skew
+        self.crop = crop
+        self.crop_padding = crop_padding
+        self.binarize = binarize
+        self._local = threading.local()
+
+    def __getstate__(self):
+        # Buffers are per process and per thread; workers allocate their own
+        state = dict(self.__dict__)
+        del state["_local"]
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._local = threading.local()
+
+    def _view(self, name, shape):
+        buffers = self._local.__dict__.setdefault("buffers", {})
+        size = int(np.prod(shape))
+        if name not in buffers or buffers[name].size < size:
+            buffers[name] = np.empty(size, dtype=np.uint8)
+        return buffers[name][:size].reshape(shape)
+
+    # === Measurements on a half-size foreground mask ===
+    def _analysis_mask(self, gray):
+        height, width = gray.shape
+        small = self._view("small", (max(1, height // 2), max(1, width // 2)))
+        cv2.resize(gray, (small.shape[1], small.shape[0]), dst=small, interpolation=cv2.INTER_AREA)
+        mask = self._view("mask", small.shape)
+        cv2.threshold(small, 0, 255, cv2.THRESH_BINARY_INV | cv2.THRESH_OTSU, dst=mask)
+        return mask, 2.0
+
+    def _glyphs(self, mask):
+        # Glyph-sized connected components: specks, rules, photos and filled
+        # header/sidebar blocks are left out. Returns their stats rows.
+        _, _, stats, _ = cv2.connectedComponentsWithStats(mask, connectivity=8)
+        stats = stats[1:]
+        heights = stats[:, cv2.CC_STAT_HEIGHT]
+        widths = stats[:, cv2.CC_STAT_WIDTH]
+        return stats[(heights >= 3) & (heights <= mask.shape[0] // 10) & (widths <= heights * 4)]
+
+    def _text_height(self, glyphs, factor):
+        if len(glyphs) < 20:
+            return None
+        return float(np.median(glyphs[:, cv2.CC_STAT_HEIGHT])) * factor
+
+    def _skew_angle(self, glyphs, mask_shape):
+        # Projection profile of glyph bottoms: the rotation that lines them up
+        # on the fewest rows wins. All candidate angles are scored at once.
+        if len(glyphs) < 20:
+            return 0.0
+        xs = glyphs[:, cv2.CC_STAT_LEFT] + glyphs[:, cv2.CC_STAT_WIDTH] / 2 - mask_shape[1] / 2
+        ys = glyphs[:, cv2.CC_STAT_TOP] + glyphs[:, cv2.CC_STAT_HEIGHT] - mask_shape[0] / 2
+
+        def best(angles):
+            radians = np.deg2rad(angles)[:, None]
+            # Row of each glyph bottom after cv2.getRotationMatrix2D(center, angle) is applied
+            rows = np.rint(xs * -np.sin(radians) + ys * np.cos(radians)).astype(np.int64)
+            rows -= rows.min(axis=1, keepdims=True)
+            scores = [np.square(np.bincount(r).astype(np.float64)).sum() for r in rows]
+            return float(angles[int(np.argmax(scores))])
+
+        coarse = best(np.arange(-self.max_skew, self.max_skew + 0.25, 0.5))
+        angle = best(np.arange(coarse - 0.5, coarse + 0.55, 0.1))
+        return 0.0 if abs(angle) < 0.2 else angle
+
+    def _content_box(self, mask, factor, width, height):
+        rows = np.flatnonzero(np.count_nonzero(mask, axis=1) > 1)
+        cols = np.flatnonzero(np.count_nonzero(mask, axis=0) > 1)
+        if not rows.size or not cols.size:
+            return 0, 0, width, height
+        pad = self.crop_padding
+        x1 = max(0, int(cols[0] * factor) - pad)
+        y1 = max(0, int(rows[0] * factor) - pad)
+        x2 = min(width, int((cols[-1] + 1) * factor) + pad)
+        y2 = min(height, int((rows[-1] + 1) * factor) + pad)
+        return x1, y1, x2, y2
+
+    def __call__(self, image):
+        # Returns (processed image, PageTransform back to the input's pixels)
+        height, width = image.shape[:2]
+        gray = image
+        if image.ndim == 3:
+            if not self.grayscale:
+                return image, PageTransform([[1, 0, 0], [0, 1, 0]], width, height)
+            gray = self._view("gray", (height, width))
+            cv2.cvtColor(image, cv2.COLOR_BGR2GRAY, dst=gray)
+
+        scale, angle, box = 1.0, 0.0, (0, 0, width, height)
+        if self.normalize or self.deskew or self.crop:
+            mask, factor = self._analysis_mask(gray)
+            glyphs = self._glyphs(mask) if self.normalize or self.deskew else None
+            if self.normalize:
+                text_height = self._text_height(glyphs, factor)
+                if text_height and text_height > self.target_text_height * 1.25:
+                    scale = max(self.min_scale, self.target_text_height / text_height)
+            if self.deskew:
+                angle = self._skew_angle(glyphs, mask.shape)
+            if self.crop:
+                box = self._content_box(mask, factor, width, height)
+
+        x1, y1, x2, y2 = box
+        out_w = max(1, int(round((x2 - x1) * scale)))
+        out_h = max(1, int(round((y2 - y1) * scale)))
+        # original -> processed: rotate about the page center, crop, then scale
+        rotation = cv2.getRotationMatrix2D((width / 2, height / 2), angle, 1.0)
+        matrix = np.array([[scale, 0, -x1 * scale], [0, scale, -y1 * scale]]) @ np.vstack([rotation, [0, 0, 1]])
+
+        if angle:
+            out = self._view("out", (out_h, out_w))
+            # warpAffine has no area interpolation; cubic only when enlarging
+            cv2.warpAffine(gray, matrix, (out_w, out_h), dst=out,
+                           flags=cv2.INTER_CUBIC if scale > 1.0 else cv2.INTER_LINEAR,
+                           borderMode=cv2.BORDER_CONSTANT, borderValue=255)
+        elif scale != 1.0:
+            out = self._view("out", (out_h, out_w))
+            cv2.resize(gray[y1:y2, x1:x2], (out_w, out_h), dst=out, interpolation=cv2.INTER_AREA)
+        else:
+            # Crop only: a view, no copy
+            out = gray[y1:y2, x1:x2]
+
+        if self.binarize:
+            binary = self._view("binary", out.shape)
+            if self.binarize == "otsu":
+                cv2.threshold(out, 0, 255, cv2.THRESH_BINARY | cv2.THRESH_OTSU, dst=binary)
+            else:
+                block = max(3, int(self.target_text_height * 2) | 1)
+                cv2.adaptiveThreshold(out, 255, cv2.ADAPTIVE_THRESH_MEAN_C, cv2.THRESH_BINARY, block, 15, dst=binary)
+            out = binary
+        return out, PageTransform(matrix, width, height)
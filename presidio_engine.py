@@ -0,0 +1,173 @@
+import threading
+import time
+
+# Recognizer profiles built by resume_recognizers; listed here so the CLIs can
+# offer them without importing Presidio
+PROFILES = ("default", "resume", "resume-scoped")
+
+# === Process-wide engine pool ===
+# Building an AnalyzerEngine loads the spaCy en_core_web_lg pipeline and the
+# whole recognizer registry, which costs more than OCR-ing a page. Engines are
+# created once per process on first use and shared by every file and page.
+#
+# The analyzer is built from a recognizer profile (see resume_recognizers):
+# "default" is Presidio's full registry, "resume" / "resume-scoped" only the
+# recognizers a resume needs. Call set_profile() before the first analysis.
+#
+# Presidio (and spaCy with it) is only imported when the first engine is
+# built, so processes that never analyze, such as the batch_scan parent or a
+# CLI printing --help, do not pay for it.
+_lock = threading.Lock()
+_profile = "default"
+_analyzer = None
+_scoped = []
+_anonymizer = None
+
+_stats = {
+    "analyzer_loads": 0,
+    "analyzer_load_seconds": 0.0,
+    "anonymizer_loads": 0,
+    "anonymizer_load_seconds": 0.0,
+    "analyze_calls": 0,
+    "analyze_seconds": 0.0,
+    "anonymize_calls": 0,
+    "anonymize_seconds": 0.0,
+}
+
+
+def set_profile(profile):
+    global _profile, _analyzer, _scoped
+    if profile not in PROFILES:
+        raise ValueError(f"Unknown recognizer profile: {profile}")
+    with _lock:
+        if profile != _profile:
+            _profile = profile
+            _analyzer = None
+            _scoped = []
+
+
+def get_profile():
+    return _profile
+
+
+def get_analyzer():
+    global _analyzer, _scoped
+    if _analyzer is None:
+        with _lock:
+            if _analyzer is None:
+                start = time.perf_counter()
+                import resume_recognizers
+
+                analyzer, _scoped = resume_recognizers.build_analyzer(_profile)
+                _analyzer = analyzer
+                _stats["analyzer_loads"] += 1
+                _stats["analyzer_load_seconds"] += time.perf_counter() - start
+    return _analyzer
+
+
+def get_anonymizer():
+    global _anonymizer
+    if _anonymizer is None:
+        with _lock:
+            if _anonymizer is None:
+                start = time.perf_counter()
+                from presidio_anonymizer import AnonymizerEngine
+
+                _anonymizer = AnonymizerEngine()
+                _stats["anonymizer_loads"] += 1
+                _stats["anonymizer_load_seconds"] += time.perf_counter() - start
+    return _anonymizer
+
+
+def warm_up():
+    # Load both engines and push one tiny document through the NLP pipeline so
+    # the first real page does not pay any lazy initialisation cost.
+    analyzer = get_analyzer()
+    get_anonymizer()
+    analyzer.analyze(text="John Smith, john@example.com", language="en")
+
+
+# === Timed wrappers used by the scanners ===
+def analyze(text, language="en", **kwargs):
+    analyzer = get_analyzer()
+    start = time.perf_counter()
+    results = analyzer.analyze(text=text, language=language, **kwargs)
+    _stats["analyze_calls"] += 1
+    _stats["analyze_seconds"] += time.perf_counter() - start
+    return results
+
+
+def anonymize(text, analyzer_results, **kwargs):
+    anonymizer = get_anonymizer()
+    start = time.perf_counter()
+    anonymized = anonymizer.anonymize(text=text, analyzer_results=analyzer_results, **kwargs)
+    _stats["anonymize_calls"] += 1
+    _stats["anonymize_seconds"] += time.perf_counter() - start
+    return anonymized
+
+
+# === Batched analysis: spaCy runs over many page texts at once (nlp.pipe) ===
+# The NLP engine processes the whole list in batches, then every recognizer
+# runs on the precomputed artifacts. Results are identical to calling
+# analyze() once per text.
+#
+# `scoped_pages` gives each text its (ocr_page, scaled regions) for the
+# region-scoped recognizers of the "resume-scoped" profile. Their hits reuse
+# the page's NLP artifacts for context, and are thresholded and de-duplicated
+# together with the analyzer's own hits, so an entity both catch is reported once.
+def analyze_batch(texts, language="en", batch_size=32, n_process=1, scoped_pages=None, **kwargs):
+    texts = list(texts)
+    if not texts:
+        return []
+    analyzer = get_analyzer()
+    start = time.perf_counter()
+    artifacts_batch = analyzer.nlp_engine.process_batch(
+        texts, language, batch_size=batch_size, n_process=n_process,
+    )
+    results = []
+    for i, (text, nlp_artifacts) in enumerate(artifacts_batch):
+        page_results = analyzer.analyze(text=text, language=language, nlp_artifacts=nlp_artifacts, **kwargs)
+        if scoped_pages and _scoped:
+            import resume_recognizers
+
+            ocr_page, regions = scoped_pages[i]
+            score_threshold = kwargs.get("score_threshold")
+            page_results = resume_recognizers.analyze_scoped(
+                ocr_page, regions, _scoped, results=page_results, nlp_artifacts=nlp_artifacts,
+                context_enhancer=analyzer.context_aware_enhancer,
+                score_threshold=analyzer.default_score_threshold if score_threshold is None else score_threshold,
+            )
+        results.append(page_results)
+    _stats["analyze_calls"] += len(texts)
+    _stats["analyze_seconds"] += time.perf_counter() - start
+    return results
+
+
+def anonymize_batch(texts, analyzer_results_list, **kwargs):
+    anonymizer = get_anonymizer()
+    start = time.perf_counter()
+    anonymized = [
+        anonymizer.anonymize(text=text, analyzer_results=analyzer_results, **kwargs)
+        for text, analyzer_results in zip(texts, analyzer_results_list)
+    ]
+    _stats["anonymize_calls"] += len(anonymized)
+    _stats["anonymize_seconds"] += time.perf_counter() - start
+    return anonymized
+
+
+def engine_stats():
+    return dict(_stats)
+
+
+def print_engine_stats():
+    stats = engine_stats()
+    print("\n[⏱️ Presidio Engine Timings]")
+    print(f"Recognizer profile: {_profile}")
+    print(f"Analyzer loads: {stats['analyzer_loads']} ({stats['analyzer_load_seconds']:.2f}s)")
+    print(f"Anonymizer loads: {stats['anonymizer_loads']} ({stats['anonymizer_load_seconds']:.2f}s)")
+    if stats["analyze_calls"]:
+        avg = stats["analyze_seconds"] / stats["analyze_calls"]
+        print(f"Analyze calls: {stats['analyze_calls']} ({stats['analyze_seconds']:.2f}s, {avg:.3f}s/page)")
+    if stats["anonymize_calls"]:
+        avg = stats["anonymize_seconds"] / stats["anonymize_calls"]
+        print(f"Anonymize calls: {stats['anonymize_calls']} ({stats['anonymize_seconds']:.2f}s, {avg:.3f}s/page)")
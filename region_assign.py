@@ -0,0 +1,143 @@
+import numpy as np
+
+
+# === Batched word -> region assignment ===
+# All tests run over the whole page at once in NumPy instead of walking every
+# word against every region in Python. Boxes are (x1, y1, x2, y2) and regions
+# are inclusive on all edges, matching the original scanners.
+
+def word_centers(boxes):
+    # boxes are OCR (left, top, width, height) rows
+    boxes = np.asarray(boxes, dtype=np.int64).reshape(-1, 4)
+    cx = boxes[:, 0] + boxes[:, 2] // 2
+    cy = boxes[:, 1] + boxes[:, 3] // 2
+    return np.stack([cx, cy], axis=1)
+
+
+def region_array(regions):
+    if not regions:
+        return np.zeros((0, 4), dtype=np.int64)
+    return np.asarray([region["box"] for region in regions], dtype=np.int64).reshape(-1, 4)
+
+
+def points_in_regions(centers, region_boxes):
+    # (words, regions) boolean matrix: True where the word center lies in the region
+    centers = np.asarray(centers).reshape(-1, 2)
+    region_boxes = np.asarray(region_boxes).reshape(-1, 4)
+    cx = centers[:, 0:1]
+    cy = centers[:, 1:2]
+    return (
+        (region_boxes[:, 0] <= cx) & (cx <= region_boxes[:, 2])
+        & (region_boxes[:, 1] <= cy) & (cy <= region_boxes[:, 3])
+    )
+
+
+def first_region(centers, region_boxes):
+    # Index of the first region containing each center, or -1
+    inside = points_in_regions(centers, region_boxes)
+    if inside.shape[1] == 0:
+        return np.full(inside.shape[0], -1, dtype=np.int64)
+    return np.where(inside.any(axis=1), inside.argmax(axis=1), -1)
+
+
+def confident_centers(ocr_page, min_conf=30):
+    keep = np.flatnonzero(ocr_page.confs > min_conf)
+    return keep, word_centers(ocr_page.boxes[keep])
+
+
+def group_words(ocr_page, regions, min_conf=30):
+    # A word lands in every region containing it, in reading order, exactly
+    # like the original per-word loop (regions sharing a label are merged)
+    keep, centers = confident_centers(ocr_page, min_conf)
+    inside = points_in_regions(centers, region_array(regions))
+    region_texts = {}
+    for label in dict.fromkeys(region["label"] for region in regions):
+        columns = [r for r, region in enumerate(regions) if region["label"] == label]
+        counts = inside[:, columns].sum(axis=1)
+        region_texts[label] = ' '.join(ocr_page.words[i] for i in np.repeat(keep, counts)).strip()
+    return region_texts
+
+
+# === Grid index for matching one page against many templates at once ===
+# Regions from every template are bucketed into a uniform grid once. A query
+# looks up each word's cell and only tests the regions registered in that
+# cell, so the cost grows with words x regions-per-cell, not words x regions.
+class RegionIndex:
+    def __init__(self, templates, width, height, cell_size=64):
+        # templates: list of region lists already scaled to width x height
+        self.width = width
+        self.height = height
+        self.cell_size = cell_size
+        self.cols = max(1, -(-width // cell_size))
+        self.rows = max(1, -(-height // cell_size))
+        self.labels = []
+        self.template_ids = []
+        boxes = []
+        for template_id, regions in enumerate(templates):
+            for region in regions:
+                self.labels.append(region["label"])
+                self.template_ids.append(template_id)
+                boxes.append(region["box"])
+        self.template_count = len(templates)
+        self.template_ids = np.asarray(self.template_ids, dtype=np.int64)
+        self.boxes = np.asarray(boxes, dtype=np.int64).reshape(-1, 4)
+        self._build()
+
+    def _build(self):
+        clipped_x = np.clip(self.boxes[:, [0, 2]], 0, self.width - 1) // self.cell_size
+        clipped_y = np.clip(self.boxes[:, [1, 3]], 0, self.height - 1) // self.cell_size
+        cells, owners = [], []
+        for r in range(len(self.boxes)):
+            xs = np.arange(clipped_x[r, 0], clipped_x[r, 1] + 1)
+            ys = np.arange(clipped_y[r, 0], clipped_y[r, 1] + 1)
+            cell_ids = (ys[:, None] * self.cols + xs[None, :]).ravel()
+            cells.append(cell_ids)
+            owners.append(np.full(cell_ids.shape, r, dtype=np.int64))
+        cells = np.concatenate(cells) if cells else np.zeros(0, dtype=np.int64)
+        owners = np.concatenate(owners) if owners else np.zeros(0, dtype=np.int64)
+        order = np.argsort(cells, kind="stable")
+        # CSR layout: regions of cell c are cell_regions[cell_start[c]:cell_start[c + 1]]
+        self.cell_regions = owners[order]
+        self.cell_start = np.searchsorted(cells[order], np.arange(self.rows * self.cols + 1))
+
+    def query(self, centers):
+        # Returns (word_idx, region_idx) pairs for every containing region
+        centers = np.asarray(centers, dtype=np.int64).reshape(-1, 2)
+        cx = np.clip(centers[:, 0], 0, self.width - 1) // self.cell_size
+        cy = np.clip(centers[:, 1], 0, self.height - 1) // self.cell_size
+        cell = cy * self.cols + cx
+        starts = self.cell_start[cell]
+        counts = self.cell_start[cell + 1] - starts
+        word_idx = np.repeat(np.arange(len(centers)), counts)
+        offsets = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+        region_idx = self.cell_regions[np.repeat(starts, counts) + offsets]
+
+        boxes = self.boxes[region_idx]
+        px = centers[word_idx, 0]
+        py = centers[word_idx, 1]
+        hit = (boxes[:, 0] <= px) & (px <= boxes[:, 2]) & (boxes[:, 1] <= py) & (py <= boxes[:, 3])
+        return word_idx[hit], region_idx[hit]
+
+    def group_words(self, ocr_page, min_conf=30):
+        # One grouped dict per template, all from a single batched query
+        keep, centers = confident_centers(ocr_page, min_conf)
+        word_idx, region_idx = self.query(centers)
+        order = np.argsort(word_idx, kind="stable")
+        grouped = [{} for _ in range(self.template_count)]
+        for r, label in enumerate(self.labels):
+            grouped[self.template_ids[r]].setdefault(label, [])
+        for w, r in zip(keep[word_idx[order]].tolist(), region_idx[order].tolist()):
+            grouped[self.template_ids[r]][self.labels[r]].append(ocr_page.words[w])
+        return [
+            {label: ' '.join(words).strip() for label, words in texts.items()}
+            for texts in grouped
+        ]
+
+    def coverage(self, ocr_page, min_conf=30):
+        # Share of the confident words that fall inside at least one region, per template
+        keep, centers = confident_centers(ocr_page, min_conf)
+        if not len(keep):
+            return np.zeros(self.template_count)
+        word_idx, region_idx = self.query(centers)
+        pairs = np.unique(np.stack([self.template_ids[region_idx], word_idx], axis=1), axis=0)
+        return np.bincount(pairs[:, 0], minlength=self.template_count) / len(keep)
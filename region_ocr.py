@@ -0,0 +1,89 @@
+import os
+import re
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from ocr_page import DEFAULT_OCR_CONFIG, OcrPage, run_ocr
+from region_assign import points_in_regions, region_array, word_centers
+
+# === Page segmentation mode per region type ===
+# 7 = single text line, 6 = one uniform block of text. Labels not listed use
+# DEFAULT_REGION_PSM.
+REGION_PSM = {
+    "Name": 7,
+    "Phone Number": 7,
+    "Email1": 7,
+    "Email2": 7,
+    "Location": 7,
+    "Course": 6,
+    "Skills": 6,
+    "Languages": 6,
+    "Reference": 6,
+    "Profile": 6,
+    "Work Experience": 6,
+    "Education": 6,
+}
+DEFAULT_REGION_PSM = 6
+
+
+def region_config(label, base_config=DEFAULT_OCR_CONFIG):
+    psm = f"--psm {REGION_PSM.get(label, DEFAULT_REGION_PSM)}"
+    if re.search(r"--psm\s+\d+", base_config):
+        return re.sub(r"--psm\s+\d+", psm, base_config)
+    return f"{base_config} {psm}".strip()
+
+
+def _crop_box(box, width, height, pad):
+    x1, y1, x2, y2 = box
+    return max(0, x1 - pad), max(0, y1 - pad), min(width, x2 + pad + 1), min(height, y2 + pad + 1)
+
+
+# === Region-scoped OCR: crop each template region and OCR the crops concurrently ===
+# Tesseract only sees the pixels inside the template, with a segmentation
+# mode suited to the region, and the crops of one page run on several cores
+# (pytesseract shells out, so threads are enough). Word boxes are shifted back
+# to page coordinates and merged into one OcrPage, so grouping, Presidio and
+# the JSON output work unchanged. Text outside every region is never read.
+def ocr_regions(image, regions, config=DEFAULT_OCR_CONFIG, cache=None, max_workers=None, pad=4, preprocessor=None):
+    img_h, img_w = image.shape[:2]
+    crops = [_crop_box(region["box"], img_w, img_h, pad) for region in regions]
+    crops = [(r, crop) for r, crop in enumerate(crops) if crop[2] > crop[0] and crop[3] > crop[1]]
+
+    max_workers = max_workers or min(len(crops), os.cpu_count() or 1) or 1
+    if max_workers > 1:
+        # Each Tesseract process should use one core; the crops are the parallelism
+        os.environ.setdefault("OMP_THREAD_LIMIT", "1")
+
+    def ocr_crop(job):
+        r, (x1, y1, x2, y2) = job
+        return run_ocr(image[y1:y2, x1:x2], config=region_config(regions[r]["label"], config), cache=cache,
+                       preprocessor=preprocessor)
+
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        crop_pages = list(pool.map(ocr_crop, crops))
+
+    region_boxes = region_array(regions)
+    words, boxes, confs, blocks, pars, lines = [], [], [], [], [], []
+    for (r, (x1, y1, _, _)), crop_page in zip(crops, crop_pages):
+        if not len(crop_page):
+            continue
+        page_boxes = crop_page.boxes + np.array([x1, y1, 0, 0], dtype=np.int32)
+        # Keep words whose center is in this region (not the padding) and in no
+        # earlier region, so overlapping regions never read the same word twice
+        inside = points_in_regions(word_centers(page_boxes), region_boxes[:r + 1])
+        keep = np.flatnonzero(inside[:, r] & ~inside[:, :r].any(axis=1))
+        words.extend(crop_page.words[i] for i in keep)
+        boxes.append(page_boxes[keep])
+        confs.append(crop_page.confs[keep])
+        # One block per region keeps regions apart in the rebuilt text
+        blocks.append(np.full(len(keep), r + 1, dtype=np.int32))
+        pars.append(crop_page.block_ids[keep] * 1000 + crop_page.par_ids[keep])
+        lines.append(crop_page.line_ids[keep])
+
+    if not words:
+        return OcrPage([], np.zeros((0, 4)), [], [], [], [], img_w, img_h)
+    return OcrPage(
+        words, np.concatenate(boxes), np.concatenate(confs), np.concatenate(blocks),
+        np.concatenate(pars), np.concatenate(lines), img_w, img_h,
+    )
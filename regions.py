@@ -0,0 +1,74 @@
+import json
+
+# === Define original layout size used for region design ===
+BASE_WIDTH = 1240
+BASE_HEIGHT = 1750
+
+# === Define Predefined Regions ===
+predefined_regions = {
+    "Name": (481, 18, 1230, 152),
+    "Course": (481, 161, 1230, 284),
+    "Phone Number": (70, 546, 353, 573),
+    "Email1": (70, 599, 353, 630),
+    "Location": (70, 655, 353, 684),
+    "Email2": (70, 712, 353, 749),
+    "Skills": (57, 864, 364, 1196),
+    "Languages": (57, 1254, 364, 1406),
+    "Reference": (9, 1466, 359, 1739),
+    "Profile": (444, 423, 1221, 848),
+    "Work Experience": (444, 928, 1221, 1383),
+    "Education": (444, 1458, 1221, 1740)
+}
+
+
+# === Predefined regions as a template in BASE_WIDTH x BASE_HEIGHT pixels ===
+def predefined_template(regions=predefined_regions):
+    return [
+        {"label": label, "box": box, "base_size": (BASE_WIDTH, BASE_HEIGHT)}
+        for label, box in regions.items()
+    ]
+
+
+# === Scale template regions from the size they were drawn on to a page ===
+def scale_regions(regions, img_w, img_h):
+    scaled = []
+    for region in regions:
+        x1, y1, x2, y2 = region["box"]
+        base_w, base_h = region.get("base_size", (img_w, img_h))
+        x_scale = img_w / base_w
+        y_scale = img_h / base_h
+        scaled.append({
+            "label": region["label"],
+            "box": (int(x1 * x_scale), int(y1 * y_scale), int(x2 * x_scale), int(y2 * y_scale)),
+        })
+    return scaled
+
+
+# === Convert one Label Studio task into absolute-pixel template regions ===
+def regions_from_labelstudio_task(task):
+    template_regions = []
+    annotations = task.get("annotations", [])
+    if not annotations:
+        return template_regions
+
+    for result in annotations[0].get("result", []):
+        if result["type"] != "rectanglelabels":
+            continue
+        label = result["value"]["rectanglelabels"][0]
+        x_pct, y_pct = result["value"]["x"], result["value"]["y"]
+        w_pct, h_pct = result["value"]["width"], result["value"]["height"]
+        img_w, img_h = result["original_width"], result["original_height"]
+
+        x1 = int(x_pct / 100 * img_w)
+        y1 = int(y_pct / 100 * img_h)
+        x2 = int((x_pct + w_pct) / 100 * img_w)
+        y2 = int((y_pct + h_pct) / 100 * img_h)
+
+        template_regions.append({"label": label, "box": (x1, y1, x2, y2), "base_size": (img_w, img_h)})
+    return template_regions
+
+
+def load_labelstudio_template(labelstudio_json, task_index=0):
+    with open(labelstudio_json, "r", encoding="utf-8") as f:
+        labelstudio_data = json.load(f)
+    return regions_from_labelstudio_task(labelstudio_data[task_index])
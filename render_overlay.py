@@ -0,0 +1,138 @@
+import argparse
+import json
+import os
+
+import cv2
+
+from page_source import PageSource
+
+DEFAULT_MAX_WIDTH = 1200
+DEFAULT_QUALITY = 80
+# Output format -> (file extension, OpenCV quality flag)
+OVERLAY_FORMATS = {
+    "webp": (".webp", cv2.IMWRITE_WEBP_QUALITY),
+    "jpeg": (".jpg", cv2.IMWRITE_JPEG_QUALITY),
+}
+
+
+# === Overlay of one page result, drawn at preview size ===
+# `page` is a result dict as saved by the scanners (width, height, regions,
+# pii boxes and, when present, word_boxes), all in the pixels the page was
+# scanned at. The page image is downscaled to at most max_width first and
+# the boxes are scaled to match, so drawing and encoding cost the same for a
+# 150 or a 300 DPI scan, and the image may be rendered at any DPI.
+def draw_overlay(image, page, max_width=DEFAULT_MAX_WIDTH):
+    page_w, page_h = page.get("width") or image.shape[1], page.get("height") or image.shape[0]
+    scale = min(1.0, max_width / page_w) if max_width else 1.0
+    out_w, out_h = max(1, int(round(page_w * scale))), max(1, int(round(page_h * scale)))
+    small = cv2.resize(image, (out_w, out_h), interpolation=cv2.INTER_AREA)
+    canvas = cv2.cvtColor(small, cv2.COLOR_GRAY2BGR) if small.ndim == 2 else small
+
+    def scaled(box):
+        return tuple(int(round(v * scale)) for v in box)
+
+    thick = 2 if scale > 0.5 else 1
+    for x, y, w, h in page.get("word_boxes", []):
+        x1, y1, x2, y2 = scaled((x, y, x + w, y + h))
+        cv2.rectangle(canvas, (x1, y1), (x2, y2), (0, 255, 0), 1)
+    for region in page.get("regions", []):
+        x1, y1, x2, y2 = scaled(region["box"])
+        cv2.rectangle(canvas, (x1, y1), (x2, y2), (255, 0, 0), thick)
+        cv2.putText(canvas, region["label"], (x1, max(0, y1 - 4)), cv2.FONT_HERSHEY_SIMPLEX,
+                    max(0.35, 0.6 * scale), (255, 0, 0), 1, cv2.LINE_AA)
+    for entity in page.get("pii", []):
+        for box in entity["boxes"]:
+            x1, y1, x2, y2 = scaled(box)
+            cv2.rectangle(canvas, (x1, y1), (x2, y2), (0, 0, 255), thick)
+    return canvas
+
+
+def encode_overlay(canvas, fmt="webp", quality=DEFAULT_QUALITY):
+    if fmt not in OVERLAY_FORMATS:
+        raise ValueError(f"Unknown overlay format: {fmt}")
+    extension, quality_flag = OVERLAY_FORMATS[fmt]
+    ok, encoded = cv2.imencode(extension, canvas, [quality_flag, int(quality)])
+    if not ok:
+        raise ValueError(f"{fmt} encoding failed")
+    return encoded.tobytes()
+
+
+def render_overlay(image, page, max_width=DEFAULT_MAX_WIDTH, fmt="webp", quality=DEFAULT_QUALITY):
+    return encode_overlay(draw_overlay(image, page, max_width=max_width), fmt=fmt, quality=quality)
+
+
+def overlay_path(output_dir, file_path, page_number, fmt="webp"):
+    base_filename = os.path.splitext(os.path.basename(file_path))[0]
+    return os.path.join(output_dir, f"output_{base_filename}_page{page_number}{OVERLAY_FORMATS[fmt][0]}")
+
+
+# === On-demand stage: overlays for pages of an already saved batch result ===
+# Only the requested pages are rendered (PDF pages one at a time, at a DPI
+# just high enough for max_width); nothing is drawn during the scan itself.
+def render_result(result_json, output_dir, page_numbers=None, source=None, max_width=DEFAULT_MAX_WIDTH,
+                  fmt="webp", quality=DEFAULT_QUALITY, poppler_path=None):
+    with open(result_json, "r", encoding="utf-8") as f:
+        result = json.load(f)
+    source = source or result["file"]
+    pages = [page for page in result["pages"] if page_numbers is None or page["page"] in page_numbers]
+    if not pages:
+        return []
+
+    os.makedirs(output_dir, exist_ok=True)
+    dpi = 300
+    if source.lower().endswith(".pdf") and max_width:
+        # Pages were scanned at up to 300 DPI; render no larger than the overlay needs
+        dpi = max(72, min(300, int(300 * max_width / max(page["width"] for page in pages)) + 1))
+    page_source = PageSource(source, dpi=dpi, poppler_path=poppler_path)
+
+    written = []
+    for page in pages:
+        image = page_source.page(page["page"] - 1)
+        data = render_overlay(image, page, max_width=max_width, fmt=fmt, quality=quality)
+        path = overlay_path(output_dir, source, page["page"], fmt)
+        with open(path, "wb") as f:
+            f.write(data)
+        written.append(path)
+    return written
+
+
+def parse_pages(spec):
+    # "1,3-5" -> {1, 3, 4, 5}
+    numbers = set()
+    for part in spec.split(","):
+        first, _, last = part.partition("-")
+        numbers.update(range(int(first), int(last or first) + 1))
+    return numbers
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Draw region and PII overlays from saved scan results.")
+    parser.add_argument("results", nargs="+", help="Per-file JSON written by batch_scan.py")
+    parser.add_argument("-o", "--output-dir", default="overlays")
+    parser.add_argument("--pages", type=parse_pages, default=None, help="Page numbers, e.g. 1 or 1,3-5 (default: all)")
+    parser.add_argument("--source", default=None,
+                        help="Resume file, when it moved since the scan (single result only)")
+    parser.add_argument("--max-width", type=int, default=DEFAULT_MAX_WIDTH, help="Overlay width in pixels; 0 = full")
+    parser.add_argument("--format", choices=sorted(OVERLAY_FORMATS), default="webp")
+    parser.add_argument("--quality", type=int, default=DEFAULT_QUALITY)
+    parser.add_argument("--poppler-path", default=None)
+    args = parser.parse_args(argv)
+    if args.source and len(args.results) > 1:
+        parser.error("--source only works with a single result file")
+
+    for result_json in args.results:
+        try:
+            paths = render_result(
+                result_json, args.output_dir, page_numbers=args.pages, source=args.source,
+                max_width=args.max_width, fmt=args.format, quality=args.quality, poppler_path=args.poppler_path,
+            )
+        except (OSError, ValueError, KeyError) as e:
+            print(f"❌ {result_json}: {e}")
+            continue
+        for path in paths:
+            print(f"✅ Overlay saved: {path} ({os.path.getsize(path) / 1024:.0f} KB)")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
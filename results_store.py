@@ -0,0 +1,405 @@
+import argparse
+import glob
+import json
+import os
+import re
+import time
+
+import numpy as np
+
+STORE_VERSION = 1
+META_FILE = "store.json"
+PART_PATTERN = "part-*.arrow"
+# Rows buffered before a part file is written; a few MB of pages
+DEFAULT_BATCH_ROWS = 512
+# Row kinds and the column naming what a row was made from. A re-scan or a
+# re-conversion appends new rows; readers keep only the newest append per key.
+KEYS = {"pages": "file", "samples": "image_file"}
+PAGE_FIELDS = ("page", "width", "height", "source", "template", "grouped", "pii", "anonymized_text", "regions",
+               "word_boxes", "timings")
+SAMPLE_FIELDS = ("tokens", "bboxes", "labels", "image_file")
+
+
+# === Columns of each kind (pyarrow is only imported when a store is read or written) ===
+def store_schema(kind):
+    import pyarrow as pa
+
+    box = pa.list_(pa.int32(), 4)
+    if kind == "pages":
+        return pa.schema([
+            ("file", pa.string()),
+            # Name in grouped_output_<name>_pageN.json (the label scanner keeps the
+            # extension); null: the file name without extension
+            ("output_name", pa.string()),
+            ("page", pa.int32()),  # null: the file failed before any page was scanned
+            ("written_at", pa.int64()),  # time.time_ns() of the append
+            ("width", pa.int32()),
+            ("height", pa.int32()),
+            ("source", pa.string()),
+            ("template", pa.string()),
+            ("grouped", pa.map_(pa.string(), pa.string())),
+            ("pii", pa.list_(pa.struct([
+                ("entity_type", pa.string()),
+                ("start", pa.int32()),
+                ("end", pa.int32()),
+                ("score", pa.float64()),
+                ("boxes", pa.list_(box)),
+            ]))),
+            ("anonymized_text", pa.string()),
+            ("regions", pa.list_(pa.struct([("label", pa.string()), ("box", box)]))),
+            ("word_boxes", pa.list_(box)),
+            ("timings", pa.map_(pa.string(), pa.float64())),
+            ("error", pa.string()),
+            ("duplicate_of", pa.string()),
+        ])
+    if kind == "samples":
+        return pa.schema([
+            ("image_file", pa.string()),
+            ("written_at", pa.int64()),
+            ("fingerprint", pa.string()),
+            ("tokens", pa.list_(pa.string())),
+            ("bboxes", pa.list_(box)),
+            ("labels", pa.list_(pa.string())),
+        ])
+    raise ValueError(f"Unknown store kind: {kind!r} (expected one of: {', '.join(KEYS)})")
+
+
+# === Rows from the JSON layouts, and back ===
+def page_rows(file_path, pages, error=None, duplicate_of=None, written_at=None, output_name=None):
+    # One row per page of a batch_scan result; a file without pages still gets a row
+    base = {"file": file_path, "output_name": output_name, "written_at": written_at or time.time_ns(),
+            "error": error, "duplicate_of": duplicate_of}
+    if not pages:
+        return [dict(base, page=None)]
+    return [dict(base, **{name: page.get(name) for name in PAGE_FIELDS}) for page in pages]
+
+
+def sample_row(sample, written_at=None):
+    return dict(sample, written_at=written_at or time.time_ns())
+
+
+def results_from_rows(rows):
+    # batch_scan result dicts ({"file", "pages", ["error"], ["duplicate_of"]}), in store order
+    results = {}
+    for row in rows:
+        result = results.setdefault(row["file"], {"file": row["file"], "pages": []})
+        for name in ("error", "duplicate_of"):
+            if row.get(name):
+                result[name] = row[name]
+        if row.get("page") is None:
+            continue
+        page = {}
+        for name in PAGE_FIELDS:
+            value = row.get(name)
+            if value is None:
+                continue
+            # Map columns come back as (key, value) pairs
+            page[name] = dict(value) if name in ("grouped", "timings") else value
+        result["pages"].append(page)
+    for result in results.values():
+        result["pages"].sort(key=lambda page: page["page"])
+    return list(results.values())
+
+
+def latest_mask(keys, written_at):
+    # True for rows written by the newest append of their key (Arrow columns in, NumPy out)
+    import pyarrow.compute as pc
+
+    key_ids = pc.index_in(keys, value_set=pc.unique(keys)).to_numpy()
+    written_at = written_at.to_numpy()
+    newest = np.full(len(key_ids) and key_ids.max() + 1, np.iinfo(np.int64).min, dtype=np.int64)
+    np.maximum.at(newest, key_ids, written_at)
+    return written_at == newest[key_ids]
+
+
+# === Append-only columnar store: a directory of Arrow IPC part files ===
+# Rows are buffered and written a batch at a time as a new, immutable part
+# (renamed into place, so readers never see a half-written file). Several
+# processes can append to one store. Reads memory-map the parts and only
+# touch the columns asked for; compact() merges the parts and drops rows
+# superseded by a later append.
+class ResultsStore:
+    def __init__(self, store_dir, kind=None, batch_rows=DEFAULT_BATCH_ROWS):
+        self.store_dir = store_dir
+        self.batch_rows = batch_rows
+        meta_path = os.path.join(store_dir, META_FILE)
+        if os.path.exists(meta_path):
+            with open(meta_path, "r", encoding="utf-8") as f:
+                meta = json.load(f)
+            if meta.get("version") != STORE_VERSION:
+                raise ValueError(f"{store_dir} is a version {meta.get('version')} store, expected {STORE_VERSION}")
+            if kind is not None and meta["kind"] != kind:
+                raise ValueError(f"{store_dir} holds {meta['kind']}, not {kind}")
+            kind = meta["kind"]
+        else:
+            kind = kind or "pages"
+            if kind not in KEYS:
+                raise ValueError(f"Unknown store kind: {kind!r} (expected one of: {', '.join(KEYS)})")
+            os.makedirs(store_dir, exist_ok=True)
+            tmp_path = meta_path + ".tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump({"version": STORE_VERSION, "kind": kind}, f)
+            os.replace(tmp_path, meta_path)
+        self.kind = kind
+        self.key = KEYS[kind]
+        self._schema = None
+        self._rows = []
+
+    @property
+    def schema(self):
+        if self._schema is None:
+            self._schema = store_schema(self.kind)
+        return self._schema
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def parts(self):
+        # Part names start with their write time, so this is append order
+        return sorted(glob.glob(os.path.join(self.store_dir, PART_PATTERN)))
+
+    # --- Writing ---
+    def extend(self, rows):
+        self._rows.extend(rows)
+        if len(self._rows) >= self.batch_rows:
+            self.flush()
+
+    def append_result(self, file_path, pages, error=None, duplicate_of=None, output_name=None):
+        # Pages of one file share written_at, so a re-scan replaces all of them
+        self.extend(page_rows(file_path, pages, error=error, duplicate_of=duplicate_of, output_name=output_name))
+
+    def append_sample(self, sample):
+        self.extend([sample_row(sample)])
+
+    def flush(self):
+        if not self._rows:
+            return None
+        import pyarrow as pa
+
+        path = self._write_part(pa.Table.from_pylist(self._rows, schema=self.schema))
+        self._rows = []
+        return path
+
+    def close(self):
+        self.flush()
+
+    def _write_part(self, table):
+        import pyarrow as pa
+
+        path = os.path.join(self.store_dir, f"part-{time.time_ns():020d}-{os.getpid()}.arrow")
+        tmp_path = path + ".tmp"
+        with pa.OSFile(tmp_path, "wb") as sink, pa.ipc.new_file(sink, self.schema) as writer:
+            for batch in table.to_batches(max_chunksize=self.batch_rows):
+                writer.write_batch(batch)
+        os.replace(tmp_path, path)
+        return path
+
+    # --- Reading ---
+    def read(self, columns=None, latest=True, memory_map=True):
+        # Rows not yet flushed by this writer are not included
+        import pyarrow as pa
+
+        tables = []
+        for path in self.parts():
+            source = pa.memory_map(path, "r") if memory_map else pa.OSFile(path, "rb")
+            tables.append(pa.ipc.open_file(source).read_all())
+        # Parts written before a column was added get it as nulls
+        table = pa.concat_tables([self.schema.empty_table()] + tables, promote_options="default")
+        # Only the requested columns are filtered (copied); the rest stay unread
+        mask = latest_mask(table[self.key], table["written_at"]) if latest and table.num_rows else None
+        if columns:
+            table = table.select(columns)
+        return table.filter(mask) if mask is not None and not mask.all() else table
+
+    def __len__(self):
+        # Distinct keys (files or samples) with their newest rows
+        table = self.read(columns=[self.key])
+        return len(set(table[self.key].to_pylist()))
+
+    def compact(self, keep=None):
+        # One part with the newest rows only. With `keep`, only those keys stay, in that order.
+        import pyarrow as pa
+        import pyarrow.compute as pc
+
+        self.flush()
+        parts = self.parts()
+        # Not memory-mapped: the old parts are deleted below (Windows keeps mapped files open)
+        table = self.read(memory_map=False)
+        if keep is not None:
+            keep = list(keep)
+            positions = pc.index_in(table[self.key], value_set=pa.array(keep, type=pa.string()))
+            table = table.filter(pc.is_valid(positions))
+            table = table.take(pc.sort_indices(positions.filter(pc.is_valid(positions))))
+        path = self._write_part(table) if table.num_rows else None
+        for old in parts:
+            os.remove(old)
+        return path
+
+    def to_parquet(self, parquet_path, columns=None, latest=True):
+        # Single-file snapshot for tools that read Parquet
+        import pyarrow.parquet as pq
+
+        pq.write_table(self.read(columns=columns, latest=latest), parquet_path, compression="zstd")
+
+
+# === Converters from the JSON layouts already on disk ===
+def rows_from_json(json_path):
+    # Returns (kind, rows): batch_scan results, grouped_output_<name>_pageN.json from
+    # the region scanners, or layoutlmv3_dataset.json / .jsonl from the converter.
+    # Imported rows supersede what the store already holds for the same key.
+    written_at = time.time_ns()
+    with open(json_path, "r", encoding="utf-8") as f:
+        if json_path.endswith(".jsonl"):
+            samples = [json.loads(line) for line in f if line.strip()]
+        else:
+            samples = json.load(f)
+    if isinstance(samples, list):
+        # Later lines of a JSONL checkpoint replace earlier ones for the same image
+        return "samples", [sample_row(sample, written_at + i) for i, sample in enumerate(samples)]
+    data = samples
+    if "pages" in data:
+        return "pages", page_rows(data["file"], data["pages"], error=data.get("error"),
+                                  duplicate_of=data.get("duplicate_of"), written_at=written_at)
+    match = re.match(r"grouped_output_(.+)_page(\d+)\.json$", os.path.basename(json_path))
+    if match is None:
+        raise ValueError("not a scan result, grouped output or LayoutLMv3 dataset")
+    # Only the grouped fields were saved; pages of one file get one timestamp in import_json
+    return "pages", page_rows(match.group(1), [{"page": int(match.group(2)), "grouped": data}],
+                              written_at=written_at, output_name=match.group(1))
+
+
+def import_json(store_dir, json_paths, kind=None):
+    imported = 0
+    grouped_pages = {}
+    store = None
+    try:
+        for json_path in json_paths:
+            try:
+                row_kind, rows = rows_from_json(json_path)
+            except (OSError, ValueError, KeyError) as e:
+                print(f"⚠️ Skipped {json_path}: {e}")
+                continue
+            if store is None:
+                # A new store takes the kind of the first file
+                store = ResultsStore(store_dir, kind=kind or (None if os.path.exists(
+                    os.path.join(store_dir, META_FILE)) else row_kind))
+            if row_kind != store.kind:
+                print(f"⚠️ Skipped {json_path}: {row_kind} do not belong in a {store.kind} store")
+                continue
+            if os.path.basename(json_path).startswith("grouped_output_"):
+                grouped_pages.setdefault(rows[0]["file"], []).extend(rows)
+                continue
+            store.extend(rows)
+            imported += 1
+        for rows in grouped_pages.values():
+            written_at = max(row["written_at"] for row in rows)
+            store.extend([dict(row, written_at=written_at) for row in rows])
+            imported += len(rows)
+    finally:
+        if store is not None:
+            store.close()
+    return imported
+
+
+# === Converters back to the JSON layouts ===
+def export_json(store_dir, destination, layout=None):
+    store = ResultsStore(store_dir)
+    if store.kind == "samples":
+        # layoutlmv3_dataset.json (one list) or .jsonl (one sample per line)
+        samples = store.read(columns=list(SAMPLE_FIELDS)).to_pylist()
+        with open(destination, "w", encoding="utf-8") as f:
+            if destination.endswith(".jsonl"):
+                f.writelines(json.dumps(sample, ensure_ascii=False) + "\n" for sample in samples)
+            else:
+                json.dump(samples, f, ensure_ascii=False)
+        return len(samples)
+
+    import scan_pipeline
+
+    os.makedirs(destination, exist_ok=True)
+    rows = store.read().to_pylist()
+    output_names = {row["file"]: row["output_name"] for row in rows}
+    written = 0
+    for result in results_from_rows(rows):
+        if layout == "grouped":
+            # The region scanners' per-page files, named as the scanner that wrote them named them
+            base_filename = output_names[result["file"]] or os.path.splitext(os.path.basename(result["file"]))[0]
+            for page in result["pages"]:
+                json_path = os.path.join(destination, f"grouped_output_{base_filename}_page{page['page']}.json")
+                with open(json_path, "w", encoding="utf-8") as f:
+                    json.dump(page.get("grouped", {}), f, indent=4, ensure_ascii=False)
+                written += 1
+            continue
+        with open(scan_pipeline.result_path(destination, result["file"]), "w", encoding="utf-8") as f:
+            json.dump(result, f, ensure_ascii=False)
+        written += 1
+    return written
+
+
+def print_info(store):
+    parts = store.parts()
+    size = sum(os.path.getsize(path) for path in parts)
+    all_rows = store.read(columns=[store.key], latest=False).num_rows
+    latest = store.read(columns=[store.key])
+    print(f"[🗂️ {store.store_dir}: {store.kind}, {len(parts)} part(s), {size / 1e6:.1f} MB]")
+    print(f"{latest.num_rows} current row(s) from {len(set(latest[store.key].to_pylist()))} {store.key}(s), "
+          f"{all_rows - latest.num_rows} superseded")
+    print("columns: " + ", ".join(store.schema.names))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Columnar (Arrow) store of scan results and LayoutLMv3 samples.")
+    parser.add_argument("--store", default="results_store", help="Store directory (created when missing)")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    import_parser = subparsers.add_parser(
+        "import", help="Add batch_scan results, grouped_output_*.json or layoutlmv3_dataset.json(l) files")
+    import_parser.add_argument("files", nargs="+")
+    import_parser.add_argument("--kind", choices=tuple(KEYS), default=None,
+                               help="Kind of a new store (default: pages)")
+
+    export_parser = subparsers.add_parser(
+        "export", help="Write the current rows back as JSON: a directory for pages, a .json/.jsonl file for samples")
+    export_parser.add_argument("destination")
+    export_parser.add_argument("--layout", choices=("results", "grouped"), default="results",
+                               help="Pages as batch_scan results (one file per resume) or grouped_output per page")
+
+    parquet_parser = subparsers.add_parser("parquet", help="Write the current rows to one Parquet file")
+    parquet_parser.add_argument("output")
+    parquet_parser.add_argument("--columns", nargs="+", default=None)
+
+    subparsers.add_parser("compact", help="Merge the parts and drop superseded rows")
+    subparsers.add_parser("info", help="Parts, rows and columns")
+
+    args = parser.parse_args(argv)
+    start = time.perf_counter()
+    if args.command == "import":
+        files = [path for pattern in args.files for path in sorted(glob.glob(pattern))]
+        count = import_json(args.store, files, kind=args.kind)
+        print(f"✅ Imported {count} result(s) into {args.store} in {time.perf_counter() - start:.1f}s")
+        return 0
+
+    if not os.path.exists(os.path.join(args.store, META_FILE)):
+        print(f"❌ No results store at {args.store}")
+        return 1
+    store = ResultsStore(args.store)
+    if args.command == "export":
+        count = export_json(args.store, args.destination, layout=args.layout)
+        print(f"✅ Wrote {count} JSON file(s)/sample(s) to {args.destination}")
+    elif args.command == "parquet":
+        store.to_parquet(args.output, columns=args.columns)
+        print(f"✅ Parquet written to: {args.output} ({os.path.getsize(args.output) / 1e6:.1f} MB)")
+    elif args.command == "compact":
+        before = len(store.parts())
+        store.compact()
+        print(f"✅ {before} part(s) compacted in {time.perf_counter() - start:.1f}s")
+    else:
+        print_info(store)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,147 @@
+import numpy as np
+from presidio_analyzer import AnalyzerEngine, EntityRecognizer, Pattern, PatternRecognizer, RecognizerRegistry
+from presidio_analyzer.predefined_recognizers import EmailRecognizer, PhoneRecognizer, SpacyRecognizer, UrlRecognizer
+
+from presidio_engine import PROFILES
+from region_assign import points_in_regions, region_array, word_centers
+
+# === Recognizer profiles (names in presidio_engine.PROFILES) ===
+# "default"        every built-in Presidio recognizer (crypto, IBAN, medical
+#                  licence, country IDs, ...), as AnalyzerEngine() ships
+# "resume"         only the entities a resume can carry, plus Malaysian phone
+#                  and LinkedIn patterns, all run over the whole page text
+# "resume-scoped"  same entities, but the pattern recognizers only see the
+#                  words inside the contact regions of the template; spaCy
+#                  NER (names, locations, nationality) still reads every word
+RESUME_ENTITIES = ("PERSON", "EMAIL_ADDRESS", "PHONE_NUMBER", "LOCATION", "URL", "NRP")
+
+# Template labels (predefined_regions / Label Studio) where contact details live
+CONTACT_REGIONS = ("Phone Number", "Email1", "Email2", "Location", "Reference")
+
+PHONE_CONTEXT = ["phone", "tel", "mobile", "hp", "contact", "call", "whatsapp"]
+
+
+# === Malaysian numbers as they come out of OCR: 013-6793858, 012 -3626611, 010 - 2286556 ===
+class MalaysianPhoneRecognizer(PatternRecognizer):
+    PATTERNS = [
+        # Mobile: 01x or +60 1x, then 7 or 8 digits, loose spaces/dashes between groups (never across lines)
+        Pattern(
+            "MY mobile",
+            r"(?<![\d+])(?:\+?60 *-? *|0)1\d *-? *\d{3,4} *-? *\d{4}(?!\d)",
+            0.6,
+        ),
+        # Landline: 0 or +60, area code 3-9, then 7 or 8 digits (03-2345 6789, 07-952 1234)
+        Pattern(
+            "MY landline",
+            r"(?<![\d+])(?:\+?60 *-? *|0)[3-9] *-? *\d{3,4} *-? *\d{4}(?!\d)",
+            0.4,
+        ),
+    ]
+
+    def __init__(self, supported_language="en"):
+        super().__init__(
+            supported_entity="PHONE_NUMBER",
+            name="MalaysianPhoneRecognizer",
+            patterns=self.PATTERNS,
+            context=PHONE_CONTEXT,
+            supported_language=supported_language,
+        )
+
+
+class LinkedInRecognizer(PatternRecognizer):
+    # Profile links often lose their scheme in OCR, which the generic URL recognizer can miss
+    PATTERNS = [
+        Pattern(
+            "LinkedIn profile",
+            r"(?i)\b(?:https?://)?(?:[a-z]{2,3}\.)?linkedin\.com/in/[\w\-%.]+/?",
+            0.8,
+        ),
+    ]
+
+    def __init__(self, supported_language="en"):
+        super().__init__(
+            supported_entity="URL",
+            name="LinkedInRecognizer",
+            patterns=self.PATTERNS,
+            context=["linkedin"],
+            supported_language=supported_language,
+        )
+
+
+def _pattern_recognizers():
+    return [
+        EmailRecognizer(),
+        UrlRecognizer(),
+        PhoneRecognizer(supported_regions=("MY", "SG", "US", "UK")),
+        MalaysianPhoneRecognizer(),
+        LinkedInRecognizer(),
+    ]
+
+
+# === Build the analyzer for a profile ===
+# Returns (analyzer, scoped) where scoped is a list of (recognizer, region
+# labels) that analyze_scoped() runs outside the analyzer. Recognizers are
+# built once per engine, so their regexes are compiled once per process.
+def build_analyzer(profile="resume"):
+    if profile not in PROFILES:
+        raise ValueError(f"Unknown recognizer profile: {profile} (expected one of {', '.join(PROFILES)})")
+    if profile == "default":
+        return AnalyzerEngine(), []
+
+    registry = RecognizerRegistry()
+    registry.add_recognizer(SpacyRecognizer(supported_entities=["PERSON", "LOCATION", "NRP"]))
+    scoped = []
+    for recognizer in _pattern_recognizers():
+        if profile == "resume-scoped":
+            scoped.append((recognizer, CONTACT_REGIONS))
+        else:
+            registry.add_recognizer(recognizer)
+    return AnalyzerEngine(registry=registry, supported_languages=["en"]), scoped
+
+
+# === Region-scoped analysis ===
+def region_spans(ocr_page, regions, labels):
+    # (start, end) page-text spans covering the runs of consecutive words whose
+    # centers fall inside a region with one of the labels
+    boxes = region_array([region for region in regions if region["label"] in labels])
+    if not len(boxes) or not len(ocr_page):
+        return []
+    inside = np.flatnonzero(points_in_regions(word_centers(ocr_page.boxes), boxes).any(axis=1))
+    if not inside.size:
+        return []
+    breaks = np.flatnonzero(np.diff(inside) > 1)
+    firsts = inside[np.r_[0, breaks + 1]]
+    lasts = inside[np.r_[breaks, inside.size - 1]]
+    starts = ocr_page.word_starts
+    return [
+        (int(starts[first]), int(starts[last]) + len(ocr_page.words[last]))
+        for first, last in zip(firsts.tolist(), lasts.tolist())
+    ]
+
+
+def analyze_scoped(ocr_page, regions, scoped, results=(), nlp_artifacts=None, context_enhancer=None,
+                   score_threshold=0.0):
+    # Runs each scoped recognizer over its region spans only (offsets are page-text
+    # offsets), then finishes its hits the way AnalyzerEngine.analyze finishes its
+    # own: context enhancement, score threshold, and duplicate removal together with
+    # `results`, the analyzer's hits for the same page
+    text = ocr_page.text
+    spans_by_labels = {}
+    scoped_results = []
+    for recognizer, labels in scoped:
+        if labels not in spans_by_labels:
+            spans_by_labels[labels] = region_spans(ocr_page, regions, labels)
+        for start, end in spans_by_labels[labels]:
+            for result in recognizer.analyze(text[start:end], recognizer.supported_entities) or []:
+                result.start += start
+                result.end += start
+                scoped_results.append(result)
+    if context_enhancer is not None and scoped_results:
+        scoped_results = context_enhancer.enhance_using_context(
+            text=text, raw_results=scoped_results, nlp_artifacts=nlp_artifacts,
+            recognizers=[recognizer for recognizer, _ in scoped],
+        )
+    scoped_results = [result for result in scoped_results if result.score >= score_threshold]
+    merged = EntityRecognizer.remove_duplicates(list(results) + scoped_results)
+    merged.sort(key=lambda entity: (entity.start, entity.end))
+    return merged
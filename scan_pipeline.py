@@ -0,0 +1,123 @@
+import os
+import time
+
+import presidio_engine
+from ocr_page import DEFAULT_OCR_CONFIG, run_ocr
+from region_assign import group_words
+from region_ocr import ocr_regions
+from regions import scale_regions
+
+SUPPORTED_EXTENSIONS = (".jpg", ".png", ".jpeg", ".bmp", ".tiff", ".webp", ".pdf")
+
+
+# === OCR one page image: whole page, or only the template regions ===
+# Returns (ocr_page, source) where source is "ocr" or "region_ocr".
+def ocr_image(image, template, ocr_config=DEFAULT_OCR_CONFIG, ocr_cache=None, region_ocr=False,
+              region_ocr_threads=None, preprocessor=None):
+    if region_ocr:
+        regions = scale_regions(template, image.shape[1], image.shape[0])
+        ocr_page = ocr_regions(image, regions, config=ocr_config, cache=ocr_cache, max_workers=region_ocr_threads,
+                               preprocessor=preprocessor)
+        return ocr_page, "region_ocr"
+    return run_ocr(image, config=ocr_config, cache=ocr_cache, preprocessor=preprocessor), "ocr"
+
+
+# === Full per-page pipeline: OCR -> Presidio -> region grouping ===
+# region_ocr only applies to template grouping; a grouper needs the whole page.
+def scan_page(image, template, ocr_config=DEFAULT_OCR_CONFIG, ocr_cache=None, grouper=None,
+              region_ocr=False, region_ocr_threads=None, preprocessor=None):
+    start = time.perf_counter()
+    ocr_page, source = ocr_image(
+        image, template, ocr_config=ocr_config, ocr_cache=ocr_cache,
+        region_ocr=region_ocr and grouper is None, region_ocr_threads=region_ocr_threads,
+        preprocessor=preprocessor,
+    )
+    ocr_seconds = time.perf_counter() - start
+
+    page = analyze_page(ocr_page, template, grouper=grouper)
+    page["source"] = source
+    page["timings"]["ocr"] = ocr_seconds
+    return page
+
+
+# === Presidio + region grouping on an already extracted page (OCR or PDF text layer) ===
+# `grouper`, when given, replaces template grouping: it takes the OcrPage and
+# returns the grouped fields (e.g. a LayoutLMv3Extractor bound to the page image).
+def analyze_page(ocr_page, template, grouper=None):
+    return analyze_pages([ocr_page], template, groupers=[grouper])[0]
+
+
+# === Presidio entities for many pages: batched NLP pass + region-scoped recognizers ===
+def find_pii(ocr_pages, template, batch_size=32, n_process=1, templates=None):
+    templates = templates or [template] * len(ocr_pages)
+    texts = [ocr_page.text for ocr_page in ocr_pages]
+    scoped_pages = None
+    if presidio_engine.get_profile() == "resume-scoped":
+        scoped_pages = [
+            (ocr_page, scale_regions(page_template, ocr_page.width, ocr_page.height))
+            for ocr_page, page_template in zip(ocr_pages, templates)
+        ]
+    return presidio_engine.analyze_batch(texts, language="en", batch_size=batch_size, n_process=n_process,
+                                         scoped_pages=scoped_pages)
+
+
+# === Same as analyze_page for many pages, with Presidio NLP batched across them ===
+# `templates` optionally gives each page its own template (e.g. matched from a
+# template_library.TemplateLibrary); otherwise every page uses `template`.
+def analyze_pages(ocr_pages, template, groupers=None, batch_size=32, n_process=1, templates=None):
+    if not ocr_pages:
+        return []
+    groupers = groupers or [None] * len(ocr_pages)
+    templates = templates or [template] * len(ocr_pages)
+    texts = [ocr_page.text for ocr_page in ocr_pages]
+
+    start = time.perf_counter()
+    all_results = find_pii(ocr_pages, template, batch_size=batch_size, n_process=n_process, templates=templates)
+    analyze_seconds = (time.perf_counter() - start) / len(texts)
+
+    start = time.perf_counter()
+    all_anonymized = presidio_engine.anonymize_batch(texts, all_results)
+    anonymize_seconds = (time.perf_counter() - start) / len(texts)
+
+    pages = []
+    for ocr_page, grouper, page_template, results, anonymized in zip(
+            ocr_pages, groupers, templates, all_results, all_anonymized):
+        timings = {"analyze": analyze_seconds, "anonymize": anonymize_seconds}
+        start = time.perf_counter()
+        img_w, img_h = ocr_page.width, ocr_page.height
+        if grouper is not None:
+            regions = []
+            grouped = grouper(ocr_page)
+        else:
+            regions = scale_regions(page_template, img_w, img_h)
+            grouped = group_words(ocr_page, regions)
+        timings["group"] = time.perf_counter() - start
+        pages.append(page_result(ocr_page, results, anonymized.text, regions, grouped, timings))
+    return pages
+
+
+# === JSON-ready result of one page, as written by batch_scan ===
+def page_result(ocr_page, results, anonymized_text, regions, grouped, timings):
+    return {
+        "width": ocr_page.width,
+        "height": ocr_page.height,
+        "grouped": grouped,
+        "pii": [
+            {
+                "entity_type": entity.entity_type,
+                "start": entity.start,
+                "end": entity.end,
+                "score": round(entity.score, 4),
+                "boxes": ocr_page.boxes_for_span(entity.start, entity.end),
+            }
+            for entity in results
+        ],
+        "anonymized_text": anonymized_text,
+        "regions": regions,
+        "timings": timings,
+    }
+
+
+def result_path(output_dir, file_path):
+    base_filename = os.path.splitext(os.path.basename(file_path))[0]
+    return os.path.join(output_dir, f"{base_filename}.json")
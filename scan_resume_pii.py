@@ -1,13 +1,12 @@
 import cv2
-import pytesseract
-import pandas as pd
 from presidio_analyzer import AnalyzerEngine
 from presidio_anonymizer import AnonymizerEngine
 import tkinter as tk
 from tkinter import filedialog
+from ocr_page import run_ocr, set_tesseract_cmd
 
 # === Step 0: Set Tesseract path if it's not in system PATH ===
-pytesseract.pytesseract.tesseract_cmd = r"C:\Program Files\Tesseract-OCR\tesseract.exe"
+set_tesseract_cmd(r"C:\Program Files\Tesseract-OCR\tesseract.exe")
 
 # === Step 1: Select resume image file ===
 def select_file():
@@ -24,10 +23,11 @@ if not image_path:
     print("❌ No file selected. Exiting.")
     exit()
 
-# === Step 2: Read image and extract text ===
+# === Step 2: Read image and run a single OCR pass for text and word boxes ===
 image = cv2.imread(image_path)
 custom_config = r'--psm 6'  # Assume a block of text layout
-ocr_text = pytesseract.image_to_string(image, config=custom_config)
+ocr_page = run_ocr(image, config=custom_config)
+ocr_text = ocr_page.text
 
 print("\n[📝 OCR Extracted Text]")
 print(ocr_text)
@@ -38,7 +38,8 @@ results = analyzer.analyze(text=ocr_text, language="en")
 
 print("\n[🔍 PII Entities Detected]")
 for entity in results:
-    print(f"{entity.entity_type}: {ocr_text[entity.start:entity.end]} (Score: {entity.score:.2f})")
+    print(f"{entity.entity_type}: {ocr_text[entity.start:entity.end]} (Score: {entity.score:.2f}) "
+          f"at {ocr_page.boxes_for_span(entity.start, entity.end)}")
 
 # === Step 4: Anonymize the detected PII ===
 anonymizer = AnonymizerEngine()
@@ -47,14 +48,14 @@ anonymized = anonymizer.anonymize(text=ocr_text, analyzer_results=results)
 print("\n[🔐 Anonymized Text]")
 print(anonymized.text)
 
-# === Step 5: Draw green boxes around detected text regions ===
-data = pytesseract.image_to_data(image, output_type=pytesseract.Output.DATAFRAME)
-confident_data = data[data['conf'] > 60]
-
-for _, row in confident_data.iterrows():
-    (x, y, w, h) = (int(row['left']), int(row['top']), int(row['width']), int(row['height']))
+# === Step 5: Draw green boxes around detected text regions and red boxes around PII ===
+for (x, y, w, h) in ocr_page.confident(60).boxes.tolist():
     cv2.rectangle(image, (x, y), (x + w, y + h), (0, 255, 0), 2)
 
+for entity in results:
+    for (x1, y1, x2, y2) in ocr_page.boxes_for_span(entity.start, entity.end):
+        cv2.rectangle(image, (x1, y1), (x2, y2), (0, 0, 255), 2)
+
 # === Step 6: Save the image with drawn rectangles ===
 output_image_path = "output_detected_text_regions.png"
 cv2.imwrite(output_image_path, image)
@@ -1,130 +1,183 @@
-import cv2
-import pytesseract
-import pandas as pd
-from presidio_analyzer import AnalyzerEngine
-from presidio_anonymizer import AnonymizerEngine
-from tkinter import filedialog
-import tkinter as tk
 import json
 import os
-import numpy as np
-from pdf2image import convert_from_path
-from PIL import Image
+import sys
+import presidio_engine
+import scan_pipeline
+from page_source import PageSource
+from ocr_page import run_ocr, set_tesseract_cmd
+from ocr_cache import OcrCache
+from regions import predefined_template, scale_regions
+from region_assign import group_words
+from region_ocr import ocr_regions
+from preprocess import Preprocessor
+from render_overlay import overlay_path, render_overlay
+from dedup_index import DedupIndex, first_page_signature, text_signature
+from field_index import FieldIndex
+from results_store import ResultsStore
 
 # === Set Tesseract Path ===
-pytesseract.pytesseract.tesseract_cmd = r"C:\Program Files\Tesseract-OCR\tesseract.exe"
+set_tesseract_cmd(r"C:\Program Files\Tesseract-OCR\tesseract.exe")
 
 # === Set Poppler Path ===
 POPPLER_PATH = r"C:\Program Files\Release-24.08.0-0\poppler-24.08.0\Library\bin"
 
-# === Define original layout size used for region design ===
-BASE_WIDTH = 1240
-BASE_HEIGHT = 1750
-
-# === Define Predefined Regions ===
-predefined_regions = {
-    "Name": (481, 18, 1230, 152),
-    "Course": (481, 161, 1230, 284),
-    "Phone Number": (70, 546, 353, 573),
-    "Email1": (70, 599, 353, 630),
-    "Location": (70, 655, 353, 684),
-    "Email2": (70, 712, 353, 749),
-    "Skills": (57, 864, 364, 1196),
-    "Languages": (57, 1254, 364, 1406),
-    "Reference": (9, 1466, 359, 1739),
-    "Profile": (444, 423, 1221, 848),
-    "Work Experience": (444, 928, 1221, 1383),
-    "Education": (444, 1458, 1221, 1740)
-}
+# === OCR cache: re-scans of the same page only pay for grouping ===
+ocr_cache = OcrCache(".ocr_cache")
+
+# === Region-scoped OCR: crop and OCR only the predefined regions, several at once ===
+# Faster on fixed-template resumes; text outside the regions is not scanned for PII
+REGION_OCR = False
+
+# === Preprocessing before OCR: grayscale, downscale oversized text, crop margins ===
+# Off by default, as in batch_scan (--preprocess). Preprocessor() turns it on;
+# add deskew=True / binarize="otsu" for skewed or noisy scans
+PREPROCESSOR = None
+
+# === Annotated overlay: off by default, the grouped results are the output ===
+# "webp" or "jpeg" also saves a downscaled preview of each page (nothing is
+# opened); batch results can be rendered later with render_overlay.py
+OVERLAY_FORMAT = None
+
+# === Near-duplicate index: resumes already scanned (re-exports, photos, edits) are skipped ===
+# Off by default; e.g. "dedup_index.npz" (created when missing, saved once at the end)
+DEDUP_INDEX = None
+
+# === Field index: grouped fields of every scanned resume, searchable with field_index.py ===
+# e.g. python field_index.py query "Skills contains Python AND Languages contains Malay"
+# Name and contact fields are never indexed. Off by default; e.g. "field_index.sqlite"
+FIELD_INDEX = None
+
+# === Results store: every page (grouped fields, PII, word boxes) in columnar Arrow files ===
+# Off by default: the grouped_output_*.json files are the output. e.g. "results_store"
+# writes the pages there instead; `python results_store.py export . --layout grouped`
+# gives back the same JSON files
+RESULTS_STORE = None
 
 # === Select Multiple Files ===
-root = tk.Tk()
-root.withdraw()
-file_paths = filedialog.askopenfilenames(
-    title="Select Resume Images or PDFs",
-    filetypes=[("Supported Files", "*.jpg *.png *.jpeg *.bmp *.tiff *.webp *.pdf")]
-)
+# Paths given on the command line skip the picker, and tkinter is never loaded
+file_paths = sys.argv[1:]
+if not file_paths:
+    import tkinter as tk
+    from tkinter import filedialog
+
+    root = tk.Tk()
+    root.withdraw()
+    file_paths = filedialog.askopenfilenames(
+        title="Select Resume Images or PDFs",
+        filetypes=[("Supported Files", "*.jpg *.png *.jpeg *.bmp *.tiff *.webp *.pdf")]
+    )
 if not file_paths:
     print("❌ No files selected.")
     exit()
 
+# === Load Presidio engines once for every file and page ===
+print("⏳ Loading Presidio engines...")
+presidio_engine.set_profile("resume")  # Resume-only recognizers; "default" for the full Presidio registry
+presidio_engine.warm_up()
+dedup = DedupIndex.load(DEDUP_INDEX) if DEDUP_INDEX else None
+field_index = FieldIndex(FIELD_INDEX) if FIELD_INDEX else None
+results_store = ResultsStore(RESULTS_STORE, kind="pages") if RESULTS_STORE else None
+
 # === Loop Through All Selected Files ===
 for file_path in file_paths:
     print(f"\n📂 Processing: {file_path}")
-    pages = []
-
-    if file_path.lower().endswith(".pdf"):
-        print("📄 PDF detected. Converting pages to images...")
-        pages = convert_from_path(file_path, dpi=300, poppler_path=POPPLER_PATH)
-    else:
-        pages = [Image.open(file_path)]
-
-    for page_index, pil_image in enumerate(pages):
-        image = cv2.cvtColor(np.array(pil_image), cv2.COLOR_RGB2BGR)
+    # === Same first page as a resume scanned before? Skip before any OCR ===
+    known = False
+    if dedup is not None:
+        image_sig = first_page_signature(file_path, poppler_path=POPPLER_PATH)
+        text_sig = None
+        entry, distance = dedup.find_image(image_sig)
+        known = entry is not None
+        if known and entry["file"] != file_path:
+            print(f"♻️ Near-duplicate of {entry['file']} (distance {distance}), skipped.")
+            continue
+
+    # === Stream pages one at a time into a reusable grayscale buffer ===
+    pages = PageSource(file_path, dpi=300, poppler_path=POPPLER_PATH)
+    if pages.is_pdf:
+        print("📄 PDF detected. Rendering pages one at a time...")
+
+    base_filename = os.path.splitext(os.path.basename(file_path))[0]
+    grouped_pages, store_pages = [], []
+    for page_index, gray in pages:
+        # === Scale predefined regions ===
+        img_h, img_w = gray.shape[:2]
+        scaled_regions = scale_regions(predefined_template(), img_w, img_h)
 
-        # === OCR full text extraction ===
+        # === Single OCR pass (or one per region): words, boxes and full text ===
         custom_config = r'--psm 4'
-        ocr_text = pytesseract.image_to_string(image, config=custom_config)
+        if REGION_OCR:
+            ocr_page = ocr_regions(gray, scaled_regions, config=custom_config, cache=ocr_cache,
+                                   preprocessor=PREPROCESSOR)
+        else:
+            ocr_page = run_ocr(gray, config=custom_config, cache=ocr_cache, preprocessor=PREPROCESSOR)
+        ocr_text = ocr_page.text
+        if dedup is not None and page_index == 0:
+            # Photos of a printout or small edits only match on the words
+            text_sig = text_signature(ocr_page.words)
+            entry, similarity = dedup.find_text(text_sig)
+            if entry is not None and entry["file"] != file_path:
+                print(f"⚠️ Same text as {entry['file']} (similarity {similarity:.2f})")
         print("\n[📝 OCR Extracted Text]")
         print(ocr_text)
 
         # === Detect PII ===
-        analyzer = AnalyzerEngine()
-        results = analyzer.analyze(text=ocr_text, language="en")
+        results = presidio_engine.analyze(ocr_text, language="en")
         print("\n[🔍 PII Entities Detected]")
         for entity in results:
-            print(f"{entity.entity_type}: {ocr_text[entity.start:entity.end]} (Score: {entity.score:.2f})")
+            print(f"{entity.entity_type}: {ocr_text[entity.start:entity.end]} (Score: {entity.score:.2f}) "
+                  f"at {ocr_page.boxes_for_span(entity.start, entity.end)}")
 
-        anonymizer = AnonymizerEngine()
-        anonymized = anonymizer.anonymize(text=ocr_text, analyzer_results=results)
+        anonymized = presidio_engine.anonymize(ocr_text, results)
         print("\n[🔐 Anonymized Text]")
         print(anonymized.text)
 
-        # === Scale predefined regions ===
-        img_h, img_w = image.shape[:2]
-        x_scale = img_w / BASE_WIDTH
-        y_scale = img_h / BASE_HEIGHT
-        scaled_regions = {
-            label: (
-                int(x1 * x_scale), int(y1 * y_scale),
-                int(x2 * x_scale), int(y2 * y_scale)
-            )
-            for label, (x1, y1, x2, y2) in predefined_regions.items()
-        }
-
-        # === OCR word-level data ===
-        data = pytesseract.image_to_data(image, output_type=pytesseract.Output.DATAFRAME)
-        region_texts = {label: [] for label in scaled_regions}
-
-        for _, row in data.iterrows():
-            if row['conf'] > 30 and isinstance(row['text'], str) and row['text'].strip():
-                x, y, w, h = int(row['left']), int(row['top']), int(row['width']), int(row['height'])
-                word_center = (x + w // 2, y + h // 2)
-                for label, (rx1, ry1, rx2, ry2) in scaled_regions.items():
-                    if rx1 <= word_center[0] <= rx2 and ry1 <= word_center[1] <= ry2:
-                        region_texts[label].append(row['text'])
-                cv2.rectangle(image, (x, y), (x + w, y + h), (0, 255, 0), 1)
+        # === Group OCR words by region (vectorized) ===
+        grouped_output = group_words(ocr_page, scaled_regions)
+        grouped_pages.append(grouped_output)
 
         # === Print grouped results ===
         print("\n[📌 Grouped Text by Region]")
-        for label, words in region_texts.items():
-            print(f"{label}: {' '.join(words).strip()}")
-
-        # === Export to JSON ===
-        base_filename = os.path.splitext(os.path.basename(file_path))[0]
-        json_path = f"grouped_output_{base_filename}_page{page_index + 1}.json"
-        grouped_output = {label: ' '.join(words).strip() for label, words in region_texts.items()}
-        with open(json_path, "w", encoding="utf-8") as f:
-            json.dump(grouped_output, f, indent=4, ensure_ascii=False)
-        print(f"✅ Grouped data saved to: {json_path}")
-
-        # === Draw labeled region boxes ===
-        for label, (x1, y1, x2, y2) in scaled_regions.items():
-            cv2.rectangle(image, (x1, y1), (x2, y2), (255, 0, 0), 2)
-            cv2.putText(image, label, (x1, y1 - 10), cv2.FONT_HERSHEY_SIMPLEX, 0.6, (255, 0, 0), 2)
-
-        # === Save and open result image ===
-        output_img = f"output_{base_filename}_page{page_index + 1}.png"
-        cv2.imwrite(output_img, image)
-        print(f"✅ Output image saved to: {output_img}")
-        os.startfile(output_img)
\ No newline at end of file
+        for label, text in grouped_output.items():
+            print(f"{label}: {text}")
+
+        # === Export: one row in the results store, or one JSON file per page ===
+        if results_store is not None:
+            page = scan_pipeline.page_result(ocr_page, results, anonymized.text, scaled_regions, grouped_output, {})
+            page.update(page=page_index + 1, word_boxes=ocr_page.confident(30).boxes.tolist())
+            store_pages.append(page)
+        else:
+            json_path = f"grouped_output_{base_filename}_page{page_index + 1}.json"
+            with open(json_path, "w", encoding="utf-8") as f:
+                json.dump(grouped_output, f, indent=4, ensure_ascii=False)
+            print(f"✅ Grouped data saved to: {json_path}")
+
+        # === Optional overlay preview: word boxes, regions and PII ===
+        if OVERLAY_FORMAT:
+            overlay_page = {
+                "width": img_w, "height": img_h, "regions": scaled_regions,
+                "word_boxes": ocr_page.confident(30).boxes.tolist(),
+                "pii": [{"boxes": ocr_page.boxes_for_span(entity.start, entity.end)} for entity in results],
+            }
+            output_img = overlay_path("", file_path, page_index + 1, OVERLAY_FORMAT)
+            with open(output_img, "wb") as f:
+                f.write(render_overlay(gray, overlay_page, fmt=OVERLAY_FORMAT))
+            print(f"✅ Overlay saved to: {output_img}")
+
+    if dedup is not None and not known:
+        dedup.add(image_sig, text_sig, {"file": file_path})
+    if field_index is not None:
+        field_index.add(file_path, grouped_pages)
+        field_index.commit()
+    if results_store is not None:
+        results_store.append_result(file_path, store_pages, output_name=base_filename)
+
+# The whole index is rewritten on save, so only once per run
+if dedup is not None:
+    dedup.save(DEDUP_INDEX)
+if field_index is not None:
+    field_index.close()
+if results_store is not None:
+    results_store.close()
+    print(f"✅ Results saved to: {RESULTS_STORE}")
+presidio_engine.print_engine_stats()
@@ -1,128 +1,200 @@
-import cv2
-import pytesseract
-import pandas as pd
-from presidio_analyzer import AnalyzerEngine
-from presidio_anonymizer import AnonymizerEngine
-from tkinter import filedialog
-import tkinter as tk
 import json
 import os
-import numpy as np
-from pdf2image import convert_from_path
-from PIL import Image
+import sys
+import presidio_engine
+import scan_pipeline
+from page_source import PageSource
+from ocr_page import run_ocr, set_tesseract_cmd
+from ocr_cache import OcrCache
+from regions import load_labelstudio_template, scale_regions
+from template_library import TemplateLibrary
+from region_assign import group_words
+from region_ocr import ocr_regions
+from preprocess import Preprocessor
+from render_overlay import overlay_path, render_overlay
+from dedup_index import DedupIndex, first_page_signature, text_signature
+from field_index import FieldIndex
+from results_store import ResultsStore
 
 # === Set Tesseract Path ===
-pytesseract.pytesseract.tesseract_cmd = r"C:\Program Files\Tesseract-OCR\tesseract.exe"
+set_tesseract_cmd(r"C:\Program Files\Tesseract-OCR\tesseract.exe")
 
 # === Set Poppler Path ===
 POPPLER_PATH = r"C:\Program Files\Release-24.08.0-0\poppler-24.08.0\Library\bin"
 
-# === Load reusable region template from Label Studio JSON ===
-LABELSTUDIO_JSON = r"C:\Users\User\Downloads\PresidioResumeScanner\labelstudio_regions.json"  # ← Update this path
+# === OCR cache: re-scans of the same page only pay for grouping ===
+ocr_cache = OcrCache(".ocr_cache")
+
+# === Region-scoped OCR: crop and OCR only the template regions, several at once ===
+# Faster on fixed-template resumes; text outside the regions is not scanned for PII
+REGION_OCR = False
+
+# === Preprocessing before OCR: grayscale, downscale oversized text, crop margins ===
+# Off by default, as in batch_scan (--preprocess). Preprocessor() turns it on;
+# add deskew=True / binarize="otsu" for skewed or noisy scans
+PREPROCESSOR = None
 
-with open(LABELSTUDIO_JSON, "r", encoding="utf-8") as f:
-    labelstudio_data = json.load(f)
+# === Annotated overlay: off by default, the grouped results are the output ===
+# "webp" or "jpeg" also saves a downscaled preview of each page (nothing is
+# opened); batch results can be rendered later with render_overlay.py
+OVERLAY_FORMAT = None
 
-# === Extract regions from the first labeled example ===
-template_entry = labelstudio_data[0]  # Use the first (or one you want as template)
-template_regions = []
+# === Near-duplicate index: resumes already scanned (re-exports, photos, edits) are skipped ===
+# Off by default; e.g. "dedup_index.npz" (created when missing, saved once at the end)
+DEDUP_INDEX = None
 
-for result in template_entry.get("annotations", [])[0].get("result", []):
-    if result["type"] != "rectanglelabels":
-        continue
-    label = result["value"]["rectanglelabels"][0]
-    x_pct, y_pct = result["value"]["x"], result["value"]["y"]
-    w_pct, h_pct = result["value"]["width"], result["value"]["height"]
-    img_w, img_h = result["original_width"], result["original_height"]
+# === Field index: grouped fields of every scanned resume, searchable with field_index.py ===
+# e.g. python field_index.py query "Skills contains Python AND Languages contains Malay"
+# Name and contact fields are never indexed. Off by default; e.g. "field_index.sqlite"
+FIELD_INDEX = None
 
-    x1 = int(x_pct / 100 * img_w)
-    y1 = int(y_pct / 100 * img_h)
-    x2 = int((x_pct + w_pct) / 100 * img_w)
-    y2 = int((y_pct + h_pct) / 100 * img_h)
+# === Results store: every page (grouped fields, PII, word boxes) in columnar Arrow files ===
+# Off by default: the grouped_output_*.json files are the output. e.g. "results_store"
+# writes the pages there instead; `python results_store.py export . --layout grouped`
+# gives back the same JSON files
+RESULTS_STORE = None
 
-    template_regions.append({"label": label, "box": (x1, y1, x2, y2)})
+# === Load reusable region template from Label Studio JSON ===
+LABELSTUDIO_JSON = r"C:\Users\User\Downloads\PresidioResumeScanner\labelstudio_regions.json"  # ← Update this path
+
+# === Extract regions from the first labeled example (used when no template matches) ===
+template_regions = load_labelstudio_template(LABELSTUDIO_JSON, task_index=0)  # Use the first (or one you want as template)
 
 print(f"✅ Loaded {len(template_regions)} template regions from Label Studio.")
 
+# === Template library: every annotated task, matched to each page by its layout ===
+# Task images are looked up next to the JSON; build it once with
+# `python template_library.py build` and use TemplateLibrary.load() for large exports
+template_library = TemplateLibrary.from_labelstudio(LABELSTUDIO_JSON)
+print(f"✅ Indexed {len(template_library)} layout template(s).")
+
 # === Select Resume Files ===
-root = tk.Tk()
-root.withdraw()
-file_paths = filedialog.askopenfilenames(
-    title="Select Resume Images or PDFs",
-    filetypes=[("Supported Files", "*.jpg *.png *.jpeg *.bmp *.tiff *.webp *.pdf")]
-)
+# Paths given on the command line skip the picker, and tkinter is never loaded
+file_paths = sys.argv[1:]
+if not file_paths:
+    import tkinter as tk
+    from tkinter import filedialog
+
+    root = tk.Tk()
+    root.withdraw()
+    file_paths = filedialog.askopenfilenames(
+        title="Select Resume Images or PDFs",
+        filetypes=[("Supported Files", "*.jpg *.png *.jpeg *.bmp *.tiff *.webp *.pdf")]
+    )
 if not file_paths:
     print("❌ No files selected.")
     exit()
 
+# === Load Presidio engines once for every file and page ===
+print("⏳ Loading Presidio engines...")
+presidio_engine.set_profile("resume")  # Resume-only recognizers; "default" for the full Presidio registry
+presidio_engine.warm_up()
+dedup = DedupIndex.load(DEDUP_INDEX) if DEDUP_INDEX else None
+field_index = FieldIndex(FIELD_INDEX) if FIELD_INDEX else None
+results_store = ResultsStore(RESULTS_STORE, kind="pages") if RESULTS_STORE else None
+
 # === Process Each File ===
 for file_path in file_paths:
     print(f"\n📂 Processing: {file_path}")
-    base_filename = os.path.basename(file_path)
-    pages = []
-
-    if file_path.lower().endswith(".pdf"):
-        pages = convert_from_path(file_path, dpi=300, poppler_path=POPPLER_PATH)
-    else:
-        pages = [Image.open(file_path)]
+    # === Same first page as a resume scanned before? Skip before any OCR ===
+    known = False
+    if dedup is not None:
+        image_sig = first_page_signature(file_path, poppler_path=POPPLER_PATH)
+        text_sig = None
+        entry, distance = dedup.find_image(image_sig)
+        known = entry is not None
+        if known and entry["file"] != file_path:
+            print(f"♻️ Near-duplicate of {entry['file']} (distance {distance}), skipped.")
+            continue
 
-    for page_index, pil_image in enumerate(pages):
-        image = cv2.cvtColor(np.array(pil_image), cv2.COLOR_RGB2BGR)
-
-        # === OCR full text extraction ===
+    base_filename = os.path.basename(file_path)
+    # === Stream pages one at a time into a reusable grayscale buffer ===
+    pages = PageSource(file_path, dpi=300, poppler_path=POPPLER_PATH)
+
+    grouped_pages, store_pages = [], []
+    for page_index, gray in pages:
+        # === Pick the template whose layout is nearest to this page ===
+        page_template, template_name, score = template_library.template_for(image=gray, default=template_regions)
+        print(f"🗂️ Template: {template_name or 'first task (no close match)'} (score {score:.2f})")
+        img_h, img_w = gray.shape[:2]
+        regions = scale_regions(page_template, img_w, img_h)
+
+        # === Single OCR pass (or one per region): words, boxes and full text ===
         custom_config = r'--oem 3 --psm 4 -c preserve_interword_spaces=1'
-        ocr_text = pytesseract.image_to_string(image, config=custom_config)
+        if REGION_OCR:
+            ocr_page = ocr_regions(gray, regions, config=custom_config, cache=ocr_cache,
+                                   preprocessor=PREPROCESSOR)
+        else:
+            ocr_page = run_ocr(gray, config=custom_config, cache=ocr_cache, preprocessor=PREPROCESSOR)
+        ocr_text = ocr_page.text
+        if dedup is not None and page_index == 0:
+            # Photos of a printout or small edits only match on the words
+            text_sig = text_signature(ocr_page.words)
+            entry, similarity = dedup.find_text(text_sig)
+            if entry is not None and entry["file"] != file_path:
+                print(f"⚠️ Same text as {entry['file']} (similarity {similarity:.2f})")
 
         print("\n[📝 OCR Extracted Text]")
         print(ocr_text)
 
         # === Detect PII ===
-        analyzer = AnalyzerEngine()
-        results = analyzer.analyze(text=ocr_text, language="en")
+        results = presidio_engine.analyze(ocr_text, language="en")
         print("\n[🔍 PII Entities Detected]")
         for entity in results:
-            print(f"{entity.entity_type}: {ocr_text[entity.start:entity.end]} (Score: {entity.score:.2f})")
-        anonymizer = AnonymizerEngine()
-        anonymized = anonymizer.anonymize(text=ocr_text, analyzer_results=results)
+            print(f"{entity.entity_type}: {ocr_text[entity.start:entity.end]} (Score: {entity.score:.2f}) "
+                  f"at {ocr_page.boxes_for_span(entity.start, entity.end)}")
+        anonymized = presidio_engine.anonymize(ocr_text, results)
         print("\n[🔐 Anonymized Text]")
         print(anonymized.text)
 
-        # === Reuse same regions for all input files ===
-        regions = template_regions.copy()
-        region_texts = {region["label"]: [] for region in regions}
-
-        # === OCR word-level detection ===
-        ocr_data = pytesseract.image_to_data(image, output_type=pytesseract.Output.DATAFRAME)
-
-        for _, row in ocr_data.iterrows():
-            if row['conf'] > 30 and isinstance(row['text'], str) and row['text'].strip():
-                x, y, w, h = int(row['left']), int(row['top']), int(row['width']), int(row['height'])
-                cx, cy = x + w // 2, y + h // 2
-                for region in regions:
-                    x1, y1, x2, y2 = region["box"]
-                    if x1 <= cx <= x2 and y1 <= cy <= y2:
-                        region_texts[region["label"]].append(row['text'])
-                cv2.rectangle(image, (x, y), (x + w, y + h), (0, 255, 0), 1)
+        # === Group OCR words by region (vectorized) ===
+        grouped_output = group_words(ocr_page, regions)
+        grouped_pages.append(grouped_output)
 
         # === Print grouped text ===
         print("\n[📌 Grouped Text by Region]")
-        for label, words in region_texts.items():
-            print(f"{label}: {' '.join(words).strip()}")
-
-        # === Save JSON output ===
-        output_json = f"grouped_output_{base_filename}_page{page_index + 1}.json"
-        with open(output_json, "w", encoding="utf-8") as f:
-            json.dump({k: ' '.join(v).strip() for k, v in region_texts.items()}, f, indent=4)
-        print(f"✅ JSON saved: {output_json}")
-
-        # === Draw region boxes ===
-        for region in regions:
-            x1, y1, x2, y2 = region["box"]
-            cv2.rectangle(image, (x1, y1), (x2, y2), (255, 0, 0), 2)
-            cv2.putText(image, region["label"], (x1, max(0, y1 - 10)), cv2.FONT_HERSHEY_SIMPLEX, 0.6, (255, 0, 0), 2)
-
-        # === Save image ===
-        output_img = f"output_{base_filename}_page{page_index + 1}.png"
-        cv2.imwrite(output_img, image)
-        print(f"✅ Output image saved: {output_img}")
-        os.startfile(output_img)
+        for label, text in grouped_output.items():
+            print(f"{label}: {text}")
+
+        # === Save: one row in the results store, or one JSON file per page ===
+        if results_store is not None:
+            page = scan_pipeline.page_result(ocr_page, results, anonymized.text, regions, grouped_output, {})
+            page.update(page=page_index + 1, template=template_name,
+                        word_boxes=ocr_page.confident(30).boxes.tolist())
+            store_pages.append(page)
+        else:
+            output_json = f"grouped_output_{base_filename}_page{page_index + 1}.json"
+            with open(output_json, "w", encoding="utf-8") as f:
+                json.dump(grouped_output, f, indent=4)
+            print(f"✅ JSON saved: {output_json}")
+
+        # === Optional overlay preview: word boxes, regions and PII ===
+        if OVERLAY_FORMAT:
+            overlay_page = {
+                "width": img_w, "height": img_h, "regions": regions,
+                "word_boxes": ocr_page.confident(30).boxes.tolist(),
+                "pii": [{"boxes": ocr_page.boxes_for_span(entity.start, entity.end)} for entity in results],
+            }
+            output_img = overlay_path("", file_path, page_index + 1, OVERLAY_FORMAT)
+            with open(output_img, "wb") as f:
+                f.write(render_overlay(gray, overlay_page, fmt=OVERLAY_FORMAT))
+            print(f"✅ Overlay saved to: {output_img}")
+
+    if dedup is not None and not known:
+        dedup.add(image_sig, text_sig, {"file": file_path})
+    if field_index is not None:
+        field_index.add(file_path, grouped_pages)
+        field_index.commit()
+    if results_store is not None:
+        # This scanner keeps the extension in its file names
+        results_store.append_result(file_path, store_pages, output_name=base_filename)
+
+# The whole index is rewritten on save, so only once per run
+if dedup is not None:
+    dedup.save(DEDUP_INDEX)
+if field_index is not None:
+    field_index.close()
+if results_store is not None:
+    results_store.close()
+    print(f"✅ Results saved to: {RESULTS_STORE}")
+presidio_engine.print_engine_stats()
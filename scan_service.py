@@ -0,0 +1,389 @@
+import argparse
+import asyncio
+import json
+import os
+import shutil
+import tempfile
+import time
+import uuid
+from collections import OrderedDict
+from functools import partial
+from urllib.parse import parse_qs, urlsplit
+
+import batch_scan
+import scan_pipeline
+from page_source import PageSource
+from render_overlay import DEFAULT_MAX_WIDTH, DEFAULT_QUALITY, OVERLAY_FORMATS
+
+CONTENT_TYPES = {"webp": "image/webp", "jpeg": "image/jpeg"}
+
+STATUS_TEXT = {
+    200: "OK", 202: "Accepted", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed",
+    409: "Conflict", 411: "Length Required", 413: "Payload Too Large", 500: "Internal Server Error",
+    503: "Service Unavailable",
+}
+
+
+class HttpError(Exception):
+    def __init__(self, status, message, headers=None):
+        super().__init__(message)
+        self.status = status
+        self.headers = headers or {}
+
+
+# === One submitted file and the pages finished so far ===
+class Job:
+    def __init__(self, job_id, file_path, filename, page_count):
+        self.id = job_id
+        self.file_path = file_path
+        self.filename = filename
+        self.page_count = page_count
+        self.state = "queued"
+        self.pages = []  # in completion order, so streams can resume from an index
+        self.errors = []
+        self.submitted = time.time()
+        self.finished = None
+        self._changed = asyncio.Condition()
+
+    @property
+    def done(self):
+        return self.state in ("done", "failed")
+
+    async def add(self, page_index, page, error):
+        # Returns True for the call that finished the job
+        async with self._changed:
+            if error is None:
+                self.pages.append(page)
+            else:
+                self.errors.append(f"page {page_index + 1}: {error}")
+            finished = len(self.pages) + len(self.errors) == self.page_count
+            if finished:
+                self.state = "done" if self.pages else "failed"
+                self.finished = time.time()
+            self._changed.notify_all()
+        return finished
+
+    async def wait_for_pages(self, seen):
+        # Until more than `seen` pages are finished or the job is over
+        async with self._changed:
+            await self._changed.wait_for(lambda: len(self.pages) > seen or self.done)
+
+    def status(self):
+        return {
+            "job_id": self.id,
+            "file": self.filename,
+            "state": self.state,
+            "pages": self.page_count,
+            "pages_done": len(self.pages) + len(self.errors),
+            "errors": self.errors,
+            "seconds": round((self.finished or time.time()) - self.submitted, 3),
+        }
+
+
+# === Job queue in front of the scan process pool ===
+# Submitted files wait in a bounded queue; once it is full new submissions
+# are refused with 503 + Retry-After instead of piling up in memory. A single
+# dispatcher splits each job into page chunks and keeps at most max_pending
+# chunks in the pool, so pages of the next job start as soon as a worker
+# frees up and each finished chunk is visible to clients right away.
+class ScanService:
+    def __init__(self, pool, spool_dir, output_dir=None, max_pending=4, max_queued_jobs=16, pages_per_task=2,
+                 poppler_path=None, keep_jobs=1000):
+        self.pool = pool
+        self.spool_dir = spool_dir
+        self.output_dir = output_dir
+        self.pages_per_task = pages_per_task
+        self.poppler_path = poppler_path
+        self.keep_jobs = keep_jobs
+        self.jobs = OrderedDict()
+        self._queue = asyncio.Queue(maxsize=max_queued_jobs)
+        self._slots = asyncio.Semaphore(max_pending)
+        self._tasks = set()
+
+    async def start(self, workers):
+        # Start every worker now: its initializer loads Presidio, spaCy and the
+        # templates/models once, so the first request does not pay for it
+        loop = asyncio.get_running_loop()
+        await asyncio.gather(*(loop.run_in_executor(self.pool, os.getpid) for _ in range(workers)))
+        self._spawn(self._dispatch())
+
+    def _spawn(self, coro):
+        task = asyncio.create_task(coro)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    def stats(self):
+        return {
+            "queued_jobs": self._queue.qsize(),
+            "queue_limit": self._queue.maxsize,
+            "running_jobs": sum(1 for job in self.jobs.values() if job.state == "running"),
+            "jobs": len(self.jobs),
+        }
+
+    def _spool(self, file_path, data):
+        os.makedirs(os.path.dirname(file_path), exist_ok=True)
+        with open(file_path, "wb") as f:
+            f.write(data)
+        return len(PageSource(file_path, poppler_path=self.poppler_path))
+
+    async def submit(self, filename, data):
+        filename = os.path.basename(filename.replace("\\", "/"))
+        if not filename.lower().endswith(scan_pipeline.SUPPORTED_EXTENSIONS):
+            raise HttpError(400, f"Unsupported file type: {filename or '(no filename)'}")
+        if self._queue.full():
+            raise HttpError(503, "Queue full, retry later", {"Retry-After": "5"})
+
+        job_id = uuid.uuid4().hex
+        job_dir = os.path.join(self.spool_dir, job_id)
+        file_path = os.path.join(job_dir, filename)
+        try:
+            page_count = await asyncio.get_running_loop().run_in_executor(None, self._spool, file_path, data)
+            if page_count == 0:
+                raise ValueError("no pages")
+        except Exception as e:
+            shutil.rmtree(job_dir, ignore_errors=True)
+            raise HttpError(400, f"Could not open {filename}: {e}")
+
+        job = Job(job_id, file_path, filename, page_count)
+        try:
+            self._queue.put_nowait(job)
+        except asyncio.QueueFull:
+            shutil.rmtree(job_dir, ignore_errors=True)
+            raise HttpError(503, "Queue full, retry later", {"Retry-After": "5"})
+        self.jobs[job_id] = job
+        self._evict()
+        return job
+
+    def remove(self, job):
+        if not job.done:
+            raise HttpError(409, "Job still running")
+        del self.jobs[job.id]
+        shutil.rmtree(os.path.dirname(job.file_path), ignore_errors=True)
+
+    def _evict(self):
+        # Forget the oldest finished jobs (and their spooled files) beyond keep_jobs
+        finished = [job for job in self.jobs.values() if job.done]
+        for job in finished[:max(0, len(self.jobs) - self.keep_jobs)]:
+            self.remove(job)
+
+    async def _dispatch(self):
+        while True:
+            job = await self._queue.get()
+            job.state = "running"
+            pages = [(job.file_path, page_index) for page_index in range(job.page_count)]
+            for i in range(0, len(pages), self.pages_per_task):
+                await self._slots.acquire()
+                self._spawn(self._run_chunk(job, pages[i:i + self.pages_per_task]))
+
+    async def _run_chunk(self, job, chunk):
+        try:
+            outcomes = await asyncio.get_running_loop().run_in_executor(self.pool, batch_scan.scan_pages, chunk)
+        except Exception as e:
+            outcomes = [(file_path, page_index, None, str(e)) for file_path, page_index in chunk]
+        finally:
+            self._slots.release()
+
+        for _, page_index, page, error in outcomes:
+            if error is not None:
+                print(f"❌ {job.filename} page {page_index + 1} failed: {error}")
+            if await job.add(page_index, page, error) and self.output_dir:
+                await asyncio.get_running_loop().run_in_executor(
+                    None, partial(batch_scan.write_result, self.output_dir, job.file_path, job.pages,
+                                  error="; ".join(job.errors) or None),
+                )
+
+    async def render(self, job, page_number, fmt="webp", max_width=DEFAULT_MAX_WIDTH, quality=DEFAULT_QUALITY):
+        page = next((page for page in job.pages if page["page"] == page_number), None)
+        if page is None:
+            raise HttpError(404, f"Page {page_number} is not finished")
+        # Rendering takes a pool slot like a scan chunk, so it obeys the same backpressure
+        async with self._slots:
+            return await asyncio.get_running_loop().run_in_executor(
+                self.pool, batch_scan.render_page, job.file_path, page_number - 1, page, fmt, max_width, quality,
+            )
+
+
+# === Minimal HTTP/1.1 on asyncio streams (one request per connection) ===
+def _head(status, headers):
+    lines = [f"HTTP/1.1 {status} {STATUS_TEXT.get(status, '')}"]
+    lines += [f"{name}: {value}" for name, value in headers.items()]
+    lines += ["Connection: close", "", ""]
+    return "\r\n".join(lines).encode("latin-1")
+
+
+async def _send(writer, status, body, content_type="application/json", headers=None):
+    if not isinstance(body, bytes):
+        body = json.dumps(body, ensure_ascii=False).encode("utf-8")
+    writer.write(_head(status, {"Content-Type": content_type, "Content-Length": len(body), **(headers or {})}) + body)
+    await writer.drain()
+
+
+async def _read_request(reader, writer, max_body_bytes):
+    head = await reader.readuntil(b"\r\n\r\n")
+    request_line, *header_lines = head.decode("latin-1").split("\r\n")
+    try:
+        method, target, _ = request_line.split(" ", 2)
+    except ValueError:
+        raise HttpError(400, "Malformed request line")
+    headers = {}
+    for line in header_lines:
+        if ":" in line:
+            name, value = line.split(":", 1)
+            headers[name.strip().lower()] = value.strip()
+
+    body = b""
+    if method in ("POST", "PUT"):
+        if "content-length" not in headers:
+            raise HttpError(411, "Content-Length required")
+        length = int(headers["content-length"])
+        if length > max_body_bytes:
+            raise HttpError(413, f"Upload larger than {max_body_bytes // (1024 * 1024)} MB")
+        if headers.get("expect", "").lower() == "100-continue":
+            writer.write(b"HTTP/1.1 100 Continue\r\n\r\n")
+            await writer.drain()
+        body = await reader.readexactly(length)
+    return method, target, body
+
+
+async def _stream_results(writer, job):
+    # NDJSON, one line per page as it finishes, then a final status line
+    writer.write(_head(200, {"Content-Type": "application/x-ndjson", "Transfer-Encoding": "chunked"}))
+    sent = 0
+    while True:
+        await job.wait_for_pages(sent)
+        new_pages = job.pages[sent:]
+        sent += len(new_pages)
+        lines = [json.dumps(page, ensure_ascii=False) for page in new_pages]
+        finished = job.done and sent == len(job.pages)
+        if finished:
+            lines.append(json.dumps({"done": True, **job.status()}, ensure_ascii=False))
+        data = "".join(line + "\n" for line in lines).encode("utf-8")
+        if data:
+            writer.write(f"{len(data):X}\r\n".encode("latin-1") + data + b"\r\n")
+            await writer.drain()
+        if finished:
+            break
+    writer.write(b"0\r\n\r\n")
+    await writer.drain()
+
+
+async def _route(service, method, target, body, writer):
+    url = urlsplit(target)
+    parts = [part for part in url.path.split("/") if part]
+    query = parse_qs(url.query)
+
+    if parts == ["health"]:
+        return await _send(writer, 200, {"status": "ok", **service.stats()})
+
+    if parts == ["jobs"]:
+        if method == "POST":
+            job = await service.submit(query.get("filename", [""])[0], body)
+            return await _send(writer, 202, job.status(), headers={"Location": f"/jobs/{job.id}"})
+        if method == "GET":
+            return await _send(writer, 200, [job.status() for job in service.jobs.values()])
+        raise HttpError(405, "Use GET or POST")
+
+    if len(parts) >= 2 and parts[0] == "jobs":
+        job = service.jobs.get(parts[1])
+        if job is None:
+            raise HttpError(404, f"Unknown job: {parts[1]}")
+        if len(parts) == 2 and method == "GET":
+            return await _send(writer, 200, job.status())
+        if len(parts) == 2 and method == "DELETE":
+            service.remove(job)
+            return await _send(writer, 200, {"deleted": job.id})
+        if parts[2:] == ["results"] and method == "GET":
+            return await _stream_results(writer, job)
+        if len(parts) == 5 and parts[2] == "pages" and parts[4] == "overlay" and method == "GET":
+            fmt = query.get("format", ["webp"])[0]
+            if fmt not in OVERLAY_FORMATS:
+                raise HttpError(400, f"Unknown format: {fmt}")
+            try:
+                page_number = int(parts[3])
+                max_width = int(query.get("max_width", [DEFAULT_MAX_WIDTH])[0])
+                quality = int(query.get("quality", [DEFAULT_QUALITY])[0])
+            except ValueError:
+                raise HttpError(400, "Page number, max_width and quality must be integers")
+            image = await service.render(job, page_number, fmt=fmt, max_width=max_width, quality=quality)
+            return await _send(writer, 200, image, content_type=CONTENT_TYPES[fmt])
+
+    raise HttpError(404, f"No route for {method} {url.path}")
+
+
+async def handle_connection(service, max_body_bytes, reader, writer):
+    try:
+        try:
+            method, target, body = await _read_request(reader, writer, max_body_bytes)
+            await _route(service, method, target, body, writer)
+        except HttpError as e:
+            await _send(writer, e.status, {"error": str(e)}, headers=e.headers)
+        except (ConnectionError, asyncio.IncompleteReadError, asyncio.LimitOverrunError):
+            pass
+        except Exception as e:
+            print(f"❌ Request failed: {e}")
+            await _send(writer, 500, {"error": str(e)})
+    except ConnectionError:
+        pass
+    finally:
+        writer.close()
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Local resume scanning service (HTTP, job queue, streamed results).")
+    parser.add_argument("--host", default="127.0.0.1", help="Listen address (keep it local: results contain PII)")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("-w", "--workers", type=int, default=None, help="Worker processes (default: CPU count)")
+    parser.add_argument("--max-pending", type=int, default=None,
+                        help="Page chunks in the pool at once (default: 2 x workers)")
+    parser.add_argument("--max-queued-jobs", type=int, default=16,
+                        help="Files waiting to start; further submissions get 503 + Retry-After")
+    parser.add_argument("--pages-per-task", type=int, default=2,
+                        help="Pages per worker task; smaller streams results sooner, larger batches Presidio better")
+    parser.add_argument("--max-upload-mb", type=int, default=50)
+    parser.add_argument("--spool-dir", default=None,
+                        help="Where uploads are kept while their job is known (default: a temporary directory)")
+    parser.add_argument("-o", "--output-dir", default=None, help="Also write each finished job's JSON here")
+    parser.add_argument("--keep-jobs", type=int, default=1000, help="Finished jobs kept for polling")
+    batch_scan.add_pipeline_arguments(parser)
+    return parser.parse_args(argv)
+
+
+async def serve(args):
+    options = batch_scan.pipeline_options(args)
+    workers = args.workers or os.cpu_count() or 1
+    spool_dir = args.spool_dir or tempfile.mkdtemp(prefix="scan_service_")
+    os.makedirs(spool_dir, exist_ok=True)
+    if args.output_dir:
+        os.makedirs(args.output_dir, exist_ok=True)
+
+    try:
+        with batch_scan.scan_pool(workers=workers, **options) as pool:
+            service = ScanService(
+                pool, spool_dir, output_dir=args.output_dir, max_pending=args.max_pending or workers * 2,
+                max_queued_jobs=args.max_queued_jobs, pages_per_task=args.pages_per_task,
+                poppler_path=args.poppler_path, keep_jobs=args.keep_jobs,
+            )
+            print(f"⏳ Loading engines in {workers} worker(s)...")
+            await service.start(workers)
+            server = await asyncio.start_server(
+                partial(handle_connection, service, args.max_upload_mb * 1024 * 1024), args.host, args.port,
+            )
+            print(f"✅ Listening on http://{args.host}:{args.port}")
+            async with server:
+                await server.serve_forever()
+    finally:
+        if not args.spool_dir:
+            shutil.rmtree(spool_dir, ignore_errors=True)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    try:
+        asyncio.run(serve(args))
+    except KeyboardInterrupt:
+        print("👋 Service stopped")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
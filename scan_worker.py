@@ -0,0 +1,227 @@
+import argparse
+import json
+import os
+import socket
+import socketserver
+import sys
+import time
+
+DEFAULT_PORT = 8766
+
+
+# === Long-lived scanning worker: engines load once, then one job per line ===
+# Intake hooks that scan one resume at a time spend most of a fresh process in
+# imports and Presidio/spaCy start-up. `serve` pays that once and keeps the
+# engines resident; jobs come in over stdin or a local TCP socket and each
+# reply is one JSON line. `send` is the client, and only needs the standard
+# library, so a hook starts in tens of milliseconds.
+#
+# A job is a file path, or {"file": ..., "output_dir": ...}. Files are
+# scanned one after another in this process, with the same stages and options
+# as batch_scan; for parallel scanning use batch_scan or scan_service.
+def load_engines(options):
+    import batch_scan
+
+    start = time.perf_counter()
+    batch_scan.init_worker(batch_scan.worker_options(**options))
+    return time.perf_counter() - start
+
+
+def scan_file(file_path, output_dir, pages_per_task=8, poppler_path=None, field_index=None, results_store=None):
+    import batch_scan
+    from page_source import PageSource
+
+    start = time.perf_counter()
+    os.makedirs(output_dir, exist_ok=True)
+    page_count = len(PageSource(file_path, poppler_path=poppler_path))
+    pages, errors = [], []
+    # Chunks keep a long PDF from holding every page at once, as in batch_scan
+    for first in range(0, page_count, pages_per_task):
+        chunk = [(file_path, page_index) for page_index in range(first, min(page_count, first + pages_per_task))]
+        for _, page_index, page, error in batch_scan.scan_pages(chunk):
+            if error is None:
+                pages.append(page)
+            else:
+                errors.append(f"page {page_index + 1}: {error}")
+    error = "; ".join(errors) or (None if page_count else "no pages")
+    json_path = batch_scan.write_result(output_dir, file_path, pages, error=error)
+    if field_index is not None and not error:
+        field_index.add(file_path, [page["grouped"] for page in pages])
+        field_index.commit()
+    if results_store is not None:
+        # Buffered: rows reach the store every batch_rows pages and when the worker stops
+        results_store.append_result(file_path, pages, error=error)
+
+    reply = {"file": file_path, "result": json_path, "pages": page_count,
+             "seconds": round(time.perf_counter() - start, 3)}
+    if error:
+        reply["error"] = error
+    return reply
+
+
+def parse_job(line):
+    line = line.strip()
+    if line.startswith("{"):
+        return json.loads(line)
+    return {"file": line}
+
+
+class JobRunner:
+    def __init__(self, output_dir, pages_per_task=8, poppler_path=None, field_index=None, results_store=None):
+        self.output_dir = output_dir
+        self.pages_per_task = pages_per_task
+        self.poppler_path = poppler_path
+        self.field_index = field_index
+        self.results_store = results_store
+        self.jobs_done = 0
+
+    def __call__(self, line):
+        # Never raises: a bad job gets an error reply and the worker carries on
+        file_path = None
+        try:
+            job = parse_job(line)
+            file_path = job["file"]
+            if not os.path.isfile(file_path):
+                return {"file": file_path, "error": "file not found"}
+            reply = scan_file(
+                file_path, job.get("output_dir") or self.output_dir, pages_per_task=self.pages_per_task,
+                poppler_path=self.poppler_path, field_index=self.field_index, results_store=self.results_store,
+            )
+        except Exception as e:
+            return {"file": file_path, "error": str(e)}
+        self.jobs_done += 1
+        status = "❌" if "error" in reply else "✅"
+        print(f"{status} {file_path} ({reply['pages']} page(s), {reply['seconds']:.2f}s)")
+        return reply
+
+
+def serve_stdin(runner, replies):
+    # One JSON line per job on `replies` (the real stdout); progress output goes to stderr
+    for line in sys.stdin:
+        if line.strip():
+            replies.write(json.dumps(runner(line), ensure_ascii=False) + "\n")
+            replies.flush()
+
+
+class _JobHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        for line in self.rfile:
+            if line.strip():
+                reply = self.server.runner(line.decode("utf-8"))
+                self.wfile.write((json.dumps(reply, ensure_ascii=False) + "\n").encode("utf-8"))
+                self.wfile.flush()
+
+
+class JobServer(socketserver.TCPServer):
+    # One connection at a time: the engines and page buffers belong to this process
+    allow_reuse_address = True
+
+    def __init__(self, address, runner):
+        super().__init__(address, _JobHandler)
+        self.runner = runner
+
+
+# === Client: hand files to a running worker and print its replies ===
+def send(file_paths, host="127.0.0.1", port=DEFAULT_PORT, output_dir=None, timeout=None):
+    with socket.create_connection((host, port), timeout=timeout) as sock:
+        stream = sock.makefile("rwb")
+        for file_path in file_paths:
+            # The worker may run in another directory
+            job = {"file": os.path.abspath(file_path)}
+            if output_dir:
+                job["output_dir"] = os.path.abspath(output_dir)
+            stream.write((json.dumps(job, ensure_ascii=False) + "\n").encode("utf-8"))
+        stream.flush()
+        sock.shutdown(socket.SHUT_WR)
+        return [json.loads(line) for line in stream if line.strip()]
+
+
+def parse_args(argv=None):
+    argv = sys.argv[1:] if argv is None else list(argv)
+    parser = argparse.ArgumentParser(description="Long-lived resume scanning worker and its client.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    serve_parser = subparsers.add_parser("serve", help="Load the engines once and scan jobs as they arrive")
+    serve_parser.add_argument("-o", "--output-dir", required=True, help="Directory for per-file JSON results")
+    serve_parser.add_argument("--stdin", action="store_true",
+                              help="Read jobs from stdin and reply on stdout instead of listening on a socket")
+    serve_parser.add_argument("--host", default="127.0.0.1", help="Listen address (keep it local: results contain PII)")
+    serve_parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    serve_parser.add_argument("--pages-per-task", type=int, default=8,
+                              help="Pages whose texts share one Presidio NLP batch")
+    serve_parser.add_argument("--field-index", default=None, help="Field search index to update with every result")
+    serve_parser.add_argument("--results-store", default=None, help="Columnar results store to append every result to")
+
+    send_parser = subparsers.add_parser("send", help="Scan files on a running worker (standard library only)")
+    send_parser.add_argument("files", nargs="+")
+    send_parser.add_argument("--host", default="127.0.0.1")
+    send_parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    send_parser.add_argument("-o", "--output-dir", default=None, help="Override the worker's output directory")
+    send_parser.add_argument("--timeout", type=float, default=None, help="Seconds to wait for each reply")
+
+    if argv[:1] == ["serve"]:
+        # Only the worker needs the scan stages and their options
+        import batch_scan
+
+        batch_scan.add_pipeline_arguments(serve_parser)
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.command == "send":
+        try:
+            replies = send(args.files, host=args.host, port=args.port, output_dir=args.output_dir,
+                           timeout=args.timeout)
+        except OSError as e:
+            print(f"❌ No worker on {args.host}:{args.port}: {e}")
+            return 1
+        for reply in replies:
+            if "error" in reply:
+                print(f"❌ {reply['file']}: {reply['error']}")
+            else:
+                print(f"✅ {reply['file']} -> {reply['result']} ({reply['seconds']:.2f}s)")
+        return 1 if any("error" in reply for reply in replies) else 0
+
+    import batch_scan
+
+    replies = sys.stdout
+    if args.stdin:
+        # stdout carries only the replies; every message goes to stderr
+        sys.stdout = sys.stderr
+    options = batch_scan.pipeline_options(args)
+    print("⏳ Loading engines...")
+    print(f"✅ Engines loaded in {load_engines(options):.1f}s")
+
+    field_index = None
+    if args.field_index:
+        from field_index import FieldIndex
+
+        field_index = FieldIndex(args.field_index)
+    results_store = None
+    if args.results_store:
+        from results_store import ResultsStore
+
+        results_store = ResultsStore(args.results_store, kind="pages")
+    runner = JobRunner(args.output_dir, pages_per_task=args.pages_per_task, poppler_path=args.poppler_path,
+                       field_index=field_index, results_store=results_store)
+    try:
+        if args.stdin:
+            serve_stdin(runner, replies)
+        else:
+            with JobServer((args.host, args.port), runner) as server:
+                print(f"✅ Listening on {args.host}:{args.port}")
+                server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if field_index is not None:
+            field_index.close()
+        if results_store is not None:
+            results_store.close()
+    print(f"👋 Worker stopped after {runner.jobs_done} file(s)")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,216 @@
+import argparse
+import json
+import os
+import time
+
+import cv2
+import numpy as np
+
+from region_assign import RegionIndex
+from regions import regions_from_labelstudio_task, scale_regions
+
+# Ink-density grid (columns, rows); 16 x 24 roughly keeps the A4 aspect ratio
+FINGERPRINT_SIZE = (16, 24)
+DEFAULT_MIN_SCORE = 0.5
+# Text-layer pages: templates scoring within this of the best layout score are
+# re-ranked by how many of the page's words fall inside their regions
+DEFAULT_TIE_MARGIN = 0.05
+
+
+# === Layout fingerprint: a tiny ink-density grid, mean-centred and L2-normalised ===
+# The dot product of two fingerprints is their correlation, so a page matches
+# the template whose columns, sidebars and header blocks sit in the same places.
+def _normalize(grid):
+    ink = grid.astype(np.float32).ravel()
+    ink -= ink.mean()
+    norm = np.linalg.norm(ink)
+    return ink / norm if norm else ink
+
+
+def layout_fingerprint(image, size=FINGERPRINT_SIZE):
+    height, width = image.shape[:2]
+    # Strided subsample first so a 300 DPI page costs about as much as a thumbnail
+    step = max(1, min(height // (size[1] * 4), width // (size[0] * 4)))
+    small = image[::step, ::step]
+    if small.ndim == 3:
+        small = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY)
+    grid = cv2.resize(small, size, interpolation=cv2.INTER_AREA)
+    return _normalize(255 - grid.astype(np.float32))
+
+
+def _box_grid(boxes, width, height, size):
+    # Rasterise (x, y, w, h) boxes on a 4x finer canvas, then average down to the grid
+    canvas = np.zeros((size[1] * 4, size[0] * 4), dtype=np.uint8)
+    x_scale = canvas.shape[1] / width
+    y_scale = canvas.shape[0] / height
+    for x, y, w, h in np.asarray(boxes).reshape(-1, 4).tolist():
+        cv2.rectangle(canvas, (int(x * x_scale), int(y * y_scale)),
+                      (int((x + w) * x_scale), int((y + h) * y_scale)), 255, thickness=-1)
+    return _normalize(cv2.resize(canvas, size, interpolation=cv2.INTER_AREA))
+
+
+# === Text fingerprint: where the words are, ignoring filled blocks and photos ===
+# Pages without an image (PDF text layer) only have word boxes, and those do
+# not correlate with the ink grid, so templates also keep a grid of their
+# glyph boxes and such pages are matched against that.
+def text_fingerprint(image, size=FINGERPRINT_SIZE):
+    height, width = image.shape[:2]
+    step = max(1, min(height // (size[1] * 16), width // (size[0] * 16)))
+    small = image[::step, ::step]
+    if small.ndim == 3:
+        small = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY)
+    _, mask = cv2.threshold(small, 0, 255, cv2.THRESH_BINARY_INV | cv2.THRESH_OTSU)
+    _, _, stats, _ = cv2.connectedComponentsWithStats(mask, connectivity=8)
+    stats = stats[1:]
+    heights = stats[:, cv2.CC_STAT_HEIGHT]
+    glyphs = stats[(heights >= 2) & (heights <= mask.shape[0] // 20) & (stats[:, cv2.CC_STAT_WIDTH] <= heights * 4)]
+    return _box_grid(glyphs[:, :4], small.shape[1], small.shape[0], size)
+
+
+def box_fingerprint(ocr_page, size=FINGERPRINT_SIZE):
+    return _box_grid(ocr_page.boxes, ocr_page.width, ocr_page.height, size)
+
+
+# === Library of region templates, indexed by fingerprint ===
+# Fingerprints of every template are stacked into one matrix once; matching a
+# page is a single matrix-vector product and an argmax. Page images are
+# matched on ink, text-layer pages on word positions. A text-layer page's
+# words are known before grouping, so near-ties there are broken by region
+# coverage, scored for all tied templates at once through a RegionIndex
+# (one per page size, built on first use).
+class TemplateLibrary:
+    def __init__(self, templates, fingerprints, text_fingerprints, names, min_score=DEFAULT_MIN_SCORE,
+                 tie_margin=DEFAULT_TIE_MARGIN):
+        self.templates = list(templates)
+        self.fingerprints = np.asarray(fingerprints, dtype=np.float32).reshape(len(self.templates), -1)
+        self.text_fingerprints = np.asarray(text_fingerprints, dtype=np.float32).reshape(len(self.templates), -1)
+        self.names = list(names)
+        self.min_score = min_score
+        self.tie_margin = tie_margin
+        self._region_indexes = {}
+
+    def __len__(self):
+        return len(self.templates)
+
+    @classmethod
+    def from_labelstudio(cls, labelstudio_json, image_folder=None, min_score=DEFAULT_MIN_SCORE):
+        # One template per annotated task whose image can be found locally
+        with open(labelstudio_json, "r", encoding="utf-8") as f:
+            tasks = json.load(f)
+        image_folder = image_folder or os.path.dirname(os.path.abspath(labelstudio_json))
+
+        templates, fingerprints, text_fingerprints, names = [], [], [], []
+        for task in tasks:
+            regions = regions_from_labelstudio_task(task)
+            image_name = os.path.basename(task.get("data", {}).get("image", "") or task.get("file_upload", ""))
+            if not regions or not image_name:
+                continue
+            image = cv2.imread(os.path.join(image_folder, image_name), cv2.IMREAD_GRAYSCALE)
+            if image is None:
+                print(f"⚠️ Template image not found, skipped: {image_name}")
+                continue
+            templates.append(regions)
+            fingerprints.append(layout_fingerprint(image))
+            text_fingerprints.append(text_fingerprint(image))
+            names.append(image_name)
+        return cls(templates, fingerprints, text_fingerprints, names, min_score=min_score)
+
+    def save(self, path):
+        np.savez(
+            path, fingerprints=self.fingerprints, text_fingerprints=self.text_fingerprints,
+            meta=np.array(json.dumps({"names": self.names, "templates": self.templates})),
+        )
+
+    @classmethod
+    def load(cls, path, min_score=DEFAULT_MIN_SCORE):
+        with np.load(path) as data:
+            meta = json.loads(str(data["meta"]))
+            fingerprints = data["fingerprints"]
+            text_fingerprints = data["text_fingerprints"]
+        templates = [
+            [{**region, "box": tuple(region["box"]), "base_size": tuple(region["base_size"])} for region in regions]
+            for regions in meta["templates"]
+        ]
+        return cls(templates, fingerprints, text_fingerprints, meta["names"], min_score=min_score)
+
+    def match(self, image=None, ocr_page=None):
+        # Returns (template index, correlation score); index is -1 below min_score
+        if not len(self.templates):
+            return -1, 0.0
+        if image is not None:
+            scores = self.fingerprints @ layout_fingerprint(image)
+        else:
+            scores = self.text_fingerprints @ box_fingerprint(ocr_page)
+        best = int(np.argmax(scores))
+        score = float(scores[best])
+        if score < self.min_score:
+            return -1, score
+        if image is None:
+            tied = np.flatnonzero(scores >= max(score - self.tie_margin, self.min_score))
+            if len(tied) > 1:
+                best = int(tied[np.argmax(self.region_coverage(ocr_page)[tied])])
+                score = float(scores[best])
+        return best, score
+
+    def region_coverage(self, ocr_page):
+        # Share of the page's confident words inside each template's regions
+        size = (ocr_page.width, ocr_page.height)
+        if size not in self._region_indexes:
+            scaled = [scale_regions(regions, *size) for regions in self.templates]
+            self._region_indexes[size] = RegionIndex(scaled, *size)
+        return self._region_indexes[size].coverage(ocr_page)
+
+    def template_for(self, image=None, ocr_page=None, default=None):
+        # Best template for the page, or `default` when nothing is close enough
+        index, score = self.match(image=image, ocr_page=ocr_page)
+        if index < 0:
+            return default, None, score
+        return self.templates[index], self.names[index], score
+
+
+def load_template_library(path, image_folder=None, min_score=DEFAULT_MIN_SCORE):
+    # A saved .npz library, or a Label Studio export indexed on the spot
+    if path.endswith(".npz"):
+        return TemplateLibrary.load(path, min_score=min_score)
+    return TemplateLibrary.from_labelstudio(path, image_folder=image_folder, min_score=min_score)
+
+
+# === CLI: build the library once, or check which template pages match ===
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Build and query the region template library.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    build_parser = subparsers.add_parser("build", help="Index every annotated task of a Label Studio export")
+    build_parser.add_argument("labelstudio_json")
+    build_parser.add_argument("--image-folder", default=None, help="Task images (default: next to the JSON)")
+    build_parser.add_argument("-o", "--output", default="template_library.npz")
+
+    match_parser = subparsers.add_parser("match", help="Print the best template for each page image")
+    match_parser.add_argument("library", help="template_library.npz or a Label Studio export")
+    match_parser.add_argument("images", nargs="+")
+    match_parser.add_argument("--image-folder", default=None)
+    match_parser.add_argument("--min-score", type=float, default=DEFAULT_MIN_SCORE)
+
+    args = parser.parse_args(argv)
+    if args.command == "build":
+        library = TemplateLibrary.from_labelstudio(args.labelstudio_json, image_folder=args.image_folder)
+        library.save(args.output)
+        print(f"✅ {len(library)} template(s) saved to: {args.output}")
+        return 0
+
+    library = load_template_library(args.library, image_folder=args.image_folder, min_score=args.min_score)
+    for image_path in args.images:
+        image = cv2.imread(image_path, cv2.IMREAD_GRAYSCALE)
+        if image is None:
+            print(f"⚠️ Cannot read: {image_path}")
+            continue
+        start = time.perf_counter()
+        index, score = library.match(image)
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        name = library.names[index] if index >= 0 else "no match (default template)"
+        print(f"{image_path}: {name} (score {score:.3f}, {elapsed_ms:.2f} ms)")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,71 @@
+import json
+
+import pytest
+
+from convert_labelstudio_to_layoutlmv3 import (
+    compact_jsonl, export_legacy_json, load_done, skipped_path, sync_store, tombstone,
+)
+
+
+def sample(image_file, fingerprint, token):
+    return {"tokens": [token], "bboxes": [[10, 10, 50, 30]], "labels": ["B-NAME"], "image_file": image_file,
+            "fingerprint": fingerprint}
+
+
+def write_lines(path, records):
+    with open(path, "a", encoding="utf-8") as f:
+        for record in records:
+            f.write(json.dumps(record) + "\n")
+
+
+def read_lines(path):
+    with open(path, "r", encoding="utf-8") as f:
+        return [json.loads(line) for line in f]
+
+
+@pytest.fixture
+def checkpoint(tmp_path):
+    # a.jpg changed and then failed OCR, b.jpg converted, c.jpg gave no tokens
+    jsonl_path = str(tmp_path / "dataset.jsonl")
+    write_lines(jsonl_path, [sample("a.jpg", "a1", "Chong"), sample("b.jpg", "b1", "Wei")])
+    write_lines(jsonl_path, [tombstone("a.jpg", "a2", "OpenCV could not read image"),
+                             tombstone("c.jpg", "c1", "no tokens")])
+    return jsonl_path
+
+
+def test_tombstones_replace_stale_samples(checkpoint, tmp_path):
+    task_order = ["a.jpg", "b.jpg", "c.jpg"]
+    assert compact_jsonl(checkpoint, task_order) == 1
+    assert read_lines(checkpoint) == [sample("b.jpg", "b1", "Wei")]
+    assert [record["image_file"] for record in read_lines(skipped_path(checkpoint))] == ["a.jpg", "c.jpg"]
+
+    json_path = str(tmp_path / "dataset.json")
+    export_legacy_json(checkpoint, json_path)
+    with open(json_path, "r", encoding="utf-8") as f:
+        assert [s["image_file"] for s in json.load(f)] == ["b.jpg"]
+
+
+def test_tombstoned_tasks_are_not_retried(checkpoint):
+    # Before and after compaction, a failed task counts as done for its fingerprint
+    expected = {"a.jpg": "a2", "b.jpg": "b1", "c.jpg": "c1"}
+    assert load_done(checkpoint) == expected
+    compact_jsonl(checkpoint, ["a.jpg", "b.jpg", "c.jpg"])
+    assert load_done(checkpoint) == expected
+
+
+def test_converted_again_after_a_tombstone(checkpoint):
+    compact_jsonl(checkpoint, ["a.jpg", "b.jpg", "c.jpg"])
+    write_lines(checkpoint, [sample("a.jpg", "a3", "Jie")])
+    assert load_done(checkpoint)["a.jpg"] == "a3"
+    assert compact_jsonl(checkpoint, ["a.jpg", "b.jpg", "c.jpg"]) == 2
+    assert [record["image_file"] for record in read_lines(skipped_path(checkpoint))] == ["c.jpg"]
+
+
+def test_store_drops_tombstoned_samples(checkpoint, tmp_path):
+    pytest.importorskip("pyarrow")
+    store_dir = str(tmp_path / "store")
+    # a.jpg was converted and stored by an earlier run
+    write_lines(str(tmp_path / "earlier.jsonl"), [sample("a.jpg", "a1", "Chong"), sample("b.jpg", "b1", "Wei")])
+    assert sync_store(str(tmp_path / "earlier.jsonl"), store_dir) == 2
+    compact_jsonl(checkpoint, ["a.jpg", "b.jpg", "c.jpg"])
+    assert sync_store(checkpoint, store_dir) == 1
@@ -0,0 +1,34 @@
+import pytest
+
+from field_index import FieldIndex
+
+RESUME = {
+    "Name": "Chong Wei Jie",
+    "Skills": "Python Java Script HTML",
+    "LinkedIn": "linkedin.com/in/chongweijie",
+    "Nationality": "Malaysian",
+}
+
+
+@pytest.fixture
+def index(tmp_path):
+    with FieldIndex(str(tmp_path / "field_index.sqlite")) as index:
+        index.add("chong.pdf", [RESUME])
+        index.commit()
+        yield index
+
+
+def test_skills_are_searchable(index):
+    assert [result["file"] for result in index.search("Skills contains Python")] == ["chong.pdf"]
+
+
+@pytest.mark.parametrize("query", ["LinkedIn contains chongweijie", "linkedin contains chongweijie",
+                                   "Nationality contains Malaysian"])
+def test_layoutlm_pii_fields_are_rejected(index, query):
+    with pytest.raises(ValueError):
+        index.search(query)
+
+
+def test_layoutlm_pii_fields_are_not_indexed(index):
+    assert "LinkedIn" not in index.fields()
+    assert "Nationality" not in index.fields()
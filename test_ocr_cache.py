@@ -0,0 +1,33 @@
+import batch_scan
+import presidio_engine
+from ocr_cache import DEFAULT_MAX_BYTES, OcrCache
+from ocr_page import OcrPage
+
+PAGE = OcrPage(["Chong", "Wei", "Jie"], [(10, 10, 50, 20), (70, 10, 40, 20), (120, 10, 30, 20)],
+               [95.0, 93.0, 96.0], [1, 1, 1], [1, 1, 1], [1, 1, 1], 200, 40)
+
+
+def test_cache_round_trip(tmp_path):
+    cache = OcrCache(str(tmp_path))
+    cache.put("ab" * 32, PAGE)
+    page = cache.get("ab" * 32)
+    assert page.words == PAGE.words
+    assert page.boxes.tolist() == PAGE.boxes.tolist()
+    assert cache.get("cd" * 32) is None
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_unbounded_cache(tmp_path):
+    cache = OcrCache(str(tmp_path), max_bytes=None)
+    cache.put("ab" * 32, PAGE)
+    assert cache.get("ab" * 32) is not None
+
+
+def test_worker_cache_without_byte_budget(tmp_path, monkeypatch):
+    # run_batch(..., ocr_cache_dir=...) without ocr_cache_bytes builds its workers from these options
+    monkeypatch.setattr(presidio_engine, "warm_up", lambda: None)
+    batch_scan.init_worker(batch_scan.worker_options(None, ocr_cache_dir=str(tmp_path)))
+    cache = batch_scan._worker["ocr_cache"]
+    assert cache.max_bytes == DEFAULT_MAX_BYTES
+    cache.put("ab" * 32, PAGE)
+    assert cache.get("ab" * 32) is not None
@@ -0,0 +1,48 @@
+import json
+import os
+
+import pytest
+
+pytest.importorskip("pyarrow")
+
+from results_store import ResultsStore, export_json, import_json
+
+GROUPED = {"Name": "Chong Wei Jie", "Skills": "Python Java", "Languages": "English (Fluent) Malay (Fluent)"}
+# Label scanner (keeps the extension) and coordinate scanner (drops it)
+SCANNER_FILES = ["grouped_output_resume2_page-0001.jpg_page1.json", "grouped_output_Resume Chong Wei Jie_page1.json",
+                 "grouped_output_Resume Chong Wei Jie_page2.json"]
+
+
+def read_json_files(folder):
+    contents = {}
+    for name in os.listdir(folder):
+        with open(os.path.join(folder, name), "r", encoding="utf-8") as f:
+            contents[name] = json.load(f)
+    return contents
+
+
+def test_grouped_output_round_trip(tmp_path):
+    source = tmp_path / "scanned"
+    source.mkdir()
+    for n, name in enumerate(SCANNER_FILES):
+        with open(source / name, "w", encoding="utf-8") as f:
+            json.dump(dict(GROUPED, Skills=f"Python {n}"), f, indent=4)
+
+    store_dir = str(tmp_path / "store")
+    assert import_json(store_dir, [str(source / name) for name in SCANNER_FILES]) == 3
+    export_json(store_dir, str(tmp_path / "exported"), layout="grouped")
+    assert read_json_files(tmp_path / "exported") == read_json_files(source)
+
+
+def test_scanner_output_name_is_kept(tmp_path):
+    store_dir = str(tmp_path / "store")
+    with ResultsStore(store_dir, kind="pages") as store:
+        # As scan_resume_with_regions_label.py appends it
+        store.append_result(os.path.join("resumes", "resume2_page-0001.jpg"), [{"page": 1, "grouped": GROUPED}],
+                            output_name="resume2_page-0001.jpg")
+        # batch_scan rows carry no output name: the extension is dropped
+        store.append_result(os.path.join("resumes", "cv.pdf"), [{"page": 1, "grouped": GROUPED}])
+    export_json(store_dir, str(tmp_path / "exported"), layout="grouped")
+    assert sorted(os.listdir(tmp_path / "exported")) == [
+        "grouped_output_cv_page1.json", "grouped_output_resume2_page-0001.jpg_page1.json",
+    ]
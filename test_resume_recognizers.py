@@ -0,0 +1,53 @@
+import pytest
+
+pytest.importorskip("presidio_analyzer")
+
+from presidio_analyzer import RecognizerResult
+from presidio_analyzer.context_aware_enhancers import LemmaContextAwareEnhancer
+from presidio_analyzer.nlp_engine import NlpArtifacts
+
+from ocr_page import OcrPage
+from resume_recognizers import CONTACT_REGIONS, MalaysianPhoneRecognizer, analyze_scoped
+
+# "Name Chong Wei Jie" on the first line, "Phone 013-6793858" in the Phone Number region below it
+PAGE = OcrPage(["Name", "Chong", "Wei", "Jie", "Phone", "013-6793858"],
+               [(10, 10, 40, 20), (60, 10, 50, 20), (120, 10, 30, 20), (160, 10, 30, 20),
+                (10, 50, 50, 20), (70, 50, 110, 20)],
+               [95.0] * 6, [1, 1, 1, 1, 2, 2], [1] * 6, [1, 1, 1, 1, 1, 1], 300, 100)
+REGIONS = [{"label": "Name", "box": (0, 0, 300, 40)}, {"label": "Phone Number", "box": (0, 40, 300, 80)}]
+SCOPED = [(MalaysianPhoneRecognizer(), CONTACT_REGIONS)]
+
+
+def phone_span():
+    start = PAGE.text.index("013-6793858")
+    return start, start + len("013-6793858")
+
+
+def test_scoped_hit_overlapping_registry_hit_is_reported_once():
+    start, end = phone_span()
+    # What the registry's PhoneRecognizer reports for the same number
+    registry = [RecognizerResult("PERSON", 5, 18, 0.85), RecognizerResult("PHONE_NUMBER", start, end, 0.75)]
+    results = analyze_scoped(PAGE, REGIONS, SCOPED, results=registry)
+    phones = [result for result in results if result.entity_type == "PHONE_NUMBER"]
+    assert [(result.start, result.end, result.score) for result in phones] == [(start, end, 0.75)]
+    assert [result.entity_type for result in results] == ["PERSON", "PHONE_NUMBER"]
+
+
+def test_scoped_hits_below_threshold_are_dropped():
+    assert analyze_scoped(PAGE, REGIONS, SCOPED, score_threshold=0.7) == []
+    start, end = phone_span()
+    assert [(result.start, result.end) for result in analyze_scoped(PAGE, REGIONS, SCOPED)] == [(start, end)]
+
+
+def test_scoped_hits_are_context_enhanced():
+    # The "Phone" word before the number lifts its score over the threshold, as in AnalyzerEngine.analyze
+    spacy = pytest.importorskip("spacy")
+    doc = spacy.blank("en")(PAGE.text)
+    nlp_artifacts = NlpArtifacts(entities=[], tokens=doc, tokens_indices=[token.idx for token in doc],
+                                 lemmas=[token.text for token in doc], nlp_engine=None, language="en")
+    # Keywords as the spaCy NLP engine would pick them (no stop words or punctuation)
+    nlp_artifacts.keywords = [token.text.lower() for token in doc if not token.is_stop and not token.is_punct]
+    results = analyze_scoped(PAGE, REGIONS, SCOPED, nlp_artifacts=nlp_artifacts,
+                             context_enhancer=LemmaContextAwareEnhancer(), score_threshold=0.7)
+    assert [(result.start, result.end) for result in results] == [phone_span()]
+    assert results[0].score > 0.7
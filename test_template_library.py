@@ -0,0 +1,36 @@
+import numpy as np
+
+from ocr_page import OcrPage
+from region_assign import RegionIndex, group_words
+from template_library import TemplateLibrary, box_fingerprint
+
+# Two-column page: the name and phone on the left, skills on the right
+PAGE = OcrPage(["Chong", "Wei", "Jie", "013-6793858", "Python", "Java"],
+               [(20, 20, 60, 20), (90, 20, 40, 20), (140, 20, 40, 20), (20, 60, 120, 20),
+                (420, 20, 70, 20), (500, 20, 50, 20)],
+               [95.0] * 6, [1, 1, 1, 1, 2, 2], [1] * 6, [1, 1, 1, 2, 1, 1], 600, 800)
+SIDEBAR = [{"label": "Name", "box": (0, 0, 300, 40), "base_size": (600, 800)},
+           {"label": "Skills", "box": (400, 0, 600, 40), "base_size": (600, 800)}]
+HEADER = [{"label": "Name", "box": (0, 0, 600, 15), "base_size": (600, 800)}]
+TEMPLATES = [HEADER, SIDEBAR]
+
+
+def test_region_index_groups_like_group_words():
+    index = RegionIndex(TEMPLATES, PAGE.width, PAGE.height, cell_size=32)
+    assert index.group_words(PAGE) == [group_words(PAGE, regions) for regions in TEMPLATES]
+
+
+def test_region_index_coverage():
+    coverage = RegionIndex(TEMPLATES, PAGE.width, PAGE.height).coverage(PAGE)
+    assert coverage.tolist() == [0.0, 5 / 6]
+
+
+def test_text_layer_ties_go_to_the_template_covering_more_words():
+    # Same fingerprint for both templates: only the word coverage tells them apart
+    fingerprint = box_fingerprint(PAGE)
+    library = TemplateLibrary(TEMPLATES, np.stack([fingerprint] * 2), np.stack([fingerprint] * 2),
+                              ["header.jpg", "sidebar.jpg"])
+    template, name, score = library.template_for(ocr_page=PAGE)
+    assert name == "sidebar.jpg"
+    assert template is SIDEBAR
+    assert score > 0.99
@@ -1,117 +1,94 @@
 import os
-import json
-import torch
-from PIL import Image
-from datasets import Dataset
 from transformers import (
     LayoutLMv3Processor,
     LayoutLMv3ForTokenClassification,
     TrainingArguments,
-    Trainer,
-    default_data_collator
 )
+from layoutlm_labels import LABELS, label2id, id2label
+from layoutlm_features import FeatureStoreDataset, build_feature_store, load_samples
+from layoutlm_training import DynamicPaddingCollator, LengthGroupedTrainer
 
-# === Define LABELS ===
-LABELS = [
-    'O', 'B-NAME', 'B-COURSE', 'B-PHONE_NUMBER',
-    'B-EMAIL1', 'B-LOCATION', 'B-EMAIL2',
-    'B-SKILLS', 'B-LANGUAGE', 'B-REFERENCE',
-    'B-PROFILE', 'B-WORK_EXPERIENCE', 'B-EDUCATION',
-    'B-PAST_PROJECT', 'B-LINKEDIN', 'B-AWARD',
-    'B-NATIONALITY'
-]
-label2id = {label: i for i, label in enumerate(LABELS)}
-id2label = {i: label for label, i in label2id.items()}
 
 # === Paths ===
 dataset_json_path = r"C:\Users\User\Downloads\PresidioResumeScanner\layoutlmv3_dataset.json"
 resume_image_folder = r"C:\Users\User\Downloads\PresidioResumeScanner\PresidioResumeScanner\resume_images"
 output_dir = "./layoutlmv3-resume-model"
-
-# === Load Dataset ===
-with open(dataset_json_path, "r", encoding="utf-8") as f:
-    raw_data = json.load(f)
-
-# Filter entries with missing images
-filtered_data = []
-for entry in raw_data:
-    image_path = os.path.join(resume_image_folder, entry.get("image_file", ""))
-    if os.path.exists(image_path):
-        filtered_data.append(entry)
-    else:
-        print(f"⚠️ Missing image skipped: {image_path}")
-
-if not filtered_data:
-    raise ValueError("❌ No valid entries with matching image files found.")
-
-dataset = Dataset.from_list(filtered_data)
-
-# === Load Model and Processor ===
-processor = LayoutLMv3Processor.from_pretrained("microsoft/layoutlmv3-base", apply_ocr=False)
-model = LayoutLMv3ForTokenClassification.from_pretrained(
-    "microsoft/layoutlmv3-base",
-    num_labels=len(LABELS),
-    label2id=label2id,
-    id2label=id2label
-)
-
-# === Encode function ===
-def encode(example):
-    image_path = os.path.join(resume_image_folder, example["image_file"])
-    image = Image.open(image_path).convert("RGB")
-
-    encoding = processor(
-        images=image,
-        words=example["tokens"],
-        boxes=example["bboxes"],
-        truncation=True,
-        padding="max_length",
-        max_length=512,
-        return_tensors="pt"
+feature_store_root = "./layoutlmv3-features"  # Encoded once per dataset/processor fingerprint
+
+
+# Encoding runs in worker processes, so everything below must stay behind the main guard
+def main():
+    # === Load Dataset ===
+    raw_data = load_samples(dataset_json_path)  # .json, the converter's .jsonl or its store directory
+
+    # Filter entries with missing images
+    filtered_data = []
+    for entry in raw_data:
+        image_path = os.path.join(resume_image_folder, entry.get("image_file", ""))
+        if os.path.exists(image_path):
+            filtered_data.append(entry)
+        else:
+            print(f"⚠️ Missing image skipped: {image_path}")
+
+    if not filtered_data:
+        raise ValueError("❌ No valid entries with matching image files found.")
+
+    # === Load Model and Processor ===
+    processor = LayoutLMv3Processor.from_pretrained("microsoft/layoutlmv3-base", apply_ocr=False)
+    model = LayoutLMv3ForTokenClassification.from_pretrained(
+        "microsoft/layoutlmv3-base",
+        num_labels=len(LABELS),
+        label2id=label2id,
+        id2label=id2label
     )
 
-    seq_length = encoding["input_ids"].shape[1]
-    labels = [label2id[label] for label in example["labels"]]
-    labels += [label2id["O"]] * (seq_length - len(labels))
-
-    return {
-        "input_ids": encoding["input_ids"].squeeze(0),
-        "attention_mask": encoding["attention_mask"].squeeze(0),
-        "bbox": encoding["bbox"].squeeze(0),
-        "pixel_values": encoding["pixel_values"].squeeze(0),
-        "token_type_ids": encoding.get("token_type_ids", torch.zeros_like(encoding["input_ids"])).squeeze(0),
-        "labels": torch.tensor(labels)
-    }
+    # === Encode Dataset (cached, memory-mapped feature store) ===
+    # Images are decoded and run through the processor once per fingerprint
+    # (dataset + images + processor), in parallel. Later runs map the stored
+    # input_ids/bbox/labels/pixel tensors straight from disk.
+    store_dir = build_feature_store(
+        filtered_data, resume_image_folder, feature_store_root,
+        processor_name="microsoft/layoutlmv3-base", max_length=512,
+        pad_token_id=processor.tokenizer.pad_token_id,
+    )
+    encoded_dataset = FeatureStoreDataset(store_dir)
+
+    # === Training Arguments ===
+    training_args = TrainingArguments(
+        output_dir=output_dir,
+        per_device_train_batch_size=2,
+        gradient_accumulation_steps=8,  # Effective batch of 16 without the memory of 16
+        group_by_length=True,
+        dataloader_num_workers=2,
+        dataloader_prefetch_factor=2,
+        dataloader_pin_memory=False,
+        num_train_epochs=5,
+        learning_rate=5e-5,
+        weight_decay=0.01,
+        save_strategy="epoch",
+        remove_unused_columns=False,
+        push_to_hub=False,
+        logging_steps=10
+    )
 
-# === Encode Dataset ===
-encoded_dataset = dataset.map(encode)
+    # === Trainer ===
+    # Length-grouped batches padded only to their own longest sequence
+    trainer = LengthGroupedTrainer(
+        model=model,
+        args=training_args,
+        train_dataset=encoded_dataset,
+        data_collator=DynamicPaddingCollator(pad_token_id=processor.tokenizer.pad_token_id),
+    )
 
-# === Training Arguments ===
-training_args = TrainingArguments(
-    output_dir=output_dir,
-    per_device_train_batch_size=2,
-    num_train_epochs=5,
-    learning_rate=5e-5,
-    weight_decay=0.01,
-    save_strategy="epoch",
-    remove_unused_columns=False,
-    push_to_hub=False,
-    logging_steps=10
-)
+    # === Train ===
+    trainer.train()
 
-# === Trainer ===
-trainer = Trainer(
-    model=model,
-    args=training_args,
-    train_dataset=encoded_dataset,
-    data_collator=default_data_collator,
-)
+    # === Save Model ===
+    model.save_pretrained(output_dir)
+    processor.save_pretrained(output_dir)
 
-# === Train ===
-trainer.train()
+    print(f"\n✅ Training complete! Model saved to: {output_dir}")
 
-# === Save Model ===
-model.save_pretrained(output_dir)
-processor.save_pretrained(output_dir)
 
-print(f"\n✅ Training complete! Model saved to: {output_dir}")
+if __name__ == "__main__":
+    main()